@@ -1,15 +1,33 @@
 import os
 import time
+import atexit
+import argparse
 import json
 import logging
 import sqlite3
 import threading
 from datetime import UTC, datetime, timedelta
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_socketio import SocketIO, emit
 import jwt
 import requests
+import numpy as np
+from core.db_index import ensure_timestamp_index, tail_query, read_time_range, find_readings_table
+from core.db_catalog import get_catalog
+from core.retention import RetentionWorker, read_archived_rows, list_archives, latest_circuit_db
+from core.rollups import RollupWorker, get_rollup, rollup_exists
+from core.rule_engine import RuleEngine, compile_rules, save_rules
+from core import http_client, dbc_upload
+from core.device_api import dispatch_bulk, parse_id, COMMAND_ACTIONS
+from core.pause_dispatcher import pause_dispatcher
+from core.device_registry import device_registry
+from core import metrics
+from core.live_ring import LiveRing, dbc_signal_names
+from core.tsdb import RecentHistory
+from core.db_reader import AttachedTailReader, forget_schemas, record_json
+from core.db_connect import connect_ro, run_read, fetch_all
+from config import LIVE_RING_ENABLED, TSDB_ENABLED
 # from dbc_simulator import DBCDataSimulator
 
 # =========================================================
@@ -36,6 +54,7 @@ DEFAULT_THRESHOLDS = {
 API_BASE_URL = "http://localhost:5000"  # For simulated device API
 # Initialize with your DBC file
 # sim = DBCDataSimulator("D:\\Sagar_OneDrive\\OneDrive - Cybernetik Technologies Pvt Ltd\\cybernetik\\UAPR119_\\onsite\\adore\\software\\DBC_2.3kWh.dbc", db_folder=STORED_DBC_PATH, interval=1)
+sim = None  # in-process simulator hooks are unused; run python -m simulator for a local device API
 
 # =========================================================
 #  Flask Setup
@@ -43,7 +62,7 @@ API_BASE_URL = "http://localhost:5000"  # For simulated device API
 app = Flask(__name__, template_folder="templates", static_folder="static")
 app.config["SECRET_KEY"] = SECRET_KEY
 # socketio = SocketIO(app, cors_allowed_origins="*")
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading", json=record_json)
 
 # Logging
 logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
@@ -57,8 +76,27 @@ ACTIVE_CIRCUITS = []  # circuits being monitored
 JWT_TOKEN = None
 JWT_EXPIRY = datetime.now(UTC) + timedelta(hours=JWT_EXPIRY_HOURS)
 DEVICE_ID = 2
+ACTIVE_CIRCUITS_LOCK = threading.Lock()  # stop_circuit may run from bulk command threads
+live_ring = None  # shared-memory ring of live samples (see core.live_ring)
+RING_READER = False  # True: this process serves live data from another process's ring
+tail_reader = AttachedTailReader()  # latest rows of all circuit DBs, few connections
+recent_history = RecentHistory() if TSDB_ENABLED else None  # compressed recent samples (see core.tsdb)
 
 
+def active_file_names():
+    """File names of the circuit DBs currently being monitored"""
+    return {c.get("file_name") for c in ACTIVE_CIRCUITS if isinstance(c, dict) and c.get("file_name")}
+
+
+# Archives finished circuit DBs (scheduled on stop + periodic idle sweep)
+retention = RetentionWorker(STORED_DBC_PATH, active_files=active_file_names)
+
+# Per-minute / per-step signal rollups of the monitored DBs
+rollups = RollupWorker(STORED_DBC_PATH, active_files=active_file_names)
+
+# Streaming alarm rules evaluated on every live sample
+rule_engine = RuleEngine()
+
 # =========================================================
 #  Utility Functions
 # =========================================================
@@ -69,54 +107,10 @@ def json_response(data, status=200):
 def discover_database_files(folder_path):
     """
     Discover all SQLite database files in the specified folder
-    Returns a list of database files with their metadata
+    Returns a list of database files with their metadata (served from the
+    incrementally refreshed catalog, no per-file COUNT(*))
     """
-    db_files = []
-    if not os.path.exists(folder_path):
-        logging.warning(f"Database folder not found: {folder_path}")
-        return db_files
-    
-    try:
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.db'):
-                file_path = os.path.join(folder_path, filename)
-                try:
-                    # Get file stats
-                    stat = os.stat(file_path)
-                    
-                    # Try to connect and get basic info
-                    conn = sqlite3.connect(file_path)
-                    cursor = conn.cursor()
-                    
-                    # Get table names
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                    tables = [row[0] for row in cursor.fetchall()]
-                    
-                    # Get row count from main table (if exists)
-                    row_count = 0
-                    if tables:
-                        main_table = tables[0]
-                        cursor.execute(f"SELECT COUNT(*) FROM {main_table};")
-                        row_count = cursor.fetchone()[0]
-                    
-                    conn.close()
-                    
-                    db_files.append({
-                        'filename': filename,
-                        'file_path': file_path,
-                        'size': stat.st_size,
-                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        'tables': tables,
-                        'row_count': row_count
-                    })
-                    
-                except Exception as e:
-                    logging.error(f"Error analyzing database file {filename}: {e}")
-                    
-    except Exception as e:
-        logging.error(f"Error discovering database files: {e}")
-    
-    return db_files
+    return get_catalog(folder_path).list_files()
 
 
 def load_thresholds():
@@ -157,141 +151,46 @@ def refresh_token_if_needed():
 #  SQLite Reader - Optimized for Multiple Files & Dynamic Columns
 # =========================================================
 def read_active_circuit_data(folder_path, circuits):
+    """
+    Latest row of every active circuit, as SampleRecords sharing one cached
+    column schema per DB file (see core.db_reader). All DBs are read through
+    the batched ATTACH reader: one UNION ALL query per group of files.
+    """
     result = {"timestamp": datetime.now(UTC).isoformat(), "circuits": []}
-    
-    # Use connection pooling and batch processing for better performance
-    connections = {}
-    column_cache = {}
-    
+    targets = []
+
+    for cid in circuits:
+        # Get database file path
+        if isinstance(cid, dict):
+            db_file = cid.get("file_name")
+            circuit_id = cid.get("circuit_id", cid.get("id", "unknown"))
+        else:
+            db_file = f"circuit_{cid}.db"
+            circuit_id = cid
+        if not db_file:
+            continue
+
+        db_path = os.path.join(folder_path, db_file)
+        # Check if file exists
+        if not os.path.exists(db_path):
+            print("Database file not found:", db_path)
+            logging.warning(f"Database file not found: {db_path}")
+            continue
+        targets.append((circuit_id, db_file, db_path))
+
     try:
-        # print("this is active circuits",circuits)  # For debugging
-        for cid in circuits:
-            # print("singel",cid)
-            try:
-                # Get database file path
-                if isinstance(cid, dict):
-                    db_file = cid.get("file_name")
-                    circuit_id = cid.get("circuit_id", cid.get("id", "unknown"))
-                else:
-                    db_file = f"circuit_{cid}.db"
-                    circuit_id = cid
-                # print("db_file",db_file)
-                # print("folder_path",folder_path)
-                if not db_file:
-                    continue
-                    
-                db_path = os.path.join(folder_path, db_file)
-                # print("db_path",db_path)
-                # Check if file exists
-                if not os.path.exists(db_path):
-                    print("Database file not found:", db_path)
-                    logging.warning(f"Database file not found: {db_path}")
-                    continue
-                
-                # Reuse connection if already open
-                if db_path not in connections:
-                    connections[db_path] = sqlite3.connect(db_path)
-                    connections[db_path].row_factory = sqlite3.Row  # Enable column access by name
-                # print("connections",connections)
-                conn = connections[db_path]
-                cursor = conn.cursor()
-                
-                # Get table schema dynamically if not cached
-                if db_path not in column_cache:
-                    # First, find the table name (could be 'readings' or something else)
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                    tables = cursor.fetchall()
-                    
-                    if not tables:
-                        logging.warning(f"No tables found in {db_file}")
-                        continue
-                    
-                    # Use the first table (or look for 'readings' specifically)
-                    table_name = None
-                    for table in tables:
-                        if 'reading' in table[0].lower():
-                            table_name = table[0]
-                            break
-                    
-                    if not table_name and tables:
-                        table_name = tables[0][0]  # Use first table as fallback
-                    
-                    if not table_name:
-                        continue
-                    
-                    # Get column information
-                    cursor.execute(f"PRAGMA table_info({table_name});")
-                    columns_info = cursor.fetchall()
-                    
-                    # Store column names and table name
-                    column_cache[db_path] = {
-                        'table_name': table_name,
-                        'columns': [col[1] for col in columns_info]  # col[1] is column name
-                    }
-                
-                table_info = column_cache[db_path]
-                table_name = table_info['table_name']
-                columns = table_info['columns']
-                # print("table_name",table_name)
-                # print("columns",columns)
-                # Read latest data with dynamic columns
-                cursor.execute(f"SELECT * FROM {table_name} ORDER BY timestamp DESC LIMIT 1;")
-                row = cursor.fetchone()
-                # print("row",row)
-                if row:
-                    # Build dynamic data structure
-                    circuit_data = {
-                        "circuit_id": circuit_id,
-                        "file_name": db_file,
-                        "table_name": table_name
-                    }
-                    
-                    # Map all columns dynamically
-                    for i, column_name in enumerate(columns):
-                        try:
-                            value = row[i] if i < len(row) else None
-                            # Try to convert to appropriate type
-                            if value is not None:
-                                # Try to convert to float for numeric values
-                                try:
-                                    if isinstance(value, str) and value.replace('.', '').replace('-', '').isdigit():
-                                        value = float(value)
-                                except (ValueError, AttributeError):
-                                    pass  # Keep as string if conversion fails
-                            
-                            circuit_data[column_name.lower()] = value
-                        except IndexError:
-                            circuit_data[column_name.lower()] = None
-                    
-                    # Add common mappings for backwards compatibility
-                    # Map common column variations to standard names
-                    column_mappings = {
-                        'temp': 'temperature',
-                        'volt': 'voltage', 
-                        'curr': 'current',
-                        'pow': 'power',
-                        'res': 'resistance',
-                        'time': 'timestamp'
-                    }
-                    
-                    for old_name, new_name in column_mappings.items():
-                        if old_name in circuit_data and new_name not in circuit_data:
-                            circuit_data[new_name] = circuit_data[old_name]
-                    
-                    result["circuits"].append(circuit_data)
-                    
-            except Exception as e:
-                logging.error(f"DB read error for circuit {cid}: {e}")
-                continue
-                
-    finally:
-        # Close all connections
-        for conn in connections.values():
-            try:
-                conn.close()
-            except:
-                pass
-    
+        records = tail_reader.read(db_path for _, _, db_path in targets)
+    except Exception as e:
+        logging.error(f"DB read error for circuits {[t[0] for t in targets]}: {e}")
+        return result
+
+    for circuit_id, db_file, db_path in targets:
+        record = records.get(db_path)
+        if record is not None:
+            record.circuit_id = circuit_id
+            record.file_name = db_file
+            result["circuits"].append(record)
+
     return result
 
 
@@ -323,11 +222,11 @@ def get_circuit_file_name(circuit_id):
 
 def update_circuit_status(circuit_id, status):
     """Update circuit status in active circuits list"""
-    global ACTIVE_CIRCUITS
-    for i, circuit in enumerate(ACTIVE_CIRCUITS):
-        if isinstance(circuit, dict) and circuit.get("circuit_id") == circuit_id:
-            ACTIVE_CIRCUITS[i]["status"] = status
-            break
+    with ACTIVE_CIRCUITS_LOCK:
+        for circuit in ACTIVE_CIRCUITS:
+            if isinstance(circuit, dict) and circuit.get("circuit_id") == circuit_id:
+                circuit["status"] = status
+                break
 
 def pause_circuit(device_id, circuit_id):
     """Pause circuit via BTS API and stop data collection"""
@@ -349,7 +248,7 @@ def pause_circuit(device_id, circuit_id):
             headers["Authorization"] = f"Bearer {JWT_TOKEN}"
         
         # Make API call to BTS
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        response = http_client.post(url, json=payload, headers=headers, group="command")
         
         if response.status_code == 200:
             logging.info(f"✓ Circuit {circuit_id} paused successfully via BTS API")
@@ -400,7 +299,7 @@ def stop_circuit(device_id, circuit_id):
             headers["Authorization"] = f"Bearer {JWT_TOKEN}"
         
         # Make API call to BTS
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        response = http_client.post(url, json=payload, headers=headers, group="command")
         
         if response.status_code == 200:
             logging.info(f"✓ Circuit {circuit_id} stopped successfully via BTS API")
@@ -414,11 +313,19 @@ def stop_circuit(device_id, circuit_id):
             # Update circuit status
             update_circuit_status(circuit_id, "stopped")
             
+            # Test ended → compact the circuit DB into the archive once the device has flushed it
+            retention.schedule(file_name)
+            rule_engine.forget((device_id, circuit_id))
+            pause_dispatcher.reset(device_id, circuit_id)
+            
             # Remove circuit from active circuits if stopped
             global ACTIVE_CIRCUITS
-            ACTIVE_CIRCUITS = [c for c in ACTIVE_CIRCUITS if not (
-                isinstance(c, dict) and c.get("circuit_id") == circuit_id
-            )]
+            with ACTIVE_CIRCUITS_LOCK:
+                ACTIVE_CIRCUITS = [c for c in ACTIVE_CIRCUITS if not (
+                    isinstance(c, dict) and c.get("circuit_id") == circuit_id
+                )]
+                forget_schemas(os.path.join(STORED_DBC_PATH, c["file_name"]) for c in ACTIVE_CIRCUITS
+                               if isinstance(c, dict) and c.get("file_name"))
             
             return {
                 "message": f"Circuit {circuit_id} stopped successfully",
@@ -460,7 +367,7 @@ def continue_circuit(device_id, circuit_id):
             headers["Authorization"] = f"Bearer {JWT_TOKEN}"
         
         # Make API call to BTS
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
+        response = http_client.post(url, json=payload, headers=headers, group="command")
         
         if response.status_code == 200:
             logging.info(f"✓ Circuit {circuit_id} continued successfully via BTS API")
@@ -475,22 +382,23 @@ def continue_circuit(device_id, circuit_id):
             update_circuit_status(circuit_id, "active")
             
             # Add circuit back to active circuits if not present
-            global ACTIVE_CIRCUITS
-            circuit_exists = any(
-                isinstance(c, dict) and c.get("circuit_id") == circuit_id 
-                for c in ACTIVE_CIRCUITS
-            )
-            
-            if not circuit_exists:
-                circuit_metadata = {
-                    "circuit_id": circuit_id,
-                    "device_id": device_id,
-                    "start_time": datetime.now(UTC).isoformat(),
-                    "status": "active",
-                    "file_name": file_name,
-                    "file_path": os.path.join(STORED_DBC_PATH, file_name)
-                }
-                ACTIVE_CIRCUITS.append(circuit_metadata)
+            # (check and append under the lock: a concurrent stop rebinds the list)
+            with ACTIVE_CIRCUITS_LOCK:
+                circuit_exists = any(
+                    isinstance(c, dict) and c.get("circuit_id") == circuit_id
+                    for c in ACTIVE_CIRCUITS
+                )
+                
+                if not circuit_exists:
+                    circuit_metadata = {
+                        "circuit_id": circuit_id,
+                        "device_id": device_id,
+                        "start_time": datetime.now(UTC).isoformat(),
+                        "status": "active",
+                        "file_name": file_name,
+                        "file_path": os.path.join(STORED_DBC_PATH, file_name)
+                    }
+                    ACTIVE_CIRCUITS.append(circuit_metadata)
             
             return {
                 "message": f"Circuit {circuit_id} continued successfully",
@@ -544,8 +452,10 @@ def login():
 
 @app.route("/api/devices", methods=["GET"])
 def get_devices(): 
-    devices = [{"id": 2, "name": "BTS Controller 2"}]
-    return json_response({"devices": devices})
+    """Devices from the in-memory registry (refreshed in the background)"""
+    if request.args.get("refresh") == "1":
+        device_registry.refresh()
+    return json_response({"devices": device_registry.devices(), **device_registry.status()})
 
 
 @app.route("/api/database-files", methods=["GET"])
@@ -566,12 +476,76 @@ def get_database_files():
 @app.route("/api/active-circuits", methods=["GET"])
 def get_active_circuits():
     """Get list of currently active circuits being monitored"""
+    if RING_READER:
+        circuits = list(live_ring.directory()["slots"].values())
+        return json_response({"active_circuits": circuits, "count": len(circuits)})
     return json_response({
         "active_circuits": ACTIVE_CIRCUITS,
         "count": len(ACTIVE_CIRCUITS)
     })
 
 
+@app.route("/api/live/<int:device_id>/<int:circuit_id>", methods=["GET"])
+def get_live_samples(device_id, circuit_id):
+    """Recent samples of a circuit from the shared-memory ring (no SQLite read)"""
+    if live_ring is None:
+        return json_response({"error": "Live ring is disabled"}, 503)
+    slot = live_ring.slot_of(device_id, circuit_id)
+    if slot is None:
+        return json_response({"error": "Circuit is not being monitored"}, 404)
+    samples = min(max(request.args.get("samples", 60, type=int), 1), live_ring.capacity)
+    return json_response({"device_id": device_id, "circuit_id": circuit_id,
+                          "samples": live_ring.records(slot, samples)})
+
+
+@app.route("/api/live-poll", methods=["GET"])
+def get_live_poll_status():
+    """Per-file poll interval learned from each circuit's write rate"""
+    return json_response({"files": tail_reader.status()})
+
+
+@app.route("/api/live-ring", methods=["GET"])
+def get_live_ring_status():
+    if live_ring is None:
+        return json_response({"enabled": False})
+    return json_response({"enabled": True, "reader": RING_READER, **live_ring.status()})
+
+
+@app.route("/api/recent/<int:device_id>/<int:circuit_id>", methods=["GET"])
+def get_recent_history(device_id, circuit_id):
+    """Recent samples of a circuit from memory (?signals=a,b&start=&end=&max_points=)"""
+    if recent_history is None:
+        return json_response({"error": "Recent history is disabled"}, 404)
+    try:
+        signals = request.args.get("signals")
+        result = recent_history.query(device_id, circuit_id, signals.split(",") if signals else None,
+                                      request.args.get("start"), request.args.get("end"))
+        if result is None:
+            return json_response({"error": "No recent data for this circuit"}, 404)
+        times, columns = result
+        max_points = request.args.get("max_points", type=int)
+        if max_points and len(times) > max_points:
+            stride = -(-len(times) // max_points)
+            times, columns = times[::stride], {k: v[::stride] for k, v in columns.items()}
+        return json_response({
+            "device_id": device_id,
+            "circuit_id": circuit_id,
+            "timestamps": np.datetime_as_string(times.astype("datetime64[ms]")).tolist(),
+            "signals": {k: [None if x != x else x for x in v.tolist()] for k, v in columns.items()},
+            "count": len(times),
+        })
+    except Exception as e:
+        logging.error(f"Error reading recent history for circuit {circuit_id}: {e}")
+        return json_response({"error": "Failed to read recent history"}, 500)
+
+
+@app.route("/api/recent-history", methods=["GET"])
+def get_recent_history_status():
+    if recent_history is None:
+        return json_response({"enabled": False})
+    return json_response({"enabled": True, **recent_history.status()})
+
+
 @app.route("/api/circuit-data/<int:device_id>/<int:circuit_id>", methods=["GET"])
 def get_circuit_data(device_id, circuit_id):
     """Get historical data for a specific circuit"""
@@ -588,23 +562,41 @@ def get_circuit_data(device_id, circuit_id):
                 break
         
         if not circuit_info:
-            return json_response({"error": "Circuit not found or not active"}, 404)
+            # stopped circuits: their last DB, still on disk or already archived
+            file_name = latest_circuit_db(device_id, circuit_id, STORED_DBC_PATH)
+            if not file_name:
+                return json_response({"error": "Circuit not found or not active"}, 404)
+            circuit_info = {"circuit_id": circuit_id, "device_id": device_id, "file_name": file_name}
         
         # Get database file path
         db_file = circuit_info.get("file_name", f"circuit_{circuit_id}.db")
         db_path = os.path.join(STORED_DBC_PATH, db_file)
         
+        # Get limit and optional time range from query parameters (default to 100 latest records)
+        limit = request.args.get('limit', 100, type=int)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
         if not os.path.exists(db_path):
-            return json_response({"error": "Database file not found"}, 404)
+            # Finished runs are served from the Parquet archive
+            archived = read_archived_rows(db_file, limit, start, end)
+            if archived is None:
+                return json_response({"error": "Database file not found"}, 404)
+            archived.reverse()
+            return json_response({
+                "circuit_id": circuit_id,
+                "device_id": device_id,
+                "table_name": None,
+                "archived": True,
+                "data": archived,
+                "count": len(archived)
+            })
         
-        # Read data from database
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        # Read data from database (read-only, memory-mapped; see core.db_connect)
+        conn = connect_ro(db_path, row_factory=sqlite3.Row)
         
         # Get table name dynamically
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
+        tables = fetch_all(conn, "SELECT name FROM sqlite_master WHERE type='table';", reader="history")
         
         if not tables:
             conn.close()
@@ -620,12 +612,12 @@ def get_circuit_data(device_id, circuit_id):
         if not table_name and tables:
             table_name = tables[0][0]
         
-        # Get limit from query parameters (default to 100 latest records)
-        limit = request.args.get('limit', 100, type=int)
-        
         # Fetch latest records
-        cursor.execute(f"SELECT * FROM {table_name} ORDER BY timestamp DESC LIMIT ?;", (limit,))
-        rows = cursor.fetchall()
+        if start or end:
+            rows = read_time_range(conn, db_path, table_name, start, end, limit)
+        else:
+            rows = fetch_all(conn, tail_query(table_name, ensure_timestamp_index(db_path, table_name)), (limit,),
+                             reader="history")
         
         # Convert to list of dictionaries
         data = []
@@ -659,6 +651,73 @@ def get_circuit_data(device_id, circuit_id):
         return json_response({"error": "Failed to get circuit data"}, 500)
 
 
+@app.route("/api/archives", methods=["GET"])
+def get_archives():
+    """List archived (compacted) circuit DBs, optionally filtered by ?device_id="""
+    device_id = request.args.get('device_id', type=int)
+    archives = list_archives(device_id)
+    return json_response({"archives": archives, "count": len(archives)})
+
+
+@app.route("/api/history/<path:file_name>", methods=["GET"])
+def get_history(file_name):
+    """History for any circuit DB by file name, live or archived"""
+    try:
+        limit = request.args.get('limit', 100, type=int)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        file_name = os.path.basename(file_name)
+        db_path = os.path.join(STORED_DBC_PATH, file_name)
+
+        if os.path.exists(db_path):
+            conn = connect_ro(db_path, row_factory=sqlite3.Row)
+            try:
+                table_name = run_read(lambda: find_readings_table(conn.cursor()), "history")
+                if not table_name:
+                    return json_response({"error": "No tables found"}, 404)
+                rows = [dict(r) for r in read_time_range(conn, db_path, table_name, start, end, limit)]
+            finally:
+                conn.close()
+            archived = False
+        else:
+            rows = read_archived_rows(file_name, limit, start, end)
+            if rows is None:
+                return json_response({"error": "Database file not found"}, 404)
+            archived = True
+
+        rows.reverse()
+        return json_response({"file_name": file_name, "archived": archived, "data": rows, "count": len(rows)})
+    except Exception as e:
+        logging.error(f"Error getting history for {file_name}: {e}")
+        return json_response({"error": "Failed to get history"}, 500)
+
+
+@app.route("/api/rollup/<path:file_name>", methods=["GET"])
+def get_rollups(file_name):
+    """Per-minute (?resolution=<minutes>) or per-step (?by=step) signal aggregates of a circuit DB"""
+    try:
+        signal = request.args.get('signal')
+        file_name = os.path.basename(file_name)
+        db_path = os.path.join(STORED_DBC_PATH, file_name)
+
+        if os.path.exists(db_path):
+            store = get_rollup(db_path)
+            store.refresh()  # cheap when the worker is current; exact for a just-written minute
+        elif rollup_exists(file_name):
+            store = get_rollup(db_path)  # archived: the sidecar is final
+        else:
+            return json_response({"error": "Database file not found"}, 404)
+
+        if request.args.get('by') == "step":
+            return json_response({"file_name": file_name, "steps": store.steps(signal)})
+        data = store.minutes(signal, request.args.get('start'), request.args.get('end'),
+                             request.args.get('resolution', 1, type=int))
+        return json_response({"file_name": file_name, "data": data})
+    except Exception as e:
+        logging.error(f"Error getting rollups for {file_name}: {e}")
+        return json_response({"error": "Failed to get rollups"}, 500)
+
+
 @app.route("/api/command/pause", methods=["POST"])
 def api_pause():
     """API endpoint to pause a circuit"""
@@ -669,6 +728,10 @@ def api_pause():
         
         if not circuit_id:
             return json_response({"error": "Circuit ID is required"}, 400)
+        try:
+            device_id, circuit_id = parse_id(device_id), parse_id(circuit_id)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
         
         result = pause_circuit(device_id, circuit_id)
         
@@ -693,6 +756,10 @@ def api_stop():
         
         if not circuit_id:
             return json_response({"error": "Circuit ID is required"}, 400)
+        try:
+            device_id, circuit_id = parse_id(device_id), parse_id(circuit_id)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
         
         result = stop_circuit(device_id, circuit_id)
         
@@ -717,6 +784,10 @@ def api_continue():
         
         if not circuit_id:
             return json_response({"error": "Circuit ID is required"}, 400)
+        try:
+            device_id, circuit_id = parse_id(device_id), parse_id(circuit_id)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
         
         result = continue_circuit(device_id, circuit_id)
         
@@ -731,6 +802,53 @@ def api_continue():
         return json_response({"error": "Internal server error"}, 500)
 
 
+@app.route("/api/command/bulk", methods=["POST"])
+def api_bulk_command():
+    """
+    Runs many commands concurrently. Body either
+      {"commands": [{"deviceId": 2, "circuitId": 1, "action": "stop"}, ...]}
+    or one action for many circuits of a device
+      {"action": "stop", "deviceId": 2, "circuitIds": [1, 2, 3]}
+    """
+    try:
+        data = request.get_json() or {}
+        if "commands" in data:
+            commands = [
+                (c.get("deviceId") or c.get("DeviceId", DEVICE_ID),
+                 c.get("circuitId") or c.get("circuitNo"),
+                 c.get("action"))
+                for c in data["commands"]
+            ]
+        else:
+            device_id = data.get("deviceId") or data.get("DeviceId", DEVICE_ID)
+            commands = [(device_id, cid, data.get("action")) for cid in data.get("circuitIds", [])]
+
+        if not commands:
+            return json_response({"error": "No commands given"}, 400)
+        if any(cid is None or str(action).lower() not in COMMAND_ACTIONS for _, cid, action in commands):
+            return json_response({"error": f"Each command needs a circuit ID and an action in {COMMAND_ACTIONS}"}, 400)
+        try:
+            commands = [(parse_id(d), parse_id(c), a) for d, c, a in commands]
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        handlers = {
+            "pause": pause_circuit,
+            "stop": stop_circuit,
+            "continue": continue_circuit,
+        }
+        results = dispatch_bulk(commands, handlers)
+        for r in results:
+            r["ok"] = "error" not in r
+        failed = sum(1 for r in results if not r["ok"])
+        return json_response({"results": results, "count": len(results), "failed": failed},
+                             207 if failed else 200)
+
+    except Exception as e:
+        logging.error(f"API bulk command error: {e}")
+        return json_response({"error": "Internal server error"}, 500)
+
+
 @app.route("/api/command/collect", methods=["POST"])
 def start_monitoring():
     global ACTIVE_CIRCUITS
@@ -740,6 +858,10 @@ def start_monitoring():
     # Validate circuit ID
     if not circuit:
         return json_response({"error": "Circuit ID is required"}, 400)
+    try:
+        circuit = parse_id(circuit)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
     
     # Send request to BTSAPI to start monitoring
     try:
@@ -750,51 +872,43 @@ def start_monitoring():
         if JWT_TOKEN:
             send_headers["Authorization"] = f"Bearer {JWT_TOKEN}"
         
-        # Build multipart payload
-        multipart = [
-            ("DeviceIDs", (None, str(DEVICE_ID))),
-            ("CircuitIds", (None, str(circuit))),
-            ("TimeDelay", (None, "1000"))
-        ]
-        
-        # Add DBC file (assuming a default file exists)
+        # Add DBC file (assuming a default file exists); streamed, not buffered
         dbc_file_path = os.path.join(BASE_DIR, "DBC_2.3kWh.dbc")
         if os.path.exists(dbc_file_path):
-            with open(dbc_file_path, "rb") as f:
-                multipart.append(("DBCFiles", ("DBC_2.3kWh.dbc", f, "application/octet-stream")))
+            result = dbc_upload.create_db_files(endpoint, [DEVICE_ID], [circuit], [dbc_file_path],
+                                                time_delay=1000, headers=send_headers, timeout=10)
+            resp = result["response"]
+            
+            if resp.status_code == 200:
+                response_data = resp.json()
+                # print(response_data)  # For debugging
+                # Extract metadata from response
+                circuit_metadata = {
+                    "circuit_id": circuit,
+                    "device_id": DEVICE_ID,
+                    "start_time": datetime.now(UTC).isoformat(),
+                    "status": "active"
+                }
                 
-                resp = requests.post(endpoint, headers=send_headers, files=multipart, timeout=10)
+                # Add file information if available
+                if "files" in response_data:
+                    for file_info in response_data["files"]:
+                        if str(circuit) in file_info.get("filePath", ""):
+                            circuit_metadata.update({
+                                "file_name": file_info.get("fileName", ""),
+                                "file_path": file_info.get("filePath", ""),
+                                "created_at": file_info.get("createdAt", "")
+                            })
+                            break
                 
-                if resp.status_code == 200:
-                    response_data = resp.json()
-                    # print(response_data)  # For debugging
-                    # Extract metadata from response
-                    circuit_metadata = {
-                        "circuit_id": circuit,
-                        "device_id": DEVICE_ID,
-                        "start_time": datetime.now(UTC).isoformat(),
-                        "status": "active"
-                    }
-                    
-                    # Add file information if available
-                    if "files" in response_data:
-                        for file_info in response_data["files"]:
-                            if str(circuit) in file_info.get("filePath", ""):
-                                circuit_metadata.update({
-                                    "file_name": file_info.get("fileName", ""),
-                                    "file_path": file_info.get("filePath", ""),
-                                    "created_at": file_info.get("createdAt", "")
-                                })
-                                break
-                    
-                    # Store circuit with metadata instead of just ID
-                    circuit = circuit_metadata
-                    # Start collecting for some files
-                    # sim.start_collect(circuit_metadata.get("file_name"))
-                    
-                else:
-                    logging.error(f"Failed to start monitoring via BTSAPI: {resp.status_code} - {resp.text}")
-                    return json_response({"error": "Failed to start monitoring"}, 500)
+                # Store circuit with metadata instead of just ID
+                circuit = circuit_metadata
+                # Start collecting for some files
+                # sim.start_collect(circuit_metadata.get("file_name"))
+                
+            else:
+                logging.error(f"Failed to start monitoring via BTSAPI: {resp.status_code} - {resp.text}")
+                return json_response({"error": "Failed to start monitoring"}, 500)
         else:
             logging.error(f"DBC file not found: {dbc_file_path}")
             return json_response({"error": "DBC file not found"}, 500)
@@ -802,7 +916,8 @@ def start_monitoring():
     except Exception as e:
         logging.error(f"Error starting monitoring via BTSAPI: {e}")
         return json_response({"error": "Failed to communicate with BTSAPI"}, 500)
-    ACTIVE_CIRCUITS.append(circuit)
+    with ACTIVE_CIRCUITS_LOCK:
+        ACTIVE_CIRCUITS.append(circuit)
     logging.info(f"Monitoring started for {ACTIVE_CIRCUITS}")
     return json_response({"message": f"Monitoring started for circuits ", "circuits": ACTIVE_CIRCUITS})
 
@@ -828,6 +943,41 @@ def update_thresholds():
     return json_response({"message": "Thresholds updated"})
 
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Live polling timings in Prometheus text format"""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route("/api/http-stats", methods=["GET"])
+def get_http_stats():
+    """Latency per device-API endpoint on the shared HTTP session"""
+    return json_response(http_client.latency_stats.snapshot())
+
+
+@app.route("/api/alarms", methods=["GET"])
+def get_alarms():
+    """Currently raised alarms and the loaded alarm rules"""
+    return json_response({
+        "active": rule_engine.active_alarms(),
+        "rules": [rule.spec for rule in rule_engine.rules],
+    })
+
+
+@app.route("/api/alarms/rules", methods=["POST"])
+def update_alarm_rules():
+    specs = request.get_json() or []
+    if not isinstance(specs, list):
+        return json_response({"error": "Expected a list of rules"}, 400)
+    rules = compile_rules(specs)
+    if len(rules) != len(specs):
+        return json_response({"error": "Invalid alarm rule in request"}, 400)
+    save_rules(specs)
+    rule_engine.set_rules(rules)
+    logging.info(f"Alarm rules updated: {len(rules)} rules")
+    return json_response({"message": "Alarm rules updated", "count": len(rules)})
+
+
 # =========================================================
 #  Demo Data Generation API Endpoints
 # =========================================================
@@ -837,13 +987,15 @@ def start_demo():
     try:
         data = request.get_json() or {}
         circuits_to_start = data.get("circuits", [1, 2, 3, 4, 5])  # Default circuits
+        try:
+            circuits_to_start = [parse_id(c) for c in circuits_to_start]
+        except (TypeError, ValueError) as e:
+            return json_response({"error": str(e)}, 400)
         
         global ACTIVE_CIRCUITS
         
-        # Clear existing circuits
-        ACTIVE_CIRCUITS = []
-        
-        # Add demo circuits to active list
+        # Demo circuits replace the active list
+        demo_circuits = []
         for circuit_id in circuits_to_start:
             circuit_metadata = {
                 "circuit_id": circuit_id,
@@ -854,7 +1006,7 @@ def start_demo():
                 "file_path": os.path.join(STORED_DBC_PATH, f"circuit_{circuit_id}.db"),
                 "demo": True
             }
-            ACTIVE_CIRCUITS.append(circuit_metadata)
+            demo_circuits.append(circuit_metadata)
             
             # Start demo data collection for this circuit
             if hasattr(sim, 'start_collect'):
@@ -864,6 +1016,8 @@ def start_demo():
                 except Exception as e:
                     logging.error(f"Error starting collection for circuit {circuit_id}: {e}")
         
+        with ACTIVE_CIRCUITS_LOCK:
+            ACTIVE_CIRCUITS = demo_circuits
         logging.info(f"Demo started for circuits: {circuits_to_start}")
         return json_response({
             "message": "Demo data generation started",
@@ -895,7 +1049,8 @@ def stop_demo():
                     logging.error(f"Error stopping collection for {file_name}: {e}")
         
         # Clear active circuits (remove demo circuits)
-        ACTIVE_CIRCUITS = [c for c in ACTIVE_CIRCUITS if not (isinstance(c, dict) and c.get("demo"))]
+        with ACTIVE_CIRCUITS_LOCK:
+            ACTIVE_CIRCUITS = [c for c in ACTIVE_CIRCUITS if not (isinstance(c, dict) and c.get("demo"))]
         
         stopped_circuits = [c.get("circuit_id") for c in demo_circuits if isinstance(c, dict)]
         
@@ -978,11 +1133,24 @@ def background_reader_thread():
         try:
             # Skip if no circuits are active
             if not ACTIVE_CIRCUITS:
+                if live_ring is not None:
+                    live_ring.write_payload({"circuits": []}, active=())
+                tail_reader.read(())  # detach stopped circuits' DBs
                 time.sleep(DATA_READ_INTERVAL)
                 continue
 
             # Read data from all active circuits
             payload = read_active_circuit_data(STORED_DBC_PATH, ACTIVE_CIRCUITS)
+            metrics.live_poll_seconds.observe(time.time() - start_time, stage="read")
+            if live_ring is not None:
+                # publish for the --ring-reader web processes
+                ring_start = time.perf_counter()
+                live_ring.write_payload(payload, device_id=DEVICE_ID, active=active_circuit_keys())
+                metrics.live_poll_seconds.observe(time.perf_counter() - ring_start, stage="ring_write")
+            if recent_history is not None:
+                history_start = time.perf_counter()
+                recent_history.append_payload(payload, device_id=DEVICE_ID)
+                metrics.live_poll_seconds.observe(time.perf_counter() - history_start, stage="history")
             # print(payload)  # For debugging
             # Only emit if we have valid data
             if payload and payload.get("circuits"):
@@ -993,7 +1161,15 @@ def background_reader_thread():
                     last_read_time = time.time()
                 # print("Payload to emit:", payload)  # For debugging
                 # Emit data to WebSocket clients
+                emit_start = time.perf_counter()
                 socketio.emit("live_data", payload)
+                metrics.live_poll_seconds.observe(time.perf_counter() - emit_start, stage="emit")
+                
+                # Windowed alarm rules (edge triggered: raised / cleared)
+                for alarm in rule_engine.process_payload(payload, device_id=DEVICE_ID):
+                    logging.warning(f"[ALARM] {alarm['state']} {alarm['rule_id']} "
+                                    f"circuit {alarm['circuit_id']}: {alarm['value']}")
+                    socketio.emit("alarm", alarm)
                 
                 # Check thresholds and trigger actions if needed
                 # check_thresholds_and_pause(payload)
@@ -1025,6 +1201,31 @@ def background_reader_thread():
             logging.warning(f"Reading took {elapsed:.3f}s, which exceeds {DATA_READ_INTERVAL}s interval")
 
 
+def active_circuit_keys():
+    with ACTIVE_CIRCUITS_LOCK:
+        return [(c.get("device_id", DEVICE_ID), c.get("circuit_id", c.get("id"))) if isinstance(c, dict)
+                else (DEVICE_ID, c) for c in ACTIVE_CIRCUITS]
+
+
+def ring_reader_thread():
+    """
+    --ring-reader processes: emit live data straight from the shared ring.
+    Circuits, alarms and commands stay with the process tailing the DBs.
+    """
+    while True:
+        start_time = time.perf_counter()
+        try:
+            payload = live_ring.snapshot()
+            metrics.live_poll_seconds.observe(time.perf_counter() - start_time, stage="ring_read")
+            if payload["circuits"]:
+                emit_start = time.perf_counter()
+                socketio.emit("live_data", payload)
+                metrics.live_poll_seconds.observe(time.perf_counter() - emit_start, stage="emit")
+        except Exception as e:
+            logging.error(f"Live ring reader error: {e}")
+        time.sleep(max(0, DATA_READ_INTERVAL - (time.perf_counter() - start_time)))
+
+
 def token_refresh_thread():
     while True:
         try:
@@ -1038,7 +1239,28 @@ def token_refresh_thread():
 #  Run App
 # =========================================================
 if __name__ == "__main__":
-    threading.Thread(target=background_reader_thread, daemon=True).start()
-    threading.Thread(target=token_refresh_thread, daemon=True).start()
-    logging.info("Starting Flask SocketIO Server on port 5001...")
-    socketio.run(app, host="0.0.0.0", port=5001, debug=True)
+    parser = argparse.ArgumentParser(description="BTS live circuit monitor")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--ring-reader", action="store_true",
+                        help="serve live data from the shared ring of a running monitor")
+    args = parser.parse_args()
+
+    if args.ring_reader:
+        RING_READER = True
+        live_ring = LiveRing.attach()
+        atexit.register(live_ring.close)
+        threading.Thread(target=ring_reader_thread, daemon=True).start()
+    else:
+        if LIVE_RING_ENABLED:
+            live_ring = LiveRing.create(columns=dbc_signal_names(os.path.join(BASE_DIR, "DBC_2.3kWh.dbc")))
+            atexit.register(live_ring.close)
+        threading.Thread(target=background_reader_thread, daemon=True).start()
+        threading.Thread(target=token_refresh_thread, daemon=True).start()
+        retention.start()
+        rollups.start()
+        if recent_history is not None:
+            recent_history.start()
+    device_registry.start()
+    logging.info(f"Starting Flask SocketIO Server on port {args.port}...")
+    # no reloader: its parent process would create (and tail into) a second ring
+    socketio.run(app, host="0.0.0.0", port=args.port, debug=True, use_reloader=False)
@@ -0,0 +1,235 @@
+"""
+Benchmark: end-to-end ingestion of tester export workbooks.
+
+Generates synthetic Sanity / CDC / HRD workbooks (benchmarks.synthetic_workbooks)
+and runs each through core.ingestion.IngestionPipeline with a stubbed config,
+PLC and DB, then reports per-file latency, files/min and the per-stage
+breakdown from core.metrics.
+
+Usage (from the project root):
+    python -m benchmarks.bench_ingestion --sanity 3 --cdc 1 --hrd 3
+    python -m benchmarks.bench_ingestion --files-dir /tmp/bts_files   # reuse generated files
+    python -m benchmarks.bench_ingestion --plc-latency 20 --db-latency 80 --repeat 2
+    python -m benchmarks.bench_ingestion --files-dir /tmp/bts_files --compare-scheduler
+"""
+import io
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+from core import metrics
+from core.ingestion import IngestionPipeline
+from core.ingest_scheduler import IngestionScheduler
+from benchmarks.synthetic_workbooks import generate_files, DEFAULT_ROWS, RECORD_COLUMNS
+
+SHEET_STEP_INDEX = 1
+SHEET_RECORD_INDEX = 3
+
+
+def synthetic_config(battery_type: str = "L3", charge_step: int = 2, discharge_step: int = 4):
+    """
+    Headers / Thresholds in the shape load_thresholds() returns from SQL Server
+    (all values as strings), pointing at the synthetic workbook columns.
+    """
+    assert "CellVolMinMaxDev" in RECORD_COLUMNS
+    record = str(SHEET_RECORD_INDEX)
+    headers = {
+        "Sheet_Name_Cell_Deviation": record, "Cell_Deviation": "CellVolMinMaxDev",
+        "Sheet_Name_Capacity": str(SHEET_STEP_INDEX), "Capacity": "Step Capacity(Ah)",
+        "Sheet_Name_Pack_Voltage": record, "Pack_Voltage": "PackVol",
+        "Sheet_Name_Max_Cell_Voltage": record, "Max_Cell_Voltage": "MaxCellVol",
+        "Sheet_Name_Min_Cell_Voltage": record, "Min_Cell_Voltage": "MinCellVol",
+        "Sheet_Name_Max_Cell_Temperature": record, "Max_Cell_Temperature": "MaxTemp",
+        "Sheet_Name_Min_Cell_Temperature": record, "Min_Cell_Temperature": "MinTemp",
+        "Sheet_Name_SOC": record, "SOC": "SOC",
+        "Sheet_Name_HRD": record, "HRD": "Resistance(Ω)",
+        "Sheet_Name_HRC": record, "HRC": "Resistance(Ω)",
+        "non_standard": "0",
+    }
+    metric_keys = ["Cell_Deviation", "Capacity", "Pack_Voltage", "Max_Cell_Voltage", "Min_Cell_Voltage",
+                   "Max_Cell_Temperature", "Min_Cell_Temperature", "SOC", "End_SOC", "temperature_difference"]
+    step_keys = ["cell_deviation_step", "capacity_step", "pack_voltage_step", "Max_Cell_Voltage_step",
+                 "Min_Cell_Voltage_step", "Max_Cell_Temperature_step", "Min_Cell_Temperature_step",
+                 "SOC_step", "temperature_difference_step"]
+
+    def mode_block(step):
+        block = {k: str(step) for k in step_keys + ["hrc_step", "hrd_step"]}
+        for key in metric_keys + ["hrc", "hrd"]:
+            block[f"{key}_min"] = "-100000"
+            block[f"{key}_max"] = "100000"
+        return block
+
+    thresholds = {
+        test: {"charge": mode_block(charge_step), "discharge": mode_block(discharge_step)}
+        for test in ("Sanity", "CDC")
+    }
+    return {
+        "Thresholds": {battery_type: thresholds},
+        "Headers": {battery_type: {"Sanity": dict(headers), "CDC": dict(headers)}},
+    }
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def run(files_dir, files, config, plc_latency=0.0, db_latency=0.0, repeat=1):
+    """
+    Processes every file `repeat` times; returns {test_type: [seconds]}.
+    """
+    sink_calls = defaultdict(int)
+
+    def fake_plc(device, channel, status):
+        sink_calls["plc"] += 1
+        if plc_latency:
+            time.sleep(plc_latency)
+
+    def fake_db(test_type, payload):
+        sink_calls["db"] += 1
+        if db_latency:
+            time.sleep(db_latency)
+
+    pipeline = IngestionPipeline(
+        load_config=lambda: config,
+        emit=lambda payload: sink_calls.__setitem__("emit", sink_calls["emit"] + 1),
+        send_to_plc=fake_plc,
+        send_to_database=fake_db,
+        previous_end_times=defaultdict(lambda: defaultdict(int)),
+    )
+
+    latencies = defaultdict(list)
+    failures = 0
+    for _ in range(repeat):
+        for name, test_type in files:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # the pipeline prints a lot
+                payload = pipeline.process_file(files_dir, name)
+            elapsed = time.perf_counter() - start
+            if not payload or payload["data_update"]["meta"]["test_type"] != test_type:
+                failures += 1
+            latencies[test_type].append(elapsed)
+    return latencies, failures, dict(sink_calls)
+
+
+def run_batch(files_dir, files, config, scheduled: bool):
+    """
+    Drops every file at once (a mixed batch) and returns {file: seconds from
+    detection to verdict}, either in listdir order or through the scheduler.
+    """
+    verdicts = {}
+    pipeline = IngestionPipeline(load_config=lambda: config,
+                                 previous_end_times=defaultdict(lambda: defaultdict(int)))
+    detected = time.perf_counter()
+
+    def process(base_path, name):
+        pipeline.process_file(base_path, name)
+        verdicts[name] = time.perf_counter() - detected
+
+    # one redirect for the whole batch: swapping sys.stdout per file is not thread-safe
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scheduled:
+            scheduler = IngestionScheduler(process)
+            scheduler.start()
+            for name, _ in files:
+                scheduler.submit(files_dir, name)
+            scheduler.wait_idle()
+        else:
+            for name, _ in sorted(files, key=lambda f: f[0]):
+                process(files_dir, name)
+    return verdicts
+
+
+def report_batch(files, fifo, scheduled):
+    types = dict(files)
+    print()
+    print(f"{'type':8s} {'listdir p50':>12s} {'scheduled p50':>14s} {'listdir max':>12s} {'scheduled max':>14s}")
+    for test_type in sorted(set(types.values())) + ["all"]:
+        names = [n for n, t in types.items() if test_type in ("all", t)]
+        a = [fifo[n] for n in names]
+        b = [scheduled[n] for n in names]
+        print(f"{test_type:8s} {percentile(a, 50):12.2f} {percentile(b, 50):14.2f} {max(a):12.2f} {max(b):14.2f}")
+
+
+def report(latencies, failures, sink_calls, wall):
+    print()
+    print(f"{'type':8s} {'files':>5s} {'mean s':>8s} {'p50 s':>8s} {'p95 s':>8s} {'max s':>8s} {'files/min':>10s}")
+    for test_type, values in latencies.items():
+        mean = sum(values) / len(values)
+        print(f"{test_type:8s} {len(values):5d} {mean:8.3f} {percentile(values, 50):8.3f} "
+              f"{percentile(values, 95):8.3f} {max(values):8.3f} {60 / mean:10.1f}")
+    total = sum(len(v) for v in latencies.values())
+    print(f"{'all':8s} {total:5d} {'':8s} {'':8s} {'':8s} {'':8s} {total / wall * 60:10.1f}")
+    print(f"failures: {failures}   sink calls: {sink_calls}")
+
+    print()
+    print("Per-stage mean (s):")
+    stages = metrics.ingest_stage_seconds.summary()
+    for (stage, test_type), s in sorted(stages.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+        print(f"  {test_type:7s} {stage:22s} {s['mean']:.4f}  (n={s['count']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workbook ingestion")
+    parser.add_argument("--sanity", type=int, default=2)
+    parser.add_argument("--cdc", type=int, default=1)
+    parser.add_argument("--hrd", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--sanity-rows", type=int, default=DEFAULT_ROWS["Sanity"])
+    parser.add_argument("--cdc-rows", type=int, default=DEFAULT_ROWS["CDC"])
+    parser.add_argument("--hrd-rows", type=int, default=DEFAULT_ROWS["HRD"])
+    parser.add_argument("--files-dir", help="reuse workbooks in this folder (generated if empty)")
+    parser.add_argument("--plc-latency", type=float, default=0.0, help="stub PLC write latency (ms)")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="stub DB write latency (ms)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--compare-scheduler", action="store_true",
+                        help="file-to-verdict times for one mixed batch: listdir order vs IngestionScheduler")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    files_dir = args.files_dir or tempfile.mkdtemp(prefix="bts_bench_")
+    cleanup = not args.files_dir
+
+    try:
+        existing = [f for f in os.listdir(files_dir) if f.endswith(".xlsx")] if os.path.isdir(files_dir) else []
+        if existing:
+            files = [(f, "HRD" if not f.rsplit("_", 1)[-1].startswith("M") else
+                      ("Sanity" if os.path.getsize(os.path.join(files_dir, f)) < 5000000 else "CDC"))
+                     for f in sorted(existing)]
+            print(f"Reusing {len(files)} workbooks in {files_dir}")
+        else:
+            print(f"Generating workbooks in {files_dir} ...")
+            t = time.perf_counter()
+            files = generate_files(
+                files_dir,
+                {"Sanity": args.sanity, "CDC": args.cdc, "HRD": args.hrd},
+                rows={"Sanity": args.sanity_rows, "CDC": args.cdc_rows, "HRD": args.hrd_rows},
+                steps=args.steps,
+            )
+            print(f"  {len(files)} files in {time.perf_counter() - t:.1f}s")
+
+        if args.compare_scheduler:
+            fifo = run_batch(files_dir, files, synthetic_config(), scheduled=False)
+            scheduled = run_batch(files_dir, files, synthetic_config(), scheduled=True)
+            report_batch(files, fifo, scheduled)
+            return
+
+        start = time.perf_counter()
+        latencies, failures, sink_calls = run(
+            files_dir, files, synthetic_config(),
+            plc_latency=args.plc_latency / 1000, db_latency=args.db_latency / 1000, repeat=args.repeat,
+        )
+        report(latencies, failures, sink_calls, time.perf_counter() - start)
+    finally:
+        if cleanup:
+            shutil.rmtree(files_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: latest row of every active circuit DB, one live tick.
+
+Compares the per-file reads (one connection + query per DB, sequential and
+on a thread pool) against core.db_reader.AttachedTailReader (DBs attached
+to a few connections, one UNION ALL query per group), then runs simulated
+1 s ticks where only --active-fraction of the circuits get a new row, to
+show what change detection skips.
+
+Usage (from the project root):
+    python -m benchmarks.bench_tail_reads --circuits 16 64 160 --rows 20000
+    python -m benchmarks.bench_tail_reads --active-fraction 0.1 --ticks 60
+"""
+import os
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import types
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from core import db_reader
+from core.db_reader import AttachedTailReader, get_schema
+from core.db_index import ensure_timestamp_index, tail_query
+from simulator.circuits import COLUMNS, TABLE_NAME
+
+
+def create_circuit_dbs(folder, circuits, rows):
+    """
+    RealTimeData_<device>_<circuit>_<ts>.db files in the simulator layout.
+    """
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    start = datetime(2026, 1, 1)
+    batch = [[(start + timedelta(seconds=i)).isoformat(sep=" ")] + [float(i % 100)] * (len(COLUMNS) - 1)
+             for i in range(rows)]
+    template = os.path.join(folder, "template.db")
+    conn = sqlite3.connect(template)
+    conn.execute(f"CREATE TABLE {TABLE_NAME} ({', '.join(f'{n} {t}' for n, t in COLUMNS)});")
+    conn.executemany(f"INSERT INTO {TABLE_NAME} VALUES ({placeholders});", batch)
+    conn.commit()
+    conn.close()
+    paths = []
+    for c in range(circuits):
+        path = os.path.join(folder, f"RealTimeData_{c // 16 + 1}_{c % 16 + 1}_20260101000000.db")
+        shutil.copyfile(template, path)
+        paths.append(path)
+    os.remove(template)
+    return paths
+
+
+def read_one(path):
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.cursor()
+        schema = get_schema(path, cursor)
+        mode = ensure_timestamp_index(path, schema.table_name)
+        row = cursor.execute(tail_query(schema.table_name, mode), (1,)).fetchone()
+        return schema.record(row) if row else None
+    finally:
+        conn.close()
+
+
+def per_file_sequential(paths):
+    return {path: read_one(path) for path in paths}
+
+
+def per_file_pool(paths, executor):
+    return dict(zip(paths, executor.map(read_one, paths)))
+
+
+def timed(label, fn, repeat):
+    fn()  # warm-up (schemas, index modes, attach)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    avg_ms = (time.perf_counter() - t0) / repeat * 1000
+    print(f"  {label:<40} {avg_ms:10.3f} ms/tick")
+    return avg_ms, result
+
+
+def append_rows(paths, tick):
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    for path in paths:
+        conn = sqlite3.connect(path)
+        conn.execute(f"INSERT INTO {TABLE_NAME} VALUES ({placeholders});",
+                     [f"2027-01-01 00:00:{tick % 60:02d}"] + [float(tick)] * (len(COLUMNS) - 1))
+        conn.commit()
+        conn.close()
+
+
+def simulated_ticks(paths, ticks, active_fraction):
+    """
+    Ticks on a simulated clock (1 s apart) where the first active_fraction
+    of the circuits write a row before every tick; only reads are timed.
+    """
+    clock = types.SimpleNamespace(now=1000.0)
+    db_reader.time = types.SimpleNamespace(monotonic=lambda: clock.now)
+    writers = paths[:max(1, int(len(paths) * active_fraction))]
+    reader, forced_reader = AttachedTailReader(), AttachedTailReader()
+    reader.read(paths)
+    forced_reader.read(paths)
+    per_file = forced = batched = 0.0
+    try:
+        for tick in range(ticks):
+            clock.now += 1.0
+            append_rows(writers, tick)
+            t0 = time.perf_counter()
+            expected = per_file_sequential(paths)
+            per_file += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            forced_reader.read(paths, force=True)
+            forced += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            records = reader.read(paths)
+            batched += time.perf_counter() - t0
+            for path in writers:
+                assert records[path].values == expected[path].values, "change-detected read missed a row"
+    finally:
+        db_reader.time = time
+        reader.close_groups()
+        forced_reader.close_groups()
+    print(f"  {len(writers)}/{len(paths)} circuits writing, {ticks} ticks")
+    print(f"  {'per file, sequential':<40} {per_file / ticks * 1000:10.3f} ms/tick")
+    print(f"  {'batched, every file every tick':<40} {forced / ticks * 1000:10.3f} ms/tick")
+    print(f"  {'batched, change-detected':<40} {batched / ticks * 1000:10.3f} ms/tick")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-circuit tail reads")
+    parser.add_argument("--circuits", type=int, nargs="+", default=[16, 64, 160])
+    parser.add_argument("--rows", type=int, default=20000, help="rows per circuit DB")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=30, help="simulated ticks for the change-detection run")
+    parser.add_argument("--active-fraction", type=float, default=0.25, help="share of circuits writing each tick")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bts_tail_")
+    try:
+        for n in args.circuits:
+            # fresh folder per size: index modes and schemas are cached per path
+            paths = create_circuit_dbs(tempfile.mkdtemp(dir=folder), n, args.rows)
+            print(f"{n} circuit DBs x {args.rows} rows")
+            sequential_ms, expected = timed("per file, sequential", lambda: per_file_sequential(paths), args.repeat)
+            with ThreadPoolExecutor(max_workers=min(n, 16)) as executor:
+                pool_ms, _ = timed("per file, thread pool (16)", lambda: per_file_pool(paths, executor), args.repeat)
+            reader = AttachedTailReader()
+            attach_ms, records = timed(f"ATTACH + UNION ALL ({reader.batch_size}/conn)",
+                                       lambda: reader.read(paths, force=True), args.repeat)
+            reader.close_groups()
+            assert {p: r.values for p, r in records.items()} == {p: r.values for p, r in expected.items()}, \
+                "batched rows differ from per-file reads"
+            print(f"  speedup vs sequential {sequential_ms / attach_ms:.1f}x, vs thread pool {pool_ms / attach_ms:.1f}x")
+            simulated_ticks(paths, args.ticks, args.active_fraction)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: tail / time-range reads on a large synthetic RealTimeData DB.
+
+Compares the old "ORDER BY timestamp DESC" tail read against ROWID order,
+a native timestamp index and the sidecar index.
+
+Usage (from the project root):
+    python -m benchmarks.bench_timestamp_index --rows 1000000
+"""
+import os
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from core import db_index
+
+
+def create_synthetic_db(db_path, rows, signals=20):
+    """
+    Creates a readings table shaped like the device DBs (no index on timestamp).
+    """
+    cols = ", ".join(f"sig_{i} REAL" for i in range(signals))
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE readings (timestamp TEXT, {cols});")
+    start = datetime(2026, 1, 1)
+    placeholders = ",".join("?" * (signals + 1))
+
+    batch = []
+    for i in range(rows):
+        ts = (start + timedelta(seconds=i)).isoformat()
+        batch.append([ts] + [random.random() * 100 for _ in range(signals)])
+        if len(batch) == 10000:
+            conn.executemany(f"INSERT INTO readings VALUES ({placeholders});", batch)
+            batch = []
+    if batch:
+        conn.executemany(f"INSERT INTO readings VALUES ({placeholders});", batch)
+    conn.commit()
+    conn.close()
+    return start
+
+
+def timed(label, fn, repeat=20):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    avg_ms = (time.perf_counter() - t0) / repeat * 1000
+    print(f"  {label:<45} {avg_ms:10.3f} ms")
+    return avg_ms
+
+
+def query(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="ts_index_bench_")
+    try:
+        db_path = os.path.join(work_dir, "RealTimeData_2_1_bench.db")
+        print(f"Creating {args.rows} rows in {db_path} ...")
+        t0 = time.perf_counter()
+        start = create_synthetic_db(db_path, args.rows)
+        print(f"  done in {time.perf_counter() - t0:.1f}s")
+
+        range_start = (start + timedelta(seconds=args.rows // 2)).isoformat()
+        range_end = (start + timedelta(seconds=args.rows // 2 + 600)).isoformat()
+        range_sql = "SELECT * FROM readings WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp DESC LIMIT 100;"
+
+        print("\nNo index:")
+        timed("tail, ORDER BY timestamp DESC LIMIT 1",
+              lambda: query(db_path, "SELECT * FROM readings ORDER BY timestamp DESC LIMIT 1;"), args.repeat)
+        timed("tail, ORDER BY ROWID DESC LIMIT 1",
+              lambda: query(db_path, db_index.tail_query("readings", db_index.INDEX_NONE), (1,)), args.repeat)
+        timed("10 min range scan", lambda: query(db_path, range_sql, (range_start, range_end)), args.repeat)
+
+        print("\nSidecar index:")
+        sidecar_dir = os.path.join(work_dir, "idx")
+        os.makedirs(sidecar_dir)
+        t0 = time.perf_counter()
+        sidecar = db_index.SidecarIndex(db_path, "readings", sidecar_folder=sidecar_dir)
+        sidecar.refresh()
+        print(f"  initial build{'':<32} {(time.perf_counter() - t0) * 1000:10.1f} ms")
+        timed("incremental refresh (no new rows)", sidecar.refresh, args.repeat)
+
+        def sidecar_range():
+            rowids = sidecar.rowids_between(range_start, range_end, 100)
+            placeholders = ",".join("?" * len(rowids))
+            return query(db_path, f"SELECT * FROM readings WHERE ROWID IN ({placeholders}) "
+                                  f"ORDER BY timestamp DESC;", rowids)
+        timed("10 min range via sidecar", sidecar_range, args.repeat)
+
+        print("\nNative index:")
+        t0 = time.perf_counter()
+        db_index.build_native_index(db_path, "readings")
+        print(f"  build_native_index{'':<27} {(time.perf_counter() - t0) * 1000:10.1f} ms")
+        mode = db_index.ensure_timestamp_index(db_path, "readings")
+        timed("tail, ORDER BY timestamp DESC LIMIT 1",
+              lambda: query(db_path, db_index.tail_query("readings", mode), (1,)), args.repeat)
+        timed("10 min range scan", lambda: query(db_path, range_sql, (range_start, range_end)), args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
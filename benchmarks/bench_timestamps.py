@@ -0,0 +1,57 @@
+"""
+Benchmark: tester timestamp parsing, per-value inference vs core.timestamps.
+
+Usage (from the project root):
+    python -m benchmarks.bench_timestamps --rows 16000
+"""
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from core.timestamps import FormatCache
+
+
+def legacy_parse(values):
+    """
+    The old safe_step_time path: swap the last ':' for '.' and infer per value.
+    """
+    def normalize_time(t):
+        if t.count(":") >= 3:
+            return t[::-1].replace(":", ".", 1)[::-1]
+        return t
+    return [pd.to_datetime(normalize_time(v), errors="coerce") for v in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timestamp parsing")
+    parser.add_argument("--rows", type=int, default=16000)
+    parser.add_argument("--files", type=int, default=5, help="files per device (format cached after the first)")
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 3, 0, 21, 25)
+    values = [(start + timedelta(seconds=i, microseconds=i * 37 % 1000000)).strftime("%Y-%m-%d %H:%M:%S:%f")
+              for i in range(args.rows)]
+
+    t = time.perf_counter()
+    legacy = legacy_parse(values)
+    legacy_s = time.perf_counter() - t
+
+    cache = FormatCache()
+    timings = []
+    for _ in range(args.files):
+        t = time.perf_counter()
+        parsed = cache.parse(values, key=(5, "Absolute time"))
+        timings.append(time.perf_counter() - t)
+
+    assert list(parsed) == legacy, "parsed timestamps differ from the legacy path"
+    print(f"{args.rows} values")
+    print(f"  per-value inference:      {legacy_s:8.3f}s")
+    print(f"  vectorized, first file:   {timings[0]:8.3f}s  (format detection included)")
+    print(f"  vectorized, cached files: {sum(timings[1:]) / max(1, len(timings) - 1):8.3f}s")
+    print(f"  speedup: {legacy_s / timings[0]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: compressed in-memory history (core.tsdb.RecentHistory).
+
+Feeds simulated 1 Hz live_data payloads (simulator signal model plus
+--status-signals mostly constant DBC status / flag signals per circuit)
+into the store, then reports append cost per tick, compression throughput,
+bytes per value, the projected memory of TSDB_RETENTION_HOURS for the
+whole fleet, and query latency for one circuit.
+
+Usage (from the project root):
+    python -m benchmarks.bench_tsdb --circuits 64 --minutes 20
+    python -m benchmarks.bench_tsdb --circuits 8 --minutes 60 --status-signals 120
+"""
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import TSDB_RETENTION_HOURS, TSDB_MEMORY_CAP_MB
+from core.tsdb import RecentHistory
+from simulator.circuits import COLUMNS, CircuitSignal
+
+SIGNALS = [name for name, _ in COLUMNS[1:]]
+
+
+class StatusSignals:
+    """
+    Contactor states, fault flags, counters: constant most of the time.
+    """
+
+    def __init__(self, count, seed):
+        self.rng = random.Random(seed)
+        self.values = [float(self.rng.randint(0, 3)) for _ in range(count)]
+
+    def sample(self):
+        if self.rng.random() < 0.05:
+            i = self.rng.randrange(len(self.values))
+            self.values[i] = float(self.rng.randint(0, 3))
+        return self.values
+
+
+def payloads(circuits, seconds, status_count):
+    models = [(CircuitSignal(seed=c), StatusSignals(status_count, seed=c)) for c in range(circuits)]
+    status_names = [f"Status{i:03d}" for i in range(status_count)]
+    start = datetime(2026, 1, 1, 8)
+    for tick in range(seconds):
+        stamp = (start + timedelta(seconds=tick)).isoformat(sep=" ", timespec="milliseconds")
+        batch = []
+        for c, (signal, status) in enumerate(models):
+            values = signal.sample(1.0)[1:]
+            row = {"circuit_id": c + 1, "timestamp": stamp}
+            row.update(zip(SIGNALS, values))
+            row.update(zip(status_names, status.sample()))
+            batch.append(row)
+        yield {"circuits": batch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compressed recent-history store")
+    parser.add_argument("--circuits", type=int, default=64)
+    parser.add_argument("--minutes", type=int, default=20, help="simulated minutes at 1 Hz")
+    parser.add_argument("--status-signals", type=int, default=80, help="mostly constant signals per circuit")
+    args = parser.parse_args()
+
+    history = RecentHistory(memory_cap_mb=1 << 20)  # no cap: measure the natural size
+    seconds = args.minutes * 60
+    signals = len(SIGNALS) + args.status_signals
+    append_time = 0.0
+    for payload in payloads(args.circuits, seconds, args.status_signals):
+        t0 = time.perf_counter()
+        history.append_payload(payload, device_id=1)
+        append_time += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    history.compact()
+    compact_time = time.perf_counter() - t0
+    status = history.status()
+
+    values = status["samples_appended"] * (signals + 1)
+    print(f"{args.circuits} circuits x {signals} signals, {args.minutes} min at 1 Hz ({values:,} values)")
+    print(f"  append                {append_time / seconds * 1000:10.3f} ms/tick")
+    print(f"  compress              {compact_time / max(values, 1) * 1e9:10.1f} ns/value "
+          f"({compact_time / seconds * 1000:.2f} ms per second of data)")
+    print(f"  compressed            {status['bytes_per_value']:10.3f} bytes/value (raw float64: 8)")
+    projected = status["bytes_per_value"] * 3600 * TSDB_RETENTION_HOURS * (signals + 1) / 2 ** 20
+    print(f"  {TSDB_RETENTION_HOURS} h projection      {projected:10.1f} MB per circuit, "
+          f"{projected * 64:.0f} MB for 64 circuits (cap {TSDB_MEMORY_CAP_MB} MB)")
+
+    for label, start in (("last 5 min", seconds - 300), ("whole range", 0)):
+        since = datetime(2026, 1, 1, 8) + timedelta(seconds=max(start, 0))
+        t0 = time.perf_counter()
+        times, columns = history.query(1, 1, start=since)
+        elapsed = time.perf_counter() - t0
+        assert len(times) and all(len(v) == len(times) for v in columns.values())
+        print(f"  query {label:<15} {elapsed * 1000:10.1f} ms ({len(times)} samples x {len(columns)} signals)")
+    t0 = time.perf_counter()
+    times, columns = history.query(1, 1, signals=["PackVol", "SOC"])
+    print(f"  query 2 signals       {(time.perf_counter() - t0) * 1000:10.1f} ms ({len(times)} samples)")
+    assert not np.isnan(columns["SOC"]).any()
+
+
+if __name__ == "__main__":
+    main()
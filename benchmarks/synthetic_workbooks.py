@@ -0,0 +1,255 @@
+"""
+Synthetic tester export workbooks shaped like data_files/Raw_file Mooving.
+
+Each workbook has the five sheets of a real export (Start Information,
+Step layer data, Loop layer data, Record layer data, Log information) with
+the same column layout; row count, step count and file naming are
+configurable so Sanity, CDC and HRD files can be produced on demand.
+
+Usage (from the project root):
+    python -m benchmarks.synthetic_workbooks --out /tmp/bts_files --sanity 3 --cdc 1 --hrd 3
+"""
+import os
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from openpyxl import Workbook
+
+SHEET_START = "Start Information"
+SHEET_STEP = "Step layer data"
+SHEET_LOOP = "Loop layer data"
+SHEET_RECORD = "Record layer data"
+SHEET_LOG = "Log information"
+
+STEP_COLUMNS = [
+    "Loop number", "Step Number", "Step number", "Step Type", "Step Run Time",
+    "Start Absolute Time", "End Absolute Time", "Start Voltage(V)", "End Voltage(V)",
+    "Mid Voltage(V)", "Average Voltage(V)", "Start Current(A)", "End Current(A)",
+    "Start Temperature", "End Temperature", "Step Capacity(Ah)", "End Capacity(Ah)",
+    "Step Energy(Wh)", "End Energy(Wh)", "Constant Current Time",
+    "Constant Current Capacity(Ah)", "NG  judge",
+] + [f"{src} {name}" for src in ("BMS", "AUX") for name in (
+    "BMS SUM VOL", "BMS Max V", "BMS  Min V", "BMS ΔV", "BMS Max T", "BMS Min T", "BMS ΔT",
+    "Total Current", "SOC", "BMS Max V No.", "BMS  Min V No.", "BMS Max T No.", "BMS Min T No.")]
+
+LOOP_COLUMNS = [
+    "Loop number", "Charge Capacity(Ah)", "Discharge Capacity(Ah)", "Charge Time",
+    "Discharge Time", "Discharge MidVoltage(V)", "Charge Energy(Wh)", "Discharge Energy(Wh)",
+    "Constant Current Charge Ratio", "Constant Current Charge Capacity(Ah)",
+    "Charge Start Voltage(V)", "Charge End Voltage(V)", "Discharge Start Voltage(V)",
+    "Discharge End Voltage(V)", "DischargeCapReductionRatio", "chgAndDchgEfficiency",
+]
+
+RECORD_COLUMNS = (
+    ["Record number", "Run time", "Loop number", "Step Number", "Step Type", "Step time",
+     "Voltage(V)", "Current(A)", "Temperature(℃)", "Capacity(Ah)", "Power(W)", "Energy(Wh)",
+     "Resistance(Ω)", "Absolute time"]
+    + [f"CellVol{i:02d}" for i in range(1, 17)]
+    + ["AvgCellVol", "MaxCellVol", "MinCellVol", "MaxVoltId", "MinVoltId", "PackCurr", "PackVol",
+       "MaxTemp", "MinTemp", "MaxTempId", "MinTempId", "CellVolMinMaxDev", "CycleCount", "SOC",
+       "SOCAh", "SOH", "FetTemp", "BmsStatus", "CellUnderVolProt", "CellOverVolProt",
+       "PackUnderVolProt", "PackOverVolProt", "ChgUnderTempProt", "ChgOverTempProt",
+       "DchgUnderTempProt", "DchgOverTempProt", "CellOverDevProt", "BattLowSocWarn",
+       "ChgOverCurrProt", "DchgOverCurrProt", "CellUnderVolWarn", "CellOverVolWarn", "FetTempProt",
+       "ResSocProt", "FetFailure", "TempSenseFault", "PackUnderVolWarn", "PackOverVolWarn",
+       "ChgUnderTempWarn", "ChgOverTempWarn", "DchgUnderTempWarn", "DchgOverTempWarn", "LedStatus",
+       "CellBalStatus", "PreChgFetStatus", "ChgFetStatus", "DchgFetStatus", "ResStatus",
+       "ShortCktProt", "DschgPeakProt", "CellVol17", "CellVol18", "HwVer", "FwVer"]
+    + [f"Temp{i}" for i in range(1, 9)]
+    + ["Ref_Volt", "V3_3_ref", "V5_ref", "V12_ref"]
+)
+
+# Step plan of the sample "Mooving Sanity recipe", repeated for more steps
+STEP_CYCLE = ["Rest", "CCCV Chg", "Rest", "CC DChg"]
+
+# Sizes that land on the right side of app.py's 5 MB Sanity/CDC split
+DEFAULT_ROWS = {"Sanity": 5000, "CDC": 16000, "HRD": 3000}
+
+
+def _duration(seconds):
+    ms = int(round(seconds * 1000))
+    h, rem = divmod(ms, 3600000)
+    m, rem = divmod(rem, 60000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}:{ms:03d}"
+
+
+def _stamp(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _device_stamp(dt):
+    # tester format: "2026-01-03 00:21:25:363800"
+    return dt.strftime("%Y-%m-%d %H:%M:%S:%f")
+
+
+def battery_id_for(test_type: str, index: int, battery_type: str = "L3"):
+    """
+    IDs follow the real naming so app.py derives the same test/battery type:
+    Sanity/CDC start with "M" (type = chars 1-2), HRD type = chars 2-3.
+    """
+    if test_type == "HRD":
+        return f"XX{battery_type}AJVLOB{index:05d}"
+    return f"M{battery_type}AJVLOBA{index:05d}"
+
+
+def file_name_for(start: datetime, device_id, channel, battery_id):
+    return f"{start.strftime('%Y-%m-%d %H-%M-%S')}_{device_id}-{channel}_{battery_id}.xlsx"
+
+
+def build_records(rows: int, steps: int, start: datetime, seed: int = 0):
+    """
+    Record layer rows (1 s interval) spread evenly over the steps, plus the
+    per-step (first index, last index) boundaries.
+    """
+    rng = np.random.default_rng(seed)
+    step_of_row = np.minimum((np.arange(rows) * steps) // max(rows, 1) + 1, steps)
+    charging = np.isin(step_of_row, [i + 1 for i in range(steps) if STEP_CYCLE[i % 4] == "CCCV Chg"])
+    discharging = np.isin(step_of_row, [i + 1 for i in range(steps) if STEP_CYCLE[i % 4] == "CC DChg"])
+
+    current = np.where(charging, 16.0, np.where(discharging, -25.0, 0.0)) + rng.normal(0, 0.05, rows)
+    soc = np.clip(20 + np.cumsum(np.where(charging, 0.02, np.where(discharging, -0.03, 0.0))), 0, 100)
+    cells = 3.3 + soc[:, None] * 0.008 + rng.normal(0, 0.003, (rows, 16))
+    temps = 20 + soc[:, None] * 0.1 + rng.normal(0, 0.3, (rows, 8))
+    pack = cells.sum(axis=1)
+    return {
+        "step": step_of_row,
+        "current": current,
+        "soc": soc,
+        "cells": cells,
+        "temps": temps,
+        "pack": pack,
+        "capacity": np.cumsum(np.abs(current)) / 3600,
+        "resistance": 20 + rng.normal(0, 0.5, rows),
+        "times": [start + timedelta(seconds=i, microseconds=int(rng.integers(0, 999999))) for i in range(rows)],
+    }
+
+
+def write_workbook(path: str, test_type: str, rows: int, steps: int = 5, start: datetime = None,
+                   device_id=5, channel=1, battery_id="ML3AJVLOBA00001", seed: int = 0):
+    """
+    Writes one synthetic export workbook to `path`.
+    """
+    start = start or datetime(2026, 1, 3, 0, 16, 17)
+    rec = build_records(rows, steps, start, seed)
+    end = rec["times"][-1]
+
+    wb = Workbook(write_only=True)
+
+    # Start Information
+    ws = wb.create_sheet(SHEET_START)
+    ws.append(["Barcode", battery_id, None, "Step Name", f"Synthetic {test_type} recipe"])
+    ws.append(["Device-Chanel", f"{device_id}-{channel}", None, "Batch", start.strftime("%Y%m%d%H%M%S")])
+    ws.append(["Start Time", _stamp(start), None, "End Time", _stamp(end)])
+    ws.append(["IP", "192.168.1.105", None, "Parallel connection", 1])
+    ws.append([])
+    ws.append(["Step Number", "Step Name", "Param Name", "Param Value", "Cut-off condition", "Operator"])
+    for i in range(steps):
+        ws.append([i + 1, STEP_CYCLE[i % 4], None, None, "Time", "="])
+
+    # Step layer data
+    ws = wb.create_sheet(SHEET_STEP)
+    ws.append(STEP_COLUMNS)
+    for i in range(steps):
+        idx = np.flatnonzero(rec["step"] == i + 1)
+        if idx.size == 0:
+            continue
+        first, last = idx[0], idx[-1]
+        t0, t1 = rec["times"][first], rec["times"][last]
+        step_cap = float(np.abs(rec["current"][idx]).sum() / 3600)
+        row = [1, i + 1, i + 1, STEP_CYCLE[i % 4], _duration((t1 - t0).total_seconds()),
+               _stamp(t0), _stamp(t1), float(rec["pack"][first]), float(rec["pack"][last]), 0,
+               float(rec["pack"][idx].mean()), float(rec["current"][first]), float(rec["current"][last]),
+               20, 20, step_cap, step_cap, step_cap * 52, step_cap * 52, "00:00:00:000", 0, "Pass"]
+        ws.append(row + [0] * (len(STEP_COLUMNS) - len(row)))
+
+    # Loop layer data
+    ws = wb.create_sheet(SHEET_LOOP)
+    ws.append(LOOP_COLUMNS)
+    ws.append([1] + [0] * (len(LOOP_COLUMNS) - 1))
+
+    # Record layer data
+    ws = wb.create_sheet(SHEET_RECORD)
+    ws.append(RECORD_COLUMNS)
+    extra = len(RECORD_COLUMNS) - 14 - 16 - 12 - 8 - 4
+    for i in range(rows):
+        cells = rec["cells"][i]
+        temps = rec["temps"][i]
+        step = int(rec["step"][i])
+        cur = float(rec["current"][i])
+        pack = float(rec["pack"][i])
+        row = [i + 1, _duration(i), 1, step, STEP_CYCLE[(step - 1) % 4], _duration(i),
+               pack, cur, float(temps[0]), float(rec["capacity"][i]), pack * cur, 0,
+               float(rec["resistance"][i]), _device_stamp(rec["times"][i])]
+        row += cells.round(4).tolist()
+        cmax, cmin = float(cells.max()), float(cells.min())
+        row += [float(cells.mean()), cmax, cmin, int(cells.argmax()) + 1, int(cells.argmin()) + 1,
+                cur, pack, float(temps.max()), float(temps.min()), int(temps.argmax()) + 1,
+                int(temps.argmin()) + 1, round((cmax - cmin) * 1000, 1)]
+        row += [0] * extra
+        row += temps.round(2).tolist()
+        row += [2.5, 3.3, 5.0, 12.0]
+        # SOC sits at a fixed position in the real layout
+        row[RECORD_COLUMNS.index("SOC")] = float(rec["soc"][i])
+        ws.append(row)
+
+    # Log information
+    ws = wb.create_sheet(SHEET_LOG)
+    ws.append(["NO.", "RecordNumber", "Time", "Event", "EventValue"])
+    ws.append([1, 1, start.strftime("%d-%m-%Y %H:%M:%S"), "Start", 0])
+    ws.append([2, rows, end.strftime("%d-%m-%Y %H:%M:%S"), "End", 0])
+
+    wb.save(path)
+    return path
+
+
+def generate_files(out_dir: str, counts: dict, rows: dict = None, steps: int = 5,
+                   battery_type: str = "L3", device_id=5, seed: int = 0):
+    """
+    Writes counts = {"Sanity": n, "CDC": n, "HRD": n} workbooks to out_dir and
+    returns [(file name, test type)]. Channels rotate 1..16.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = {**DEFAULT_ROWS, **(rows or {})}
+    start = datetime(2026, 1, 3, 0, 0, 0)
+    files = []
+    index = 0
+    for test_type, count in counts.items():
+        for _ in range(count):
+            index += 1
+            battery_id = battery_id_for(test_type, index, battery_type)
+            channel = (index - 1) % 16 + 1
+            file_start = start + timedelta(hours=2 * index)
+            name = file_name_for(file_start, device_id, channel, battery_id)
+            write_workbook(os.path.join(out_dir, name), test_type, rows[test_type], steps,
+                           file_start, device_id, channel, battery_id, seed + index)
+            files.append((name, test_type))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic tester export workbooks")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--sanity", type=int, default=1)
+    parser.add_argument("--cdc", type=int, default=1)
+    parser.add_argument("--hrd", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--sanity-rows", type=int, default=DEFAULT_ROWS["Sanity"])
+    parser.add_argument("--cdc-rows", type=int, default=DEFAULT_ROWS["CDC"])
+    parser.add_argument("--hrd-rows", type=int, default=DEFAULT_ROWS["HRD"])
+    args = parser.parse_args()
+
+    files = generate_files(
+        args.out,
+        {"Sanity": args.sanity, "CDC": args.cdc, "HRD": args.hrd},
+        rows={"Sanity": args.sanity_rows, "CDC": args.cdc_rows, "HRD": args.hrd_rows},
+        steps=args.steps,
+    )
+    for name, test_type in files:
+        size = os.path.getsize(os.path.join(args.out, name))
+        print(f"{test_type:7s} {size / 1e6:7.2f} MB  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,30 @@ API_BASE_URL = "http://localhost:5000"  # Replace with your device API base if d
 # Default device ID (used for internal testing/demo)
 DEFAULT_DEVICE_ID = 2
 
+# Device registry cache (device list / IPs served from memory)
+DEVICE_CACHE_TTL = 60  # seconds before cached devices count as stale
+DEVICE_REFRESH_INTERVAL = 30  # background refresh period (seconds)
+
+# Shared HTTP session (keep-alive connection pool to the device API)
+HTTP_POOL_CONNECTIONS = 4  # distinct hosts kept in the pool
+HTTP_POOL_MAXSIZE = 32  # open connections per host (size for command bursts)
+HTTP_RETRIES = 3  # connection errors always, 502/503/504 only on idempotent calls
+HTTP_BACKOFF_FACTOR = 0.2  # 0.2s, 0.4s, 0.8s between retries
+BULK_COMMAND_WORKERS = 16  # parallel commands in one bulk request (keep <= HTTP_POOL_MAXSIZE)
+
+# Result PLC (Modbus TCP) that receives PASS / FAIL per channel
+PLC_HOST = "192.168.205.161"
+PLC_PORT = 502  # use SIMULATOR_MODBUS_PORT with host 127.0.0.1 against python -m simulator
+
+# (connect, read) timeouts in seconds per endpoint group
+HTTP_TIMEOUTS = {
+    "default": (3.05, 10),
+    "auth": (3.05, 10),
+    "device": (3.05, 5),
+    "command": (3.05, 5),
+    "upload": (3.05, 30),
+}
+
 # =========================================================
 # 3️⃣ Database Configuration
 # =========================================================
@@ -42,6 +66,53 @@ DEFAULT_DEVICE_ID = 2
 STORED_DBC_PATH = os.path.join(BASE_DIR, "Publish_17_10", "StoredDbcs")
 os.makedirs(STORED_DBC_PATH, exist_ok=True)
 
+# DBC uploads (create-db-files): streamed in chunks, de-duplicated by SHA-256
+DBC_UPLOAD_CHUNK = 64 * 1024
+DBC_REGISTRY_FILE = os.path.join(BASE_DIR, "Publish_17_10", "dbc_uploads.json")
+# Form field for referencing an already uploaded DBC by hash; None = device
+# API has no such field, so every create-db-files call carries the DBC file
+DBC_REUSE_FIELD = None
+
+# Timestamp index handling for the per-circuit RealTimeData_*.db files
+#   "auto"    -> build the index inside the DB when writable (background thread;
+#                the build holds the DB's write lock, stalling the device writer
+#                once per DB), sidecar until then
+#   "sidecar" -> never modify device DBs, always keep a sidecar index DB
+#   "off"     -> no index management (tail reads still use ROWID order)
+TIMESTAMP_INDEX_MODE = "sidecar"
+
+# How readers open the device-written circuit DBs (core.db_connect): read-only,
+# memory-mapped, retrying SQLITE_BUSY themselves so contention is measured.
+READER_MMAP_SIZE = 256 * 1024 * 1024  # bytes mapped per DB file; 0 disables mmap
+READER_CACHE_KB = 8 * 1024  # page cache per DB file and connection
+READER_BUSY_TIMEOUT = 2.0  # seconds a read keeps retrying while the writer holds the lock
+
+# Folder for sidecar timestamp index DBs (one <db name>.tsidx per circuit DB)
+INDEX_SIDECAR_PATH = os.path.join(BASE_DIR, "Publish_17_10", "Indexes")
+os.makedirs(INDEX_SIDECAR_PATH, exist_ok=True)
+
+# Retention of finished circuit DBs
+# Finished DBs are compacted into Parquet archives partitioned as
+#   ARCHIVE_PATH/device=<id>/date=<YYYY-MM-DD>/<db name>.parquet
+ARCHIVE_PATH = os.path.join(BASE_DIR, "Publish_17_10", "Archive")
+os.makedirs(ARCHIVE_PATH, exist_ok=True)
+
+# What happens to the original .db once its archive is verified:
+#   "delete" | "move" (to RETENTION_MOVE_PATH) | "keep"
+RETENTION_ORIGINAL_ACTION = "move"
+RETENTION_MOVE_PATH = os.path.join(BASE_DIR, "Publish_17_10", "Finished")
+
+# A DB that is not monitored and not written for this long counts as finished
+RETENTION_IDLE_MINUTES = 60
+RETENTION_SWEEP_INTERVAL = 600  # seconds between idle-file sweeps
+ARCHIVE_COMPRESSION = "zstd"
+
+# Per-minute / per-step signal rollups (core.rollups), kept as <db name>.rollup
+# in INDEX_SIDECAR_PATH; they outlive the original DB once it is archived.
+ROLLUP_INTERVAL = 10  # seconds between incremental rollup passes over the monitored DBs
+ROLLUP_BATCH_ROWS = 20000  # raw rows read per batch (one sidecar transaction each)
+ROLLUP_STEP_COLUMNS = ("stepno", "step_no", "step", "stepnumber")  # lower-cased step column names
+
 # =========================================================
 # 4️⃣ Data Handling and Interval Settings
 # =========================================================
@@ -51,12 +122,65 @@ DATA_READ_INTERVAL = 1  # every 1 second
 # Threading configurations
 MAX_CIRCUITS = 16  # maximum circuits running simultaneously
 THREAD_POOL_SIZE = min(MAX_CIRCUITS, 16)
+LIVE_ATTACH_BATCH = 10  # circuit DBs attached per connection for the batched tail read (SQLite default limit)
+# Change-detected live polling: a circuit DB is only queried when due and
+# its file (or WAL) changed; the interval follows the device's write rate.
+LIVE_POLL_MIN_INTERVAL = DATA_READ_INTERVAL
+LIVE_POLL_MAX_INTERVAL = 10  # seconds, for paused / finished circuits
+LIVE_POLL_BACKOFF = 1.5  # interval growth per poll that found nothing new
+LIVE_POLL_SMOOTHING = 0.3  # weight of the latest gap in the learned write interval
+LIVE_POLL_VERIFY_SECONDS = 5  # confirm unchanged-looking files with PRAGMA data_version
+
+# Shared-memory ring of live circuit samples (core.live_ring). The process
+# that tails the circuit databases writes it; extra web processes started
+# with `python app_old.py --ring-reader --port <port>` serve live data from
+# it without opening the SQLite files.
+LIVE_RING_ENABLED = True
+LIVE_RING_NAME = "bts_live_ring"
+LIVE_RING_SLOTS = 160  # circuits tracked at once
+LIVE_RING_CAPACITY = 300  # samples kept per circuit (5 min at 1 Hz)
+LIVE_RING_MAX_COLUMNS = 64  # float32 columns (DBC signals + table columns)
+LIVE_RING_DIRECTORY_BYTES = 64 * 1024  # JSON schema + slot -> circuit map
+
+# Compressed in-memory history of the live samples (core.tsdb) for chart
+# loads without SQLite reads: Gorilla-style timestamp / float compression.
+TSDB_ENABLED = True
+TSDB_RETENTION_HOURS = 6  # ~1.9 bytes per value: ~4 MB per circuit-hour at 100 signals
+TSDB_MEMORY_CAP_MB = 300  # above this the oldest chunks (any circuit) are evicted
+TSDB_CHUNK_SAMPLES = 240  # samples per compressed chunk (4 min at 1 Hz)
+TSDB_COMPACT_INTERVAL = 5  # seconds between compression passes (off the live thread)
+
+# Tester export folder watched for battery result workbooks (<folder>/<YYYY-MM-DD>/*.xlsx)
+INGEST_FILE_PATH = "D:\\EXPORT DATA\\1"
+
+# Where workbook ingestion runs:
+#   "process" -> separate daemon (python -m core.ingest_daemon) publishing results
+#                to the web process over INGEST_IPC_ADDRESS
+#   "thread"  -> inside the web process, as before
+INGEST_MODE = "process"
+INGEST_SPAWN_DAEMON = True  # app.py starts the daemon itself in "process" mode
+INGEST_IPC_ADDRESS = ("127.0.0.1", 5012)  # local TCP (works on Windows, unlike Unix sockets)
+INGEST_IPC_AUTHKEY_ENV = "BTS_INGEST_AUTHKEY"  # shared secret; app.py sets a random one for the daemon it spawns
+INGEST_IPC_BACKLOG = 500  # events kept while no web process is connected
+INGEST_STATUS_INTERVAL = 5  # seconds between queue / metrics snapshots from the daemon
+
+# Ingestion scheduler for exported battery workbooks
+# Cost is estimated as file size x seconds-per-MB of its test type (learned
+# from finished files); cheap files go to the fast lane so their PLC verdicts
+# are not stuck behind a large CDC workbook.
+INGEST_FAST_WORKERS = 1  # workers that only take fast-lane files
+INGEST_BULK_WORKERS = 1  # workers for large files (take ready fast files first)
+INGEST_FAST_LANE_MAX_SECONDS = 8  # estimated cost above this goes to the bulk lane
+INGEST_SECONDS_PER_MB = {"Sanity": 2.0, "CDC": 2.0, "HRD": 1.5}  # starting estimates
+INGEST_COST_SMOOTHING = 0.2  # weight of each finished file in the learned estimate
+INGEST_MAX_WAIT_SECONDS = 300  # a file waiting this long is taken before cheaper ones
 
 # =========================================================
 # 5️⃣ Security and JWT Configuration
 # =========================================================
 JWT_EXPIRY_HOURS = 24  # Token validity duration
 REFRESH_BEFORE_EXPIRY_MINUTES = 10  # When to auto-refresh before expiry
+TOKEN_REFRESH_RETRY_SECONDS = 15  # retry interval after a failed background refresh
 
 # =========================================================
 # 6️⃣ Threshold Configuration
@@ -73,6 +197,16 @@ DEFAULT_THRESHOLDS = {
     "resistance": 1000.0,
 }
 
+# Auto-pause dispatcher (one pause per excursion)
+PAUSE_TRIP_SAMPLES = 2  # consecutive over-limit samples before a pause is sent
+PAUSE_CLEAR_SAMPLES = 5  # consecutive samples below the hysteresis band to re-arm
+PAUSE_HYSTERESIS = 0.02  # band below the limit (fraction of |limit|) that still counts as hot
+PAUSE_RETRY_SECONDS = 5  # wait before retrying a failed pause
+PAUSE_DISPATCH_WORKERS = 8
+
+# Streaming alarm rules (rate-of-change, rolling windows, duration, cross-signal)
+RULES_FILE = os.path.join(BASE_DIR, "rules.json")
+
 # =========================================================
 # 7️⃣ Database Export Settings
 # =========================================================
@@ -80,6 +214,15 @@ DEFAULT_THRESHOLDS = {
 EXPORT_PATH = os.path.join(BASE_DIR, "exports")
 os.makedirs(EXPORT_PATH, exist_ok=True)
 
+# Local analytics store for test results (Parquet parts partitioned by date)
+ANALYTICS_PATH = os.path.join(BASE_DIR, "analytics")
+os.makedirs(ANALYTICS_PATH, exist_ok=True)
+ANALYTICS_FLUSH_ROWS = 50  # results buffered before a part file is written
+ANALYTICS_FLUSH_SECONDS = 300  # ... or after this long, whichever comes first
+ANALYTICS_COMPACT_INTERVAL = 3600  # seconds between merging the part files of finished days
+ANALYTICS_FLUSH_CHECK = 30  # seconds between checks for a buffer older than ANALYTICS_FLUSH_SECONDS
+ANALYTICS_MAX_BINS = 200  # upper limit for histogram bins of /api/analytics/distribution
+
 # =========================================================
 # 8️⃣ Frontend Settings
 # =========================================================
@@ -92,6 +235,12 @@ STATIC_FOLDER = os.path.join(BASE_DIR, "static")
 # =========================================================
 DEBUG_MODE = True  # Set to False in production
 
+# Local device-API / PLC simulator (python -m simulator) for offline load tests
+SIMULATOR_DEVICES = 1  # simulated BTS controllers, ids start at DEFAULT_DEVICE_ID
+SIMULATOR_CIRCUITS = MAX_CIRCUITS  # circuits per device
+SIMULATOR_RATE_HZ = 1.0  # rows written per second per running circuit
+SIMULATOR_MODBUS_PORT = 5020  # 502 needs root; point PLC_PORT here
+
 # =========================================================
 # ✅ Print confirmation on startup
 # =========================================================
@@ -0,0 +1,332 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import (ANALYTICS_PATH, ANALYTICS_FLUSH_ROWS, ANALYTICS_FLUSH_SECONDS,
+                    ANALYTICS_COMPACT_INTERVAL, ANALYTICS_FLUSH_CHECK, ANALYTICS_MAX_BINS)
+
+# ===================================================
+# Local Analytics Store for Battery Test Results
+# ===================================================
+# Every evaluated battery is flattened into one row and appended to Parquet
+# part files under ANALYTICS_PATH/date=<YYYY-MM-DD>/. Queries run on an
+# in-memory frame that only loads part files it has not seen yet, so
+# yields, channel fail rates and metric distributions over months of
+# results are answered without touching SQL Server.
+
+META_COLUMNS = [
+    "datetime", "date", "battery_id", "battery_type", "test_type",
+    "device_id", "channel", "final_status", "passed", "fail_reason",
+    "step_time_s", "cycle_time_s",
+]
+
+
+def _seconds(value):
+    if value is None:
+        return None
+    try:
+        return pd.to_timedelta(value).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def _number(value):
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_result(payload: dict):
+    """
+    Turns a "data_update" payload of the ingestion loop into one flat row:
+    meta columns plus charge_<metric> / discharge_<metric> values.
+    """
+    update = payload["data_update"]
+    meta = update["meta"]
+    now = datetime.now()
+    row = {
+        "datetime": now,
+        "date": now.strftime("%Y-%m-%d"),
+        "battery_id": meta.get("battery_id"),
+        "battery_type": meta.get("battery_type"),
+        "test_type": meta.get("test_type"),
+        "device_id": str(meta.get("device_id")),
+        "channel": str(meta.get("device_channel")),
+        "final_status": update.get("final_status"),
+        "passed": update.get("final_status") == "PASS",
+        "fail_reason": update.get("fail_reason"),
+        "step_time_s": _seconds(update.get("step_time")),
+        "cycle_time_s": _seconds(update.get("cycle_time")),
+    }
+    for mode in ("charge", "discharge"):
+        for key, value in (update.get("results", {}).get(mode) or {}).items():
+            row[f"{mode}_{key}"] = _number(value)
+    return row
+
+
+class AnalyticsStore:
+    """
+    Append-only columnar store with an incrementally loaded query cache.
+    """
+
+    def __init__(self, path: str = ANALYTICS_PATH):
+        self.path = path
+        self._buffer = []
+        self._last_flush = time.time()
+        self._frame = pd.DataFrame(columns=META_COLUMNS)
+        self._row_parts = np.array([], dtype=object)  # part file of every cached row
+        self._loaded_parts = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ------------------------------
+    # Ingestion
+    # ------------------------------
+    def record_result(self, payload: dict):
+        """
+        Buffers one evaluated battery; writes a part file when the buffer is
+        full or old enough. Never raises into the ingestion loop.
+        """
+        try:
+            row = flatten_result(payload)
+            with self._lock:
+                self._buffer.append(row)
+                if (len(self._buffer) >= ANALYTICS_FLUSH_ROWS
+                        or time.time() - self._last_flush >= ANALYTICS_FLUSH_SECONDS):
+                    self._flush_locked()
+        except Exception as e:
+            logging.error(f"Error recording analytics row: {e}")
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def flush_if_due(self):
+        """
+        Writes a buffer that has waited ANALYTICS_FLUSH_SECONDS, even if no
+        further result arrives to trigger it from record_result.
+        """
+        with self._lock:
+            if self._buffer and time.time() - self._last_flush >= ANALYTICS_FLUSH_SECONDS:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.time()
+        if not self._buffer:
+            return
+        frame = pd.DataFrame(self._buffer)
+        for date_str, part in frame.groupby("date"):
+            folder = os.path.join(self.path, f"date={date_str}")
+            os.makedirs(folder, exist_ok=True)
+            self._write_part(part, folder)
+        self._buffer = []
+
+    @staticmethod
+    def _write_part(frame, folder):
+        # written under a temporary name so readers never load a partial file
+        part_path = os.path.join(folder, f"part-{time.time_ns()}.parquet")
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), part_path + ".tmp", compression="zstd")
+        os.replace(part_path + ".tmp", part_path)
+        return part_path
+
+    def compact(self, date_str: str):
+        """
+        Merges the part files of one (finished) day into a single file.
+        """
+        with self._lock:
+            folder = os.path.join(self.path, f"date={date_str}")
+            parts = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".parquet"))
+            if len(parts) < 2:
+                return 0
+            merged = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            self._write_part(merged, folder)
+            for p in parts:
+                os.remove(p)
+            # the query cache (here and in other processes) swaps the removed
+            # parts for the merged file on its next refresh
+            return len(parts)
+
+    def compact_finished_days(self):
+        """
+        Compacts every day before today that still has several part files.
+        Returns the number of part files merged.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        merged = 0
+        for name in sorted(os.listdir(self.path)):
+            date_str = name[len("date="):]
+            if not name.startswith("date=") or date_str >= today:
+                continue
+            try:
+                merged += self.compact(date_str)
+            except Exception as e:
+                logging.error(f"Error compacting analytics day {date_str}: {e}")
+        return merged
+
+    # ------------------------------
+    # Maintenance (only in the process that records results)
+    # ------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="analytics-maintenance", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_compact = 0.0
+        while True:
+            try:
+                self.flush_if_due()
+            except Exception as e:
+                logging.error(f"Error flushing analytics rows: {e}")
+            if time.time() >= next_compact:
+                next_compact = time.time() + ANALYTICS_COMPACT_INTERVAL
+                merged = self.compact_finished_days()
+                if merged:
+                    logging.info(f"Analytics store: compacted {merged} part file(s) of finished days")
+            time.sleep(ANALYTICS_FLUSH_CHECK)
+
+    # ------------------------------
+    # Query Cache
+    # ------------------------------
+    def _part_files(self):
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".parquet"):
+                    yield os.path.join(root, name)
+
+    def frame(self):
+        """
+        All results (persisted + buffered) as one DataFrame.
+        """
+        with self._lock:
+            files = set(self._part_files())
+            gone = self._loaded_parts - files
+            if gone:
+                # compacted (possibly by another process): drop their rows
+                keep = ~np.isin(self._row_parts, list(gone))
+                self._frame = self._frame[keep].reset_index(drop=True)
+                self._row_parts = self._row_parts[keep]
+                self._loaded_parts -= gone
+            new_parts = sorted(files - self._loaded_parts)
+            if new_parts:
+                loaded = [pd.read_parquet(p) for p in new_parts]
+                frames = [self._frame] if not self._frame.empty else []
+                self._frame = pd.concat(frames + loaded, ignore_index=True)
+                self._row_parts = np.concatenate(
+                    [self._row_parts] + [np.full(len(f), p, dtype=object) for p, f in zip(new_parts, loaded)])
+                self._loaded_parts.update(new_parts)
+            df = self._frame
+            if self._buffer:
+                frames = [df] if not df.empty else []
+                df = pd.concat(frames + [pd.DataFrame(self._buffer)], ignore_index=True)
+            # the empty cache has object columns; ~passed must stay a bool mask
+            if df["passed"].dtype != bool:
+                df = df.astype({"passed": bool})
+            return df
+
+    def query(self, start=None, end=None, battery_type=None, test_type=None):
+        """
+        Filtered view of the results; start/end are dates or datetimes.
+        """
+        df = self.frame()
+        if df.empty:
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        if start:
+            mask &= (df["datetime"] >= pd.to_datetime(start)).to_numpy()
+        if end:
+            mask &= (df["datetime"] <= pd.to_datetime(end)).to_numpy()
+        if battery_type:
+            mask &= (df["battery_type"] == battery_type).to_numpy()
+        if test_type:
+            mask &= (df["test_type"] == test_type).to_numpy()
+        return df[mask]
+
+    # ------------------------------
+    # Aggregations
+    # ------------------------------
+    def yield_summary(self, group_by: str = "date", **filters):
+        """
+        Tested / passed / failed counts and yield (%) per group
+        (e.g. "date", "battery_type", "test_type", "device_id").
+        Raises ValueError for an empty group_by or unknown columns.
+        """
+        df = self.query(**filters)
+        keys = [k.strip() for k in (group_by or "").split(",") if k.strip()]
+        if not keys:
+            raise ValueError("group_by needs at least one column")
+        unknown = [k for k in keys if k not in df.columns or k == "passed"]
+        if unknown:
+            raise ValueError(f"Unknown group_by column(s): {', '.join(unknown)}")
+        if df.empty:
+            return []
+        grouped = df.groupby(keys, sort=True)["passed"].agg(["count", "sum"]).reset_index()
+        grouped["failed"] = grouped["count"] - grouped["sum"]
+        grouped["yield"] = (grouped["sum"] / grouped["count"] * 100).round(2)
+        grouped = grouped.rename(columns={"count": "total", "sum": "passed"})
+        grouped["passed"] = grouped["passed"].astype(int)
+        return grouped.to_dict(orient="records")
+
+    def channel_fail_rates(self, **filters):
+        """
+        Fail rate per (device, channel), worst first, with the most common fail reason.
+        """
+        df = self.query(**filters)
+        if df.empty:
+            return []
+        grouped = df.groupby(["device_id", "channel"])
+        result = grouped["passed"].agg(["count", "sum"]).reset_index()
+        result["failed"] = result["count"] - result["sum"]
+        result["fail_rate"] = (result["failed"] / result["count"] * 100).round(2)
+        top_reason = (
+            df[~df["passed"]].groupby(["device_id", "channel"])["fail_reason"]
+            .agg(lambda s: s.value_counts().index[0] if s.notna().any() else None)
+        )
+        result = result.merge(top_reason.rename("top_fail_reason").reset_index(),
+                              on=["device_id", "channel"], how="left")
+        result = result.rename(columns={"count": "total"}).drop(columns=["sum"])
+        result = result.sort_values("fail_rate", ascending=False)
+        return result.replace({np.nan: None}).to_dict(orient="records")
+
+    def metric_distribution(self, metric: str, bins: int = 20, **filters):
+        """
+        Summary statistics and histogram of one metric column,
+        e.g. "discharge_Capacity" or "charge_Max_Cell_Voltage".
+        Raises ValueError for bins outside 1..ANALYTICS_MAX_BINS.
+        """
+        if not 1 <= bins <= ANALYTICS_MAX_BINS:
+            raise ValueError(f"bins must be between 1 and {ANALYTICS_MAX_BINS}")
+        df = self.query(**filters)
+        if df.empty or metric not in df.columns:
+            return {"metric": metric, "count": 0}
+        values = pd.to_numeric(df[metric], errors="coerce").dropna().to_numpy(dtype=float)
+        if values.size == 0:
+            return {"metric": metric, "count": 0}
+        counts, edges = np.histogram(values, bins=bins)
+        p = np.percentile(values, [1, 5, 25, 50, 75, 95, 99])
+        return {
+            "metric": metric,
+            "count": int(values.size),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "percentiles": dict(zip(["p1", "p5", "p25", "p50", "p75", "p95", "p99"], map(float, p))),
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        }
+
+    def metrics(self):
+        """
+        Metric columns available for distributions.
+        """
+        return [c for c in self.frame().columns if c.startswith(("charge_", "discharge_"))]
+
+
+analytics_store = AnalyticsStore()
@@ -1,19 +1,199 @@
-import requests
+import json
 import time
+import base64
 import logging
+import threading
+from collections import namedtuple
 from datetime import datetime, timedelta
-from config import API_BASE_URL, JWT_EXPIRY_HOURS
+from core import http_client
+from config import (
+    API_BASE_URL,
+    JWT_EXPIRY_HOURS,
+    REFRESH_BEFORE_EXPIRY_MINUTES,
+    TOKEN_REFRESH_RETRY_SECONDS,
+)
 
 # ======================================
-# 🔒 Global Token Storage
+# 🔒 Token Snapshot
 # ======================================
-token_data = {
-    "access_token": None,
-    "refresh_token": None,
-    "expiry": None,
-    "username": None,
-    "password": None,
-}
+# The current token lives in one immutable snapshot that is replaced as a
+# whole, so get_auth_headers() reads it without a lock and never sees a
+# half-updated token. A background thread refreshes the token
+# REFRESH_BEFORE_EXPIRY_MINUTES ahead of expiry; concurrent refresh calls
+# are coalesced into a single request.
+
+TokenSnapshot = namedtuple("TokenSnapshot", ["access_token", "expiry", "username", "generation", "headers"])
+
+_ANONYMOUS_HEADERS = (("Content-Type", "application/json"),)
+_EMPTY = TokenSnapshot(None, None, None, 0, _ANONYMOUS_HEADERS)
+
+
+def _token_expiry(token: str):
+    """
+    Expiry from the JWT "exp" claim (no signature check), else the
+    configured lifetime from now.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return datetime.fromtimestamp(int(claims["exp"]))
+    except Exception:
+        return datetime.now() + timedelta(hours=JWT_EXPIRY_HOURS)
+
+
+def _extract_token(res):
+    data = res.json()
+    return data.get("token") or data.get("access_token")
+
+
+class TokenManager:
+    """
+    Holds the device-API JWT and keeps it fresh in the background.
+    """
+
+    def __init__(self):
+        self._snapshot = _EMPTY
+        self._credentials = None
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._retry_at = 0.0  # monotonic time before which nudges are ignored
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _install(self, token: str, username: str):
+        current = self._snapshot
+        self._snapshot = TokenSnapshot(
+            access_token=token,
+            expiry=_token_expiry(token),
+            username=username,
+            generation=current.generation + 1,
+            headers=_ANONYMOUS_HEADERS + (("Authorization", f"Bearer {token}"),),
+        )
+        self._wakeup.set()  # reschedule the next refresh
+
+    # ------------------------------
+    # Login / Refresh
+    # ------------------------------
+    def login(self, username: str, password: str):
+        login_url = f"{API_BASE_URL}/login"
+        payload = {"username": username, "password": password}
+        try:
+            res = http_client.post(login_url, json=payload, group="auth")
+            if res.status_code == 200:
+                token = _extract_token(res)
+                if not token:
+                    return False, "No token in response"
+                self._credentials = (username, password)
+                self._install(token, username)
+                self.start()
+                logging.info(f"Login successful for {username}")
+                return True, "Login successful"
+            else:
+                logging.warning(f"Login failed: {res.status_code} - {res.text}")
+                return False, res.text
+        except Exception as e:
+            logging.error(f"Login error: {e}")
+            return False, str(e)
+
+    def needs_refresh(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        if not snapshot.access_token or snapshot.expiry is None:
+            return False
+        remaining = (snapshot.expiry - datetime.now()).total_seconds()
+        return remaining <= REFRESH_BEFORE_EXPIRY_MINUTES * 60
+
+    def refresh(self, force: bool = False):
+        """
+        Refreshes the token. Threads that arrive while a refresh is running
+        wait for it and reuse its result instead of sending another request.
+        """
+        seen = self._snapshot
+        if not seen.access_token or not self._credentials:
+            logging.warning("No token found to refresh.")
+            return False
+
+        with self._refresh_lock:
+            if self._snapshot.generation != seen.generation:
+                return True  # another thread refreshed while we waited
+            if not force and not self.needs_refresh(seen):
+                return False
+
+            username, password = self._credentials
+            refresh_url = f"{API_BASE_URL}/RefreshToken"
+            try:
+                res = http_client.post(refresh_url, json={"username": username, "password": password}, group="auth")
+                if res.status_code == 200:
+                    new_token = _extract_token(res)
+                    if new_token:
+                        self._install(new_token, username)
+                        logging.info("Token refreshed successfully.")
+                        return True
+                    logging.warning("Token refresh failed: no token in response.")
+                else:
+                    logging.warning(f"Token refresh failed: {res.status_code}")
+            except Exception as e:
+                logging.error(f"Token refresh error: {e}")
+            return False
+
+    # ------------------------------
+    # Background Scheduler
+    # ------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    def _seconds_until_refresh(self):
+        snapshot = self._snapshot
+        if not snapshot.access_token or snapshot.expiry is None:
+            return None
+        due = snapshot.expiry - timedelta(minutes=REFRESH_BEFORE_EXPIRY_MINUTES)
+        return max(0.0, (due - datetime.now()).total_seconds())
+
+    def _run(self):
+        while True:
+            wait = self._seconds_until_refresh()
+            self._wakeup.clear()
+            if wait is None:
+                self._wakeup.wait()
+                continue
+            if wait > 0 and self._wakeup.wait(wait):
+                continue  # new token installed, recompute the schedule
+            if not self.refresh():
+                # keep the old token (still valid for a while) and retry soon
+                self._retry_at = time.monotonic() + TOKEN_REFRESH_RETRY_SECONDS
+                self._wakeup.wait(TOKEN_REFRESH_RETRY_SECONDS)
+
+    # ------------------------------
+    # Header Access
+    # ------------------------------
+    def headers(self):
+        """
+        Lock-free: builds headers from the current snapshot. If the token is
+        already due (scheduler behind or failing), the refresh thread is
+        nudged but the caller is not blocked.
+        """
+        snapshot = self._snapshot
+        if snapshot.access_token and self.needs_refresh(snapshot) and time.monotonic() >= self._retry_at:
+            self._wakeup.set()
+        return dict(snapshot.headers)
+
+    def info(self):
+        snapshot = self._snapshot
+        return {
+            "access_token": snapshot.access_token,
+            "expiry": snapshot.expiry,
+            "username": snapshot.username,
+            "generation": snapshot.generation,
+            "refresh_due_in": self._seconds_until_refresh(),
+        }
+
+
+token_manager = TokenManager()
 
 
 # ======================================
@@ -21,44 +201,16 @@ token_data = {
 # ======================================
 def login_and_store_tokens(username: str, password: str):
     """
-    Calls /login API and stores JWT + expiry.
+    Calls /login API, stores the JWT and starts the background refresh.
     """
-    login_url = f"{API_BASE_URL}/login"
-    payload = {"username": username, "password": password}
-
-    try:
-        res = requests.post(login_url, json=payload)
-        if res.status_code == 200:
-            data = res.json()
-            token = data.get("token") or data.get("access_token")
-            if not token:
-                return False, "No token in response"
-
-            token_data["access_token"] = token
-            token_data["username"] = username
-            token_data["password"] = password
-            token_data["expiry"] = datetime.now() + timedelta(hours=JWT_EXPIRY_HOURS)
-
-            logging.info(f"Login successful for {username}")
-            return True, "Login successful"
-        else:
-            logging.warning(f"Login failed: {res.status_code} - {res.text}")
-            return False, res.text
-    except Exception as e:
-        logging.error(f"Login error: {e}")
-        return False, str(e)
+    return token_manager.login(username, password)
 
 
 def get_auth_headers():
     """
     Returns headers with Bearer token for API calls.
     """
-    if not token_data["access_token"]:
-        return {"Content-Type": "application/json"}
-    return {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token_data['access_token']}",
-    }
+    return token_manager.headers()
 
 
 # ======================================
@@ -66,44 +218,13 @@ def get_auth_headers():
 # ======================================
 def refresh_token_if_needed():
     """
-    Refreshes JWT if expiry is near (within 5 mins).
+    Refreshes JWT if expiry is near (normally done by the background thread).
     """
-    if not token_data["access_token"]:
-        logging.warning("No token found to refresh.")
-        return False
-
-    # Refresh only if < 5 min left
-    if token_data["expiry"] and (token_data["expiry"] - datetime.now()).total_seconds() > 300:
-        return False
-
-    refresh_url = f"{API_BASE_URL}/RefreshToken"
-    payload = {
-        "username": token_data["username"],
-        "password": token_data["password"],
-    }
-
-    try:
-        res = requests.post(refresh_url, json=payload)
-        if res.status_code == 200:
-            data = res.json()
-            new_token = data.get("token") or data.get("access_token")
-            if new_token:
-                token_data["access_token"] = new_token
-                token_data["expiry"] = datetime.now() + timedelta(hours=JWT_EXPIRY_HOURS)
-                logging.info("Token refreshed successfully.")
-                return True
-            else:
-                logging.warning("Token refresh failed: no token in response.")
-        else:
-            logging.warning(f"Token refresh failed: {res.status_code}")
-        return False
-    except Exception as e:
-        logging.error(f"Token refresh error: {e}")
-        return False
+    return token_manager.refresh()
 
 
 def get_token_info():
     """
     Returns the current token details for debugging.
     """
-    return token_data
+    return token_manager.info()
@@ -0,0 +1,241 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from config import STORED_DBC_PATH, INDEX_SIDECAR_PATH
+from core.db_index import find_readings_table
+from core.db_connect import connect_ro, run_read
+
+# ===================================================
+# Database File Catalog
+# ===================================================
+# Listing the circuit DBs used to open every file and run COUNT(*) on it.
+# The catalog keeps per-file metadata keyed by (mtime, size): unchanged
+# files are served from memory, grown files only get their tail re-read
+# (MAX(ROWID) + last timestamp), and only new/rewritten files are fully
+# inspected. The cache is persisted so a restart does not rescan everything.
+
+CATALOG_CACHE_FILE = os.path.join(INDEX_SIDECAR_PATH, "catalog.json")
+
+
+def _wal_signature(db_path: str):
+    """
+    Devices writing in WAL mode only touch the -wal file until a checkpoint,
+    so its stat is part of the change key.
+    """
+    try:
+        stat = os.stat(db_path + "-wal")
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+
+def _connect_ro(db_path: str):
+    return connect_ro(db_path)
+
+
+def _tail_info(cursor, table_name: str, has_timestamp: bool):
+    """
+    Approximate row count (MAX(ROWID)) and latest timestamp, both O(log n).
+    """
+    cursor.execute(f"SELECT MAX(ROWID) FROM {table_name};")
+    row_count = cursor.fetchone()[0] or 0
+    last_ts = None
+    if has_timestamp and row_count:
+        cursor.execute(f"SELECT timestamp FROM {table_name} ORDER BY ROWID DESC LIMIT 1;")
+        row = cursor.fetchone()
+        last_ts = row[0] if row else None
+    return row_count, last_ts
+
+
+def inspect_db_file(db_path: str, previous: dict = None):
+    """
+    Collects metadata of one circuit DB. When `previous` metadata is given and
+    the schema is unchanged, only the tail (row count / end time) is refreshed.
+    """
+    conn = _connect_ro(db_path)
+    try:
+        # the whole inspection is retried if the device holds the write lock
+        return run_read(lambda: _inspect(conn.cursor(), previous), "catalog")
+    finally:
+        conn.close()
+
+
+def _inspect(cursor, previous: dict = None):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    tables = [row[0] for row in cursor.fetchall()]
+
+    if previous and previous.get("tables") == tables and previous.get("main_table"):
+        main_table = previous["main_table"]
+        columns = previous["columns"]
+        start_ts = previous["time_range"]["start"]
+    else:
+        main_table = find_readings_table(cursor)
+        columns = []
+        start_ts = None
+        if main_table:
+            cursor.execute(f"PRAGMA table_info({main_table});")
+            columns = [{"name": col[1], "type": col[2]} for col in cursor.fetchall()]
+
+    has_timestamp = any(col["name"] == "timestamp" for col in columns)
+    row_count, end_ts = (0, None)
+    if main_table:
+        row_count, end_ts = _tail_info(cursor, main_table, has_timestamp)
+        if has_timestamp and start_ts is None and row_count:
+            cursor.execute(f"SELECT timestamp FROM {main_table} ORDER BY ROWID ASC LIMIT 1;")
+            row = cursor.fetchone()
+            start_ts = row[0] if row else None
+
+    return {
+        "tables": tables,
+        "main_table": main_table,
+        "columns": columns,
+        "row_count": row_count,
+        "time_range": {"start": start_ts, "end": end_ts},
+    }
+
+
+class DatabaseCatalog:
+    """
+    Incrementally refreshed metadata cache for the .db files of a folder.
+    """
+
+    def __init__(self, folder_path: str, cache_file: str = None):
+        self.folder_path = folder_path
+        self.cache_file = cache_file
+        self._entries = {}  # filename -> {"mtime_ns", "size", "wal", "meta"}
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    # ------------------------------
+    # Persistence
+    # ------------------------------
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+            if data.get("folder_path") == self.folder_path:
+                self._entries = data.get("entries", {})
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable catalog cache {self.cache_file}: {e}")
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            tmp_path = self.cache_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"folder_path": self.folder_path, "entries": self._entries}, f)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logging.error(f"Error saving catalog cache: {e}")
+
+    # ------------------------------
+    # Refresh / Listing
+    # ------------------------------
+    def refresh(self):
+        """
+        Re-stats the folder and re-inspects only new or changed files.
+        Returns the number of files that had to be (re)read.
+        """
+        if not os.path.exists(self.folder_path):
+            logging.warning(f"Database folder not found: {self.folder_path}")
+            return 0
+
+        changed = 0
+        with self._lock:
+            seen = set()
+            with os.scandir(self.folder_path) as it:
+                for entry in it:
+                    if not entry.name.endswith(".db") or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    try:
+                        stat = entry.stat()
+                        wal = _wal_signature(entry.path)
+                        cached = self._entries.get(entry.name)
+                        if (cached and cached["mtime_ns"] == stat.st_mtime_ns
+                                and cached["size"] == stat.st_size and cached.get("wal") == wal):
+                            continue
+
+                        previous = cached["meta"] if cached else None
+                        meta = inspect_db_file(entry.path, previous)
+                        self._entries[entry.name] = {
+                            "mtime_ns": stat.st_mtime_ns,
+                            "size": stat.st_size,
+                            "wal": wal,
+                            "meta": meta,
+                        }
+                        changed += 1
+                    except Exception as e:
+                        logging.error(f"Error analyzing database file {entry.name}: {e}")
+
+            removed = [name for name in self._entries if name not in seen]
+            for name in removed:
+                del self._entries[name]
+
+            if changed or removed:
+                self._save_cache()
+        return changed
+
+    def list_files(self, refresh: bool = True):
+        """
+        Returns the catalog in the /api/database-files format, sorted by name.
+        """
+        if refresh:
+            self.refresh()
+        with self._lock:
+            items = sorted(self._entries.items())
+        return [
+            {
+                "filename": name,
+                "file_path": os.path.join(self.folder_path, name),
+                "size": entry["size"],
+                "modified": datetime.fromtimestamp(entry["mtime_ns"] / 1e9).isoformat(),
+                "tables": entry["meta"]["tables"],
+                "main_table": entry["meta"]["main_table"],
+                "columns": entry["meta"]["columns"],
+                "row_count": entry["meta"]["row_count"],
+                "time_range": entry["meta"]["time_range"],
+            }
+            for name, entry in items
+        ]
+
+    def get(self, filename: str):
+        """
+        Returns the cached metadata for one file (None if unknown).
+        """
+        with self._lock:
+            entry = self._entries.get(filename)
+            return dict(entry["meta"]) if entry else None
+
+
+# ===================================================
+# Shared Catalogs
+# ===================================================
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(folder_path: str = STORED_DBC_PATH):
+    """
+    Returns the process-wide catalog of a folder. The default folder's
+    catalog is persisted to CATALOG_CACHE_FILE.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(folder_path)
+        if catalog is None:
+            cache_file = CATALOG_CACHE_FILE if folder_path == STORED_DBC_PATH else None
+            catalog = DatabaseCatalog(folder_path, cache_file)
+            _catalogs[folder_path] = catalog
+        return catalog
+
+
+def discover_database_files(folder_path: str = STORED_DBC_PATH):
+    """
+    Lists all SQLite database files in the folder with their metadata.
+    """
+    return get_catalog(folder_path).list_files()
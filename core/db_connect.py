@@ -0,0 +1,134 @@
+import os
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+from urllib.request import pathname2url
+from config import READER_MMAP_SIZE, READER_BUSY_TIMEOUT, READER_CACHE_KB
+from core import metrics
+
+# ===================================================
+# Read-Only Connections to Device-Written Circuit DBs
+# ===================================================
+# The device API keeps appending to the circuit DBs while we read them.
+# Every reader opens them the same way:
+#   - read-only URI (mode=ro): we never take a write lock or create a journal
+#   - mmap_size: large history scans are served from mapped pages instead
+#     of being copied through SQLite's page cache
+#   - no busy handler inside SQLite: run_read() retries SQLITE_BUSY itself
+#     with a short backoff, so lock contention with the device is counted
+#     (bts_sqlite_read_busy_*) instead of hiding inside a timeout
+#   - statements are always stepped to completion, so no read transaction
+#     (WAL snapshot) outlives the read and holds back the device's
+#     checkpoints; read_snapshot() is for the few reads that need several
+#     statements on one snapshot
+# In rollback-journal mode a reader's shared lock still delays the
+# writer's commit; keeping every read one short statement is all a reader
+# can do there, since switching the device DB to WAL would mean writing it.
+
+BUSY_MESSAGES = ("database is locked", "database table is locked", "busy")
+
+
+def ro_uri(db_path: str):
+    return f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+
+
+def apply_read_pragmas(conn, schema: str = "main"):
+    """
+    Per-file read settings; call for every ATTACHed schema too.
+    """
+    conn.execute(f"PRAGMA {schema}.mmap_size={int(READER_MMAP_SIZE)};")
+    conn.execute(f"PRAGMA {schema}.cache_size={-int(READER_CACHE_KB)};")
+
+
+def connect_ro(db_path: str, row_factory=None, check_same_thread: bool = True):
+    """
+    Read-only connection to a circuit DB with the shared reader settings.
+    """
+    conn = sqlite3.connect(ro_uri(db_path), uri=True, timeout=0, check_same_thread=check_same_thread)
+    try:
+        conn.execute("PRAGMA query_only=1;")
+        run_read(lambda: apply_read_pragmas(conn), "connect")  # reads the schema, so it can meet the lock
+    except sqlite3.Error:
+        conn.close()
+        raise
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    return conn
+
+
+def is_busy(error: Exception):
+    return isinstance(error, sqlite3.OperationalError) and any(m in str(error).lower() for m in BUSY_MESSAGES)
+
+
+def run_read(fn, reader: str = "other", timeout: float = READER_BUSY_TIMEOUT):
+    """
+    Returns fn(), retrying while the DB is locked by the writer (up to
+    `timeout` seconds). Every contended read is counted per reader, with
+    the time spent waiting.
+    """
+    started = None
+    delay = 0.002
+    while True:
+        try:
+            result = fn()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            now = time.perf_counter()
+            if started is None:
+                started = now
+            if now - started >= timeout:
+                metrics.sqlite_read_busy_total.inc(reader=reader, outcome="failed")
+                metrics.sqlite_read_busy_wait_seconds.observe(now - started, reader=reader)
+                logging.warning(f"{reader} read gave up after {now - started:.2f}s of lock contention: {e}")
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+            continue
+        if started is not None:
+            metrics.sqlite_read_busy_total.inc(reader=reader, outcome="retried")
+            metrics.sqlite_read_busy_wait_seconds.observe(time.perf_counter() - started, reader=reader)
+        return result
+
+
+def fetch_all(conn, sql: str, params=(), reader: str = "other"):
+    """
+    conn.execute(sql).fetchall() under run_read; fetchall steps the
+    statement to the end, which ends its read transaction.
+    """
+    return run_read(lambda: conn.execute(sql, params).fetchall(), reader)
+
+
+def journal_mode(conn, schema: str = "main"):
+    try:
+        return run_read(lambda: conn.execute(f"PRAGMA {schema}.journal_mode;").fetchone()[0], "journal_mode")
+    except sqlite3.Error:
+        return None
+
+
+def begin_snapshot(conn, reader: str = "other"):
+    """
+    Starts a read transaction and takes its snapshot (WAL) / shared lock
+    (rollback journal) right away, retrying while the writer holds the lock.
+    Ended by COMMIT or by closing the connection.
+    """
+    conn.execute("BEGIN;")
+    try:
+        run_read(lambda: conn.execute("SELECT 1 FROM sqlite_master LIMIT 1;").fetchall(), reader)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK;")
+        raise
+
+
+@contextmanager
+def read_snapshot(conn, reader: str = "other"):
+    """
+    Runs the enclosed statements on one read snapshot and ends it right after.
+    """
+    begin_snapshot(conn, reader)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.execute("COMMIT;")
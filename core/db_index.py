@@ -0,0 +1,323 @@
+import os
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import TIMESTAMP_INDEX_MODE, INDEX_SIDECAR_PATH, READER_BUSY_TIMEOUT
+from core.db_connect import connect_ro, run_read, fetch_all
+
+# ===================================================
+# Timestamp Index Management for RealTimeData_*.db
+# ===================================================
+# The device API creates one readings table per circuit DB without any
+# index on `timestamp`, so "ORDER BY timestamp DESC" scans and sorts the
+# whole table. Tail reads only need the last inserted rows, which SQLite
+# can walk directly from the ROWID b-tree. Time range reads use either a
+# native index (when we may write the DB) or a sidecar index DB.
+# Readers only detect indexes; creating one writes the device DB, so native
+# builds run on a background thread, never inside a live read.
+
+INDEX_NATIVE = "native"
+INDEX_SIDECAR = "sidecar"
+INDEX_NONE = "none"
+
+SIDECAR_SUFFIX = ".tsidx"
+SIDECAR_BATCH_SIZE = 50000
+
+# db_path -> index mode, resolved once per file
+_index_modes = {}
+_index_lock = threading.Lock()
+_building = set()  # db_paths with a native index build queued or running
+_executor = None
+
+
+# ===================================================
+# Helper Functions
+# ===================================================
+def find_readings_table(cursor):
+    """
+    Returns the readings table of a circuit DB ('reading' in the name,
+    otherwise the first table), or None when the DB has no tables.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    tables = [row[0] for row in cursor.fetchall()]
+    for name in tables:
+        if "reading" in name.lower():
+            return name
+    return tables[0] if tables else None
+
+
+def has_column(cursor, table_name: str, column: str = "timestamp"):
+    """
+    Checks whether the table has the given column.
+    """
+    cursor.execute(f"PRAGMA table_info({table_name});")
+    return any(col[1] == column for col in cursor.fetchall())
+
+
+def has_column_index(cursor, table_name: str, column: str = "timestamp"):
+    """
+    Checks whether an index exists whose leading column is `column`.
+    """
+    cursor.execute(f"PRAGMA index_list({table_name});")
+    for index in cursor.fetchall():
+        cursor.execute(f"PRAGMA index_info({index[1]});")
+        index_cols = cursor.fetchall()
+        if index_cols and index_cols[0][2] == column:
+            return True
+    return False
+
+
+def is_writable(db_path: str):
+    """
+    A DB is writable when both the file and its folder (journal files) are.
+    """
+    folder = os.path.dirname(os.path.abspath(db_path))
+    return os.access(db_path, os.W_OK) and os.access(folder, os.W_OK)
+
+
+def tail_order_clause(mode: str, column: str = "timestamp"):
+    """
+    ORDER BY clause for "latest N rows" queries.
+    Only a native index makes ordering by timestamp cheap, everything else
+    uses insertion order, which is how the device appends readings anyway.
+    """
+    if mode == INDEX_NATIVE:
+        return f"ORDER BY {column} DESC"
+    return "ORDER BY ROWID DESC"
+
+
+def tail_query(table_name: str, mode: str, columns: str = "*", column: str = "timestamp"):
+    """
+    Builds the SELECT for the latest rows of a readings table (LIMIT is a bind param).
+    """
+    return f"SELECT {columns} FROM {table_name} {tail_order_clause(mode, column)} LIMIT ?;"
+
+
+# ===================================================
+# Sidecar Index DB
+# ===================================================
+class SidecarIndex:
+    """
+    Keeps (ROWID, timestamp) pairs of a circuit DB in a separate SQLite file,
+    indexed on timestamp. Used when the device DB must not be modified.
+    Refresh is incremental: only rows above the last indexed ROWID are read.
+    """
+
+    def __init__(self, db_path: str, table_name: str, column: str = "timestamp", sidecar_folder: str = None):
+        self.db_path = db_path
+        self.table_name = table_name
+        self.column = column
+        folder = sidecar_folder or INDEX_SIDECAR_PATH
+        self.path = os.path.join(folder, os.path.basename(db_path) + SIDECAR_SUFFIX)
+        self._lock = threading.Lock()
+        self._init_sidecar()
+
+    def _init_sidecar(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS ts_index (rid INTEGER PRIMARY KEY, ts);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ts_index_ts ON ts_index(ts);")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def last_indexed_rowid(self, conn):
+        row = conn.execute("SELECT MAX(rid) FROM ts_index;").fetchone()
+        return row[0] or 0
+
+    def refresh(self):
+        """
+        Copies new (ROWID, timestamp) pairs from the circuit DB.
+        Returns the number of rows added.
+        """
+        with self._lock:
+            side = sqlite3.connect(self.path)
+            src = connect_ro(self.db_path)
+            added = 0
+            try:
+                last_rid = self.last_indexed_rowid(side)
+                cursor = src.execute(
+                    f"SELECT ROWID, {self.column} FROM {self.table_name} WHERE ROWID > ? ORDER BY ROWID;",
+                    (last_rid,),
+                )
+                while True:
+                    rows = cursor.fetchmany(SIDECAR_BATCH_SIZE)
+                    if not rows:
+                        break
+                    side.executemany("INSERT OR REPLACE INTO ts_index (rid, ts) VALUES (?, ?);", rows)
+                    added += len(rows)
+                side.commit()
+            finally:
+                src.close()
+                side.close()
+            return added
+
+    def rowids_between(self, start=None, end=None, limit: int = None):
+        """
+        Returns ROWIDs of the circuit DB whose timestamp is within [start, end],
+        newest first.
+        """
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT rid FROM ts_index {where} ORDER BY ts DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        conn = sqlite3.connect(self.path)
+        try:
+            return [row[0] for row in conn.execute(sql + ";", params).fetchall()]
+        finally:
+            conn.close()
+
+
+_sidecars = {}
+
+
+def get_sidecar(db_path: str, table_name: str, column: str = "timestamp"):
+    """
+    Returns the (cached) sidecar index for a circuit DB.
+    """
+    with _index_lock:
+        sidecar = _sidecars.get(db_path)
+        if sidecar is None:
+            sidecar = SidecarIndex(db_path, table_name, column)
+            _sidecars[db_path] = sidecar
+        return sidecar
+
+
+# ===================================================
+# Index Detection / Maintenance
+# ===================================================
+def build_native_index(db_path: str, table_name: str, column: str = "timestamp"):
+    """
+    Creates the native timestamp index inside a circuit DB. The build holds
+    the DB's write lock (and so stalls the device writer) for its whole
+    duration, so it only ever runs on the background index thread.
+    Returns True when the index exists afterwards.
+    """
+    try:
+        conn = sqlite3.connect(db_path, timeout=READER_BUSY_TIMEOUT)
+        try:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} ON {table_name}({column});")
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Cannot create index on {db_path}, keeping the sidecar: {e}")
+        return False
+    finally:
+        with _index_lock:
+            _building.discard(db_path)
+    with _index_lock:
+        _index_modes[db_path] = INDEX_NATIVE
+    logging.info(f"Created {column} index on {os.path.basename(db_path)}:{table_name}")
+    return True
+
+
+def _index_executor():
+    """
+    Single background thread for native index builds, one DB at a time.
+    """
+    global _executor
+    with _index_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ts-index")
+        return _executor
+
+
+def schedule_native_index(db_path: str, table_name: str, column: str = "timestamp"):
+    """
+    Queues a native index build (no-op when one is queued or running).
+    """
+    with _index_lock:
+        if db_path in _building:
+            return
+        _building.add(db_path)
+    _index_executor().submit(build_native_index, db_path, table_name, column)
+
+
+def ensure_timestamp_index(db_path: str, table_name: str = None, column: str = "timestamp"):
+    """
+    Detects the timestamp index of a circuit DB (read-only; safe on the live
+    path). Returns INDEX_NATIVE, INDEX_SIDECAR or INDEX_NONE, cached per
+    file. In "auto" mode a writable DB without an index uses the sidecar
+    until the background thread has built the native index.
+    """
+    mode = _index_modes.get(db_path)
+    if mode is not None:
+        return mode
+
+    mode = INDEX_NONE
+    build = False
+    try:
+        conn = connect_ro(db_path)
+        try:
+            cursor = conn.cursor()
+            table_name = table_name or run_read(lambda: find_readings_table(cursor), "index")
+            if not table_name or not run_read(lambda: has_column(cursor, table_name, column), "index"):
+                mode = INDEX_NONE
+            elif run_read(lambda: has_column_index(cursor, table_name, column), "index"):
+                mode = INDEX_NATIVE
+            elif TIMESTAMP_INDEX_MODE in ("auto", "sidecar"):
+                mode = INDEX_SIDECAR
+                build = TIMESTAMP_INDEX_MODE == "auto" and is_writable(db_path)
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.error(f"Error checking timestamp index for {db_path}: {e}")
+        return INDEX_NONE
+
+    with _index_lock:
+        _index_modes.setdefault(db_path, mode)
+    if build:
+        schedule_native_index(db_path, table_name, column)
+    return mode
+
+
+def forget_db(db_path: str):
+    """
+    Drops cached index state for a DB (e.g. after it was archived or deleted).
+    """
+    with _index_lock:
+        _index_modes.pop(db_path, None)
+        _sidecars.pop(db_path, None)
+
+
+def read_time_range(conn, db_path: str, table_name: str, start=None, end=None, limit: int = 100,
+                    column: str = "timestamp"):
+    """
+    Reads rows of a readings table within [start, end], newest first,
+    using the native index or the sidecar index, whichever the DB has.
+    """
+    mode = ensure_timestamp_index(db_path, table_name, column)
+
+    if mode == INDEX_SIDECAR:
+        sidecar = get_sidecar(db_path, table_name, column)
+        run_read(sidecar.refresh, "history")
+        rowids = sidecar.rowids_between(start, end, limit)
+        if not rowids:
+            return []
+        # Sorting only the matched rows is cheap, unlike sorting the whole table
+        placeholders = ",".join("?" * len(rowids))
+        return fetch_all(conn, f"SELECT * FROM {table_name} WHERE ROWID IN ({placeholders}) ORDER BY {column} DESC;",
+                         rowids, reader="history")
+
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{column} <= ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(limit)
+    return fetch_all(conn, f"SELECT * FROM {table_name} {where} {tail_order_clause(mode, column)} LIMIT ?;",
+                     params, reader="history")
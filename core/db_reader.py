@@ -1,10 +1,206 @@
 import os
 import sqlite3
 import json
+import time
 import logging
+import threading
+from collections.abc import Mapping
 from datetime import datetime
+from contextlib import closing
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from config import STORED_DBC_PATH
+from config import (STORED_DBC_PATH, THREAD_POOL_SIZE, LIVE_ATTACH_BATCH, LIVE_POLL_MIN_INTERVAL,
+                    LIVE_POLL_MAX_INTERVAL, LIVE_POLL_BACKOFF, LIVE_POLL_SMOOTHING, LIVE_POLL_VERIFY_SECONDS)
+from core.db_index import ensure_timestamp_index, tail_order_clause
+from core import metrics
+from core.db_connect import connect_ro, ro_uri, apply_read_pragmas, run_read, fetch_all, journal_mode
+
+# ===================================================
+# Compact Sample Records
+# ===================================================
+# A live tick used to build a fresh 100+ key dict per circuit. Instead, every
+# circuit DB gets one ColumnSchema (built once per file and shared by all of
+# its rows), and a sample is a SampleRecord: the schema plus the row tuple
+# exactly as sqlite3 returned it. Records read like dicts (get / [] / items),
+# so alarm rules and threshold checks take them unchanged; the dict is only
+# built while encoding the Socket.IO packet (see record_json).
+
+# older dashboards read these generic names
+COLUMN_ALIASES = {
+    "temp": "temperature",
+    "volt": "voltage",
+    "curr": "current",
+    "pow": "power",
+    "res": "resistance",
+    "time": "timestamp",
+}
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")
+
+
+def _coerce(value):
+    # numeric text from TEXT / untyped columns, the same rule the dicts used
+    if isinstance(value, str) and value.replace(".", "").replace("-", "").isdigit():
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+class ColumnSchema:
+    """
+    Column layout of one circuit table: lowercased keys in table order,
+    key -> position (aliases included) and the positions that may hold
+    numeric text.
+    """
+
+    __slots__ = ("table_name", "columns", "keys", "index", "aliases", "text_positions")
+
+    def __init__(self, table_name: str, columns_info):
+        """
+        columns_info: PRAGMA table_info rows (cid, name, type, ...).
+        """
+        self.table_name = table_name
+        self.columns = tuple(col[1] for col in columns_info)
+        self.keys = tuple(name.lower() for name in self.columns)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.aliases = tuple((alias, self.index[key]) for key, alias in COLUMN_ALIASES.items()
+                             if key in self.index and alias not in self.index)
+        self.index.update(self.aliases)
+        self.text_positions = tuple(i for i, col in enumerate(columns_info)
+                                    if not any(t in (col[2] or "").upper() for t in NUMERIC_TYPES))
+
+    def record(self, row, **meta):
+        if self.text_positions:
+            row = list(row)
+            for i in self.text_positions:
+                row[i] = _coerce(row[i])
+        return SampleRecord(self, row, **meta)
+
+
+class SampleRecord(Mapping):
+    """
+    One row of a circuit table, read through its shared ColumnSchema.
+    """
+
+    __slots__ = ("schema", "values", "circuit_id", "file_name", "device_id")
+    _META = ("circuit_id", "file_name", "table_name")
+
+    def __init__(self, schema: ColumnSchema, values, circuit_id=None, file_name=None, device_id=None):
+        self.schema = schema
+        self.values = values
+        self.circuit_id = circuit_id
+        self.file_name = file_name
+        self.device_id = device_id
+
+    def __getitem__(self, key):
+        i = self.schema.index.get(key)
+        if i is not None:
+            return self.values[i]
+        if key == "circuit_id":
+            return self.circuit_id
+        if key == "file_name":
+            return self.file_name
+        if key == "table_name":
+            return self.schema.table_name
+        if key == "device_id" and self.device_id is not None:
+            return self.device_id
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._meta_keys()
+        yield from self.schema.index
+
+    def __len__(self):
+        return len(self._meta_keys()) + len(self.schema.index)
+
+    def _meta_keys(self):
+        return self._META if self.device_id is None else self._META + ("device_id",)
+
+    def to_dict(self):
+        """
+        The dict the live payload used to carry for this circuit.
+        """
+        data = {"circuit_id": self.circuit_id, "file_name": self.file_name, "table_name": self.schema.table_name}
+        if self.device_id is not None:
+            data["device_id"] = self.device_id
+        data.update(zip(self.schema.keys, self.values))
+        for alias, i in self.schema.aliases:
+            data[alias] = self.values[i]
+        return data
+
+    def __repr__(self):
+        return f"SampleRecord({self.to_dict()!r})"
+
+
+def encode_record(obj):
+    """
+    json.dumps default= hook for payloads holding SampleRecords.
+    """
+    if isinstance(obj, SampleRecord):
+        return obj.to_dict()
+    return str(obj)
+
+
+class _RecordJSON:
+    """
+    Drop-in for the json module (SocketIO(json=record_json)), so live_data
+    payloads are encoded without first copying every record into a dict.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        kwargs.setdefault("default", encode_record)
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return json.loads(s, **kwargs)
+
+
+record_json = _RecordJSON()
+
+
+# one schema per circuit file; tables are created once per test and never altered
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def get_schema(db_path: str, cursor, table_name: str = None, only=None):
+    """
+    Cached ColumnSchema of a circuit DB's readings table (or its first
+    table), limited to the `only` columns (in that order) if given; None if
+    the DB has no table yet.
+    """
+    key = db_path if only is None else (db_path, tuple(only))
+    schema = _schemas.get(key)
+    if schema is not None:
+        return schema
+    if table_name is None:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        tables = [t[0] for t in cursor.fetchall()]
+        if not tables:
+            return None
+        table_name = next((t for t in tables if "reading" in t.lower()), tables[0])
+    cursor.execute(f"PRAGMA table_info({table_name});")
+    columns_info = cursor.fetchall()
+    if only is not None:
+        by_name = {col[1]: col for col in columns_info}
+        columns_info = [by_name[c] for c in only if c in by_name]
+    schema = ColumnSchema(table_name, columns_info)
+    with _schemas_lock:
+        _schemas[key] = schema
+    return schema
+
+
+def forget_schemas(keep_paths):
+    """
+    Drops cached schemas of files no longer monitored.
+    """
+    keep_paths = set(keep_paths)
+    with _schemas_lock:
+        for key in [k for k in _schemas if (k if isinstance(k, str) else k[0]) not in keep_paths]:
+            del _schemas[key]
+
 
 # ===================================================
 # Helper Functions
@@ -47,45 +243,48 @@ def find_db_for_circuit(folder_path: str, circuit_id: int):
 
 def read_last_row_from_db(db_path: str, dbc_columns: list):
     """
-    Reads the last row of valid columns from a specific DB file.
+    Reads the last row of valid columns from a specific DB file, as a
+    SampleRecord.
     """
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = connect_ro(db_path)
+        try:
+            # Match only those present in DBC
+            schema = run_read(lambda: get_schema(db_path, conn.cursor(), only=dbc_columns), "last_row")
+            if schema is None or not schema.columns:
+                return None
 
-        # Find first table name
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        if not tables:
+            cols_str = ", ".join(schema.columns)
+            rows = fetch_all(conn, f"SELECT {cols_str} FROM {schema.table_name} ORDER BY ROWID DESC LIMIT 1;",
+                             reader="last_row")
+        finally:
             conn.close()
-            return None
-        table_name = tables[0][0]
-
-        # Get actual DB column names
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        actual_cols = [col[1] for col in cursor.fetchall()]
 
-        # Match only those present in DBC
-        valid_columns = [c for c in dbc_columns if c in actual_cols]
-        if not valid_columns:
-            conn.close()
+        if not rows:
             return None
 
-        cols_str = ", ".join(valid_columns)
-        cursor.execute(f"SELECT {cols_str} FROM {table_name} ORDER BY ROWID DESC LIMIT 1;")
-        row = cursor.fetchone()
-        conn.close()
-
-        if not row:
-            return None
-
-        return dict(zip(valid_columns, row))
+        return schema.record(rows[0])
 
     except Exception as e:
         logging.error(f"Error reading db {db_path}: {e}")
         return None
 
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _read_executor():
+    """
+    One pool for every call, instead of a new pool (and threads) per tick.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="db-read")
+        return _executor
+
+
 def read_active_circuit_data(folder_path: str, active_circuits: list):
     """
     Reads last row data for all active circuit DBs in parallel.
@@ -94,24 +293,300 @@ def read_active_circuit_data(folder_path: str, active_circuits: list):
     dbc_columns = get_columns_from_dbc(os.path.join(STORED_DBC_PATH, "columns.dbc"))
     payload = {"timestamp": datetime.now().isoformat(), "circuits": []}
 
-    with ThreadPoolExecutor(max_workers=min(len(active_circuits), 16)) as executor:
-        future_to_circuit = {}
+    executor = _read_executor()
+    future_to_circuit = {}
 
-        for circuit_id in active_circuits:
-            db_path = find_db_for_circuit(folder_path, circuit_id)
-            if db_path:
-                future = executor.submit(read_last_row_from_db, db_path, dbc_columns)
-                future_to_circuit[future] = (circuit_id, db_path)
+    for circuit_id in active_circuits:
+        db_path = find_db_for_circuit(folder_path, circuit_id)
+        if db_path:
+            future = executor.submit(read_last_row_from_db, db_path, dbc_columns)
+            future_to_circuit[future] = (circuit_id, db_path)
 
-        for future in as_completed(future_to_circuit):
-            circuit_id, db_path = future_to_circuit[future]
-            try:
-                data = future.result()
-                if data:
-                    data["circuit_id"] = circuit_id
-                    data["file_name"] = os.path.basename(db_path)
-                    payload["circuits"].append(data)
-            except Exception as e:
-                logging.error(f"Error processing circuit {circuit_id}: {e}")
+    for future in as_completed(future_to_circuit):
+        circuit_id, db_path = future_to_circuit[future]
+        try:
+            data = future.result()
+            if data:
+                data.circuit_id = circuit_id
+                data.file_name = os.path.basename(db_path)
+                payload["circuits"].append(data)
+        except Exception as e:
+            logging.error(f"Error processing circuit {circuit_id}: {e}")
 
     return payload
+
+
+# ===================================================
+# Batched Tail Reads (ATTACH + UNION ALL)
+# ===================================================
+# Instead of one connection and one query per circuit DB and tick, circuit
+# DBs are attached (read-only) to a few long-lived connections, at most
+# LIVE_ATTACH_BATCH per connection (SQLite's attach limit is 10 by default),
+# and the latest row of every attached DB comes back from one UNION ALL
+# statement. The statement text never changes while the circuit set stays
+# the same, so sqlite3 keeps it prepared. Files are only grouped with files
+# of the same column layout (one DBC -> one layout, so usually one group).
+#
+# Change detection: a file is only queried when it is due and its stat
+# signature (size / mtime of the DB and its -wal file) moved; every
+# LIVE_POLL_VERIFY_SECONDS an unchanged-looking file is confirmed with
+# PRAGMA data_version, which catches commits stat cannot see. Each file's
+# poll interval follows its observed write interval and backs off while
+# nothing is written (paused / finished circuits). Skipped files keep
+# serving their last record.
+
+def stat_signature(path: str):
+    """
+    (size, mtime_ns) of a DB and its WAL file; None if the DB is gone.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    try:
+        wal = os.stat(path + "-wal")
+        wal_sig = (wal.st_size, wal.st_mtime_ns)
+    except OSError:
+        wal_sig = None
+    return st.st_size, st.st_mtime_ns, wal_sig
+
+
+class _FileState:
+    __slots__ = ("signature", "data_version", "verified_at", "record",
+                 "interval", "next_poll", "last_change", "write_interval")
+
+    def __init__(self):
+        self.signature = None
+        self.data_version = None
+        self.verified_at = 0.0
+        self.record = None
+        self.interval = LIVE_POLL_MIN_INTERVAL
+        self.next_poll = 0.0
+        self.last_change = None
+        self.write_interval = None
+
+    def update(self, record, now: float):
+        """
+        Adapts the poll interval after a read: to half the write interval
+        while rows arrive, backing off while the last row stays the same.
+        """
+        if record is not None and (self.record is None or record.values != self.record.values):
+            if self.last_change is not None:
+                gap = now - self.last_change
+                self.write_interval = gap if self.write_interval is None else (
+                    self.write_interval + LIVE_POLL_SMOOTHING * (gap - self.write_interval))
+            self.last_change = now
+            self.interval = self.write_interval / 2 if self.write_interval else LIVE_POLL_MIN_INTERVAL
+        else:
+            self.interval *= LIVE_POLL_BACKOFF
+        self.interval = min(max(self.interval, LIVE_POLL_MIN_INTERVAL), LIVE_POLL_MAX_INTERVAL)
+        if record is not None:
+            self.record = record
+        self.schedule(now)
+
+    def schedule(self, now: float):
+        # a little early, so a file due "this tick" is not pushed to the next one
+        self.next_poll = now + self.interval - 0.1 * LIVE_POLL_MIN_INTERVAL
+
+
+class _TailGroup:
+    __slots__ = ("conn", "paths", "schemas", "journal_modes", "sql", "single_sql")
+
+    def __init__(self, entries):
+        """
+        entries: [(db_path, schema, index_mode)], all with the same columns.
+        """
+        # busy handling is run_read's job (see core.db_connect)
+        self.conn = sqlite3.connect("file::memory:", uri=True, timeout=0, check_same_thread=False)
+        self.paths = [path for path, _, _ in entries]
+        self.schemas = [schema for _, schema, _ in entries]
+        self.journal_modes = []
+        selects, self.single_sql = [], []
+        for i, (path, schema, mode) in enumerate(entries):
+            self.conn.execute(f"ATTACH DATABASE ? AS c{i};", (ro_uri(path),))
+            run_read(lambda: apply_read_pragmas(self.conn, f"c{i}"), "connect")
+            self.journal_modes.append(journal_mode(self.conn, f"c{i}"))
+            tail = f'SELECT * FROM c{i}."{schema.table_name}" {tail_order_clause(mode)} LIMIT 1'
+            selects.append(f"SELECT {i}, * FROM ({tail})")
+            self.single_sql.append(tail + ";")
+        self.sql = " UNION ALL ".join(selects) + ";"
+
+    def data_version(self, i: int):
+        return fetch_all(self.conn, f"PRAGMA c{i}.data_version;", reader="live_tail")[0][0]
+
+    def read(self, indexes=None):
+        """
+        {i: SampleRecord} for the given attached DBs (all if None): one
+        UNION ALL when most of the group is asked for, else one prepared
+        single-file query each.
+        """
+        if indexes is not None and len(indexes) * 2 <= len(self.paths):
+            return self._read_each(indexes)
+        try:
+            rows = fetch_all(self.conn, self.sql, reader="live_tail")
+        except sqlite3.Error as e:
+            # one bad / locked file must not blank out the whole group
+            logging.warning(f"Batched tail read failed ({e}), reading {len(self.paths)} DBs one by one")
+            return self._read_each(range(len(self.paths)) if indexes is None else indexes)
+        return {row[0]: self.schemas[row[0]].record(row[1:]) for row in rows}
+
+    def _read_each(self, indexes):
+        records = {}
+        for i in indexes:
+            try:
+                rows = fetch_all(self.conn, self.single_sql[i], reader="live_tail")
+            except sqlite3.Error as e:
+                logging.error(f"DB read error for {self.paths[i]}: {e}")
+                continue
+            if rows:
+                records[i] = self.schemas[i].record(rows[0])
+        return records
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+
+class AttachedTailReader:
+    """
+    read(db_paths) -> {db_path: SampleRecord} with the latest row of each DB
+    that has one. When the set of paths changes only the groups holding a
+    removed DB are closed; new DBs (and DBs without a table yet) are
+    attached on new connections, the other groups stay as they are.
+    """
+
+    def __init__(self, batch_size: int = LIVE_ATTACH_BATCH):
+        self.batch_size = max(1, batch_size)
+        self._groups = []
+        self._paths = frozenset()
+        self._pending = set()  # DBs without a table yet, retried every read
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def read(self, db_paths, force: bool = False):
+        """
+        force=True queries every file, ignoring intervals and change checks.
+        """
+        with self._lock:
+            paths = frozenset(db_paths)
+            if paths != self._paths or self._pending:
+                self._sync(paths)
+            now = time.monotonic()
+            queried = skipped = 0
+            for group in self._groups:
+                changed = list(range(len(group.paths))) if force else self._changed(group, now)
+                skipped += len(group.paths) - len(changed)
+                if not changed:
+                    continue
+                records = group.read(changed)
+                queried += len(records)
+                for i in changed:
+                    self._states[group.paths[i]].update(records.get(i), now)
+            metrics.live_poll_files_total.inc(queried, result="read")
+            metrics.live_poll_files_total.inc(skipped, result="skipped")
+            return {path: state.record for path, state in self._states.items() if state.record is not None}
+
+    def _changed(self, group: _TailGroup, now: float):
+        changed = []
+        for i, path in enumerate(group.paths):
+            state = self._states[path]
+            if now < state.next_poll:
+                continue
+            signature = stat_signature(path)
+            if signature != state.signature or state.record is None:
+                state.signature = signature
+                changed.append(i)
+                continue
+            if now - state.verified_at >= LIVE_POLL_VERIFY_SECONDS:
+                state.verified_at = now
+                try:
+                    version = group.data_version(i)
+                except sqlite3.Error as e:
+                    logging.error(f"data_version check failed for {path}: {e}")
+                    version = None
+                if version != state.data_version:
+                    state.data_version = version
+                    changed.append(i)
+                    continue
+            state.update(None, now)  # looked, nothing new: back off
+        return changed
+
+    def _sync(self, paths):
+        kept, reattach = [], set()
+        for group in self._groups:
+            if all(path in paths for path in group.paths):
+                kept.append(group)
+            else:
+                reattach.update(path for path in group.paths if path in paths)
+                group.close()
+        closed = len(self._groups) - len(kept)
+        self._groups = kept
+        attached = {path for group in kept for path in group.paths}
+        self._pending &= paths
+        groups = self._attach(reattach | (paths - attached))
+
+        attached.update(path for group in groups for path in group.paths)
+        # kept files keep their record and learned interval
+        self._states = {path: self._states.get(path) or _FileState() for path in attached}
+        self._paths = paths
+        if groups or closed:
+            logging.info(f"Tail reader: {len(attached)} DBs on {len(self._groups)} connection(s)")
+
+    def _attach(self, paths):
+        """
+        Attaches DBs on new connections; DBs without a table yet (or that
+        fail to attach) go to _pending and are retried on the next read.
+        Returns the new groups.
+        """
+        by_layout = {}
+        for path in sorted(paths):
+            try:
+                with closing(connect_ro(path)) as conn:
+                    schema = run_read(lambda: get_schema(path, conn.cursor()), "live_tail")
+            except sqlite3.Error as e:
+                if path not in self._pending:
+                    logging.error(f"Error reading schema of {path}: {e}")
+                schema = None
+            if schema is None:
+                self._pending.add(path)
+                continue
+            self._pending.discard(path)
+            mode = ensure_timestamp_index(path, schema.table_name)
+            by_layout.setdefault((schema.table_name, schema.columns), []).append((path, schema, mode))
+
+        groups = []
+        for entries in by_layout.values():
+            for start in range(0, len(entries), self.batch_size):
+                batch = entries[start:start + self.batch_size]
+                try:
+                    groups.append(_TailGroup(batch))
+                except sqlite3.Error as e:
+                    logging.error(f"Error attaching circuit DBs: {e}")
+                    self._pending.update(path for path, _, _ in batch)
+        self._groups.extend(groups)
+        return groups
+
+    def close_groups(self):
+        for group in self._groups:
+            group.close()
+        self._groups = []
+
+    def status(self):
+        """
+        Per-file poll state (interval, observed write interval, last change).
+        """
+        with self._lock:
+            now = time.monotonic()
+            journals = {path: mode for group in self._groups for path, mode in zip(group.paths, group.journal_modes)}
+            return {
+                os.path.basename(path): {
+                    "journal_mode": journals.get(path),
+                    "poll_interval": round(state.interval, 3),
+                    "write_interval": None if state.write_interval is None else round(state.write_interval, 3),
+                    "seconds_since_change": None if state.last_change is None else round(now - state.last_change, 1),
+                    "next_poll_in": round(max(0.0, state.next_poll - now), 3),
+                }
+                for path, state in self._states.items()
+            }
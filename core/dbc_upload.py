@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from core import http_client
+from config import DBC_UPLOAD_CHUNK, DBC_REGISTRY_FILE, DBC_REUSE_FIELD
+
+# ===================================================
+# Streaming DBC Upload for create-db-files
+# ===================================================
+# The multipart body is produced on the fly from small chunks of each DBC
+# file, with the Content-Length computed up front, so large DBCs are never
+# held in memory and the request is not sent chunked.
+# DBCs are identified by SHA-256 of their content:
+#   - the same DBC passed several times in one call is sent once
+#   - successful uploads are recorded per device in DBC_REGISTRY_FILE; when
+#     the device API accepts a hash reference (DBC_REUSE_FIELD), DBCs a
+#     device already has are referenced by hash instead of re-sent
+
+_digest_cache = {}  # path -> (mtime_ns, size, sha256)
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str):
+    """
+    SHA-256 of a file, cached until its mtime or size changes.
+    """
+    st = os.stat(path)
+    with _digest_lock:
+        cached = _digest_cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DBC_UPLOAD_CHUNK), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _digest_lock:
+        _digest_cache[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+# ===================================================
+# Multipart Body
+# ===================================================
+class MultipartStream:
+    """
+    Iterable multipart/form-data body with a known length.
+    fields: list of (name, value); files: list of (name, file name, path).
+    Every iteration re-opens the files, so a retried request can resend it.
+    """
+
+    def __init__(self, fields, files, chunk_size: int = DBC_UPLOAD_CHUNK):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0
+        self._parts = []
+        for name, value in fields:
+            header = (f"--{self.boundary}\r\n"
+                      f'Content-Disposition: form-data; name="{name}"\r\n\r\n').encode()
+            self._parts.append((header, str(value).encode(), None))
+        for name, file_name, path in files:
+            header = (f"--{self.boundary}\r\n"
+                      f'Content-Disposition: form-data; name="{name}"; filename="{file_name}"\r\n'
+                      f"Content-Type: application/octet-stream\r\n\r\n").encode()
+            self._parts.append((header, None, path))
+        self._closing = f"--{self.boundary}--\r\n".encode()
+        self._length = len(self._closing) + sum(
+            len(header) + (len(body) if path is None else os.path.getsize(path)) + 2
+            for header, body, path in self._parts
+        )
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        self.bytes_sent = 0
+        for header, body, path in self._parts:
+            yield self._count(header)
+            if path is None:
+                yield self._count(body)
+            else:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                        yield self._count(chunk)
+            yield self._count(b"\r\n")
+        yield self._count(self._closing)
+
+    def _count(self, data: bytes):
+        self.bytes_sent += len(data)
+        return data
+
+
+# ===================================================
+# Upload Registry
+# ===================================================
+class DBCRegistry:
+    """
+    sha256 -> {name, size, devices, uploaded_at}, persisted as JSON.
+    """
+
+    def __init__(self, path: str = DBC_REGISTRY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                logging.error(f"Error loading DBC registry: {e}")
+
+    def has(self, digest: str, device_id):
+        entry = self._entries.get(digest)
+        return bool(entry) and str(device_id) in entry["devices"]
+
+    def record(self, digest: str, name: str, size: int, device_ids):
+        with self._lock:
+            entry = self._entries.setdefault(digest, {"name": name, "size": size, "devices": []})
+            for did in device_ids:
+                if str(did) not in entry["devices"]:
+                    entry["devices"].append(str(did))
+            entry["uploaded_at"] = datetime.now().isoformat()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+dbc_registry = DBCRegistry()
+
+
+# ===================================================
+# create-db-files Upload
+# ===================================================
+def create_db_files(url: str, device_ids, circuit_ids, dbc_files=None, time_delay=1000,
+                    headers=None, timeout=None):
+    """
+    Streams one create-db-files request for many devices/circuits.
+    Returns {"ok", "status", "response", "upload": {...throughput stats}}.
+    """
+    fields = [("DeviceIDs", did) for did in device_ids]
+    fields += [("CircuitIds", cid) for cid in circuit_ids]
+    fields.append(("TimeDelay", time_delay))
+
+    files, reused, seen = [], [], set()
+    for path in dbc_files or []:
+        digest = file_digest(path)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        if DBC_REUSE_FIELD and all(dbc_registry.has(digest, did) for did in device_ids):
+            fields.append((DBC_REUSE_FIELD, digest))
+            reused.append(os.path.basename(path))
+        else:
+            files.append(("DBCFiles", os.path.basename(path), path))
+
+    body = MultipartStream(fields, files)
+    send_headers = {k: v for k, v in (headers or {}).items() if k.lower() != "content-type"}
+    send_headers["Content-Type"] = body.content_type
+
+    kwargs = {"timeout": timeout} if timeout else {"group": "upload"}
+    start = time.perf_counter()
+    res = http_client.post(url, data=body, headers=send_headers, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    upload = {
+        "bytes": body.bytes_sent,
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(body.bytes_sent / elapsed / 1e6, 2) if elapsed > 0 else None,
+        "sent_files": [name for _, name, _ in files],
+        "reused_files": reused,
+    }
+    logging.info(f"create-db-files upload: {upload['bytes']} bytes in {upload['seconds']}s "
+                 f"({upload['mb_per_s']} MB/s), sent {len(files)} DBC(s), reused {len(reused)}")
+
+    ok = res.status_code == 200
+    if ok:
+        for _, name, path in files:
+            dbc_registry.record(file_digest(path), name, os.path.getsize(path), device_ids)
+    return {"ok": ok, "status": res.status_code, "response": res, "upload": upload}
@@ -1,7 +1,56 @@
-import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from core import http_client, dbc_upload
 from core.auth import get_auth_headers
-from config import API_BASE_URL
+from config import API_BASE_URL, BULK_COMMAND_WORKERS
+
+COMMAND_ACTIONS = ("pause", "stop", "continue")
+
+
+def parse_id(value):
+    """
+    Device / circuit ID from a request (int or numeric string) -> int.
+    Every command path stores and compares IDs in this form. Raises
+    ValueError for anything else.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid ID: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError(f"Invalid ID: {value!r}")
+
+
+def dispatch_bulk(commands, handlers, max_workers: int = BULK_COMMAND_WORKERS):
+    """
+    Runs many (device_id, circuit_no, action) commands concurrently.
+    handlers maps action -> callable(device_id, circuit_no) returning a dict.
+    Duplicate commands are sent once; results come back in request order.
+    """
+    unique = list(dict.fromkeys((parse_id(d), parse_id(c), str(a).lower()) for d, c, a in commands))
+
+    def run(command):
+        device_id, circuit_no, action = command
+        handler = handlers.get(action)
+        if handler is None:
+            result = {"ok": False, "error": f"Unknown action '{action}'"}
+        else:
+            try:
+                result = handler(device_id, circuit_no)
+            except Exception as e:
+                logging.error(f"Bulk {action} error for Device {device_id}, Circuit {circuit_no}: {e}")
+                result = {"ok": False, "error": str(e)}
+        return {"device_id": device_id, "circuit_no": circuit_no, "action": action, **result}
+
+    if not unique:
+        return []
+    workers = max(1, min(max_workers, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-cmd") as executor:
+        return list(executor.map(run, unique))
+
 
 # ==========================================================
 # Device API Proxy Layer
@@ -9,7 +58,8 @@ from config import API_BASE_URL
 class DeviceAPI:
     """
     This class wraps around your existing device HTTP API.
-    All requests automatically attach the JWT Authorization header.
+    All requests automatically attach the JWT Authorization header and run
+    on the shared keep-alive session (core.http_client).
     """
 
     def __init__(self):
@@ -21,7 +71,7 @@ class DeviceAPI:
     def get_all_devices(self):
         url = f"{self.base}/api/Device/GetAllDevice"
         try:
-            res = requests.get(url, headers=get_auth_headers(), timeout=10)
+            res = http_client.get(url, headers=get_auth_headers(), group="device")
             if res.status_code == 200:
                 return res.json()
             logging.warning(f"GetAllDevice failed: {res.status_code}")
@@ -33,7 +83,7 @@ class DeviceAPI:
     def register_device(self, ip_address: str):
         url = f"{self.base}/api/Device/register?ipAddress={ip_address}"
         try:
-            res = requests.post(url, headers=get_auth_headers(), timeout=5)
+            res = http_client.post(url, endpoint="/api/Device/register", headers=get_auth_headers(), group="device")
             if res.status_code == 200:
                 logging.info(f"Device registered: {ip_address}")
                 return res.json()
@@ -46,7 +96,7 @@ class DeviceAPI:
     def get_device_ip(self, device_id: int):
         url = f"{self.base}/api/Device/ip/{device_id}"
         try:
-            res = requests.get(url, headers=get_auth_headers(), timeout=5)
+            res = http_client.get(url, endpoint="/api/Device/ip", headers=get_auth_headers(), group="device")
             return res.json() if res.status_code == 200 else None
         except Exception as e:
             logging.error(f"Get device IP error: {e}")
@@ -64,13 +114,28 @@ class DeviceAPI:
     def continue_circuit(self, device_id: int, circuit_no: int):
         return self._post_command("/api/command/Continue", device_id, circuit_no)
 
+    def bulk_command(self, commands, max_workers: int = BULK_COMMAND_WORKERS):
+        """
+        Sends many (device_id, circuit_no, action) commands in parallel over
+        the pooled session; returns one result dict per distinct command.
+        """
+        handlers = {
+            "pause": self.pause_circuit,
+            "stop": self.stop_circuit,
+            "continue": self.continue_circuit,
+        }
+        results = dispatch_bulk(commands, handlers, max_workers)
+        failed = sum(1 for r in results if not r.get("ok"))
+        logging.info(f"[CMD] Bulk command: {len(results)} sent, {failed} failed")
+        return results
+
     def _post_command(self, endpoint: str, device_id: int, circuit_no: int):
         """
         Sends a control command to pause, stop, or continue a circuit.
         """
         try:
             url = f"{self.base}{endpoint}?circuitNo={circuit_no}&DeviceId={device_id}"
-            res = requests.post(url, headers=get_auth_headers(), timeout=5)
+            res = http_client.post(url, endpoint=endpoint, headers=get_auth_headers(), group="command")
             ok = res.status_code == 200
             msg = "Success" if ok else f"Failed ({res.status_code})"
             logging.info(f"[CMD] {endpoint} -> Device {device_id}, Circuit {circuit_no}: {msg}")
@@ -85,29 +150,28 @@ class DeviceAPI:
     def create_db_files(self, device_ids, circuit_ids, dbc_files=None, time_delay=1000):
         """
         Calls /api/DBCUpload/create-db-files endpoint to start data collection.
+        DBC files are streamed (not buffered) and de-duplicated by content hash.
         """
         url = f"{self.base}/api/DBCUpload/create-db-files"
-
-        multipart = []
         try:
-            for did in device_ids:
-                multipart.append(("DeviceIDs", (None, str(did))))
-            for cid in circuit_ids:
-                multipart.append(("CircuitIds", (None, str(cid))))
-            multipart.append(("TimeDelay", (None, str(time_delay))))
-
-            # Attach any provided DBC files
-            for path in (dbc_files or []):
-                with open(path, "rb") as f:
-                    multipart.append(("DBCFiles", (path.split("/")[-1], f, "application/octet-stream")))
-
-            res = requests.post(url, files=multipart, headers=get_auth_headers(), timeout=30)
-            if res.status_code == 200:
+            result = dbc_upload.create_db_files(url, device_ids, circuit_ids, dbc_files, time_delay,
+                                                headers=get_auth_headers())
+            res = result["response"]
+            if result["ok"]:
                 logging.info(f"create-db-files successful: {res.status_code}")
-                return {"ok": True, "data": res.json()}
+                return {"ok": True, "data": res.json(), "upload": result["upload"]}
             else:
                 logging.warning(f"create-db-files failed: {res.status_code}")
-                return {"ok": False, "message": res.text}
+                return {"ok": False, "message": res.text, "upload": result["upload"]}
         except Exception as e:
             logging.error(f"Error in create_db_files: {e}")
             return {"ok": False, "error": str(e)}
+
+    # ------------------------------
+    # Diagnostics
+    # ------------------------------
+    def latency_stats(self):
+        """
+        Request count, errors and latency per endpoint since startup.
+        """
+        return http_client.latency_stats.snapshot()
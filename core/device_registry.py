@@ -0,0 +1,154 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+from core.device_api import DeviceAPI
+from config import DEFAULT_DEVICE_ID, DEVICE_CACHE_TTL, DEVICE_REFRESH_INTERVAL
+
+# ===================================================
+# Device Registry Cache
+# ===================================================
+# Devices and their IPs are fetched from the device API by a background
+# thread and kept in memory. Readers always get the last good list at once;
+# a stale list triggers a refresh without waiting for it. Until the first
+# successful fetch the default device is served, as before.
+
+RegistrySnapshot = namedtuple("RegistrySnapshot", ["devices", "by_id", "fetched_at"])
+
+_ID_KEYS = ("id", "deviceId", "DeviceId", "deviceID")
+_NAME_KEYS = ("name", "deviceName", "DeviceName")
+_IP_KEYS = ("ipAddress", "IpAddress", "ip", "IP")
+
+
+def _first(record, keys):
+    for key in keys:
+        if record.get(key) not in (None, ""):
+            return record[key]
+    return None
+
+
+def normalize_device(record: dict):
+    """
+    Device record with guaranteed "id" and "name" keys (original keys kept).
+    """
+    device = dict(record)
+    device_id = _first(record, _ID_KEYS)
+    try:
+        device_id = int(device_id)
+    except (TypeError, ValueError):
+        pass
+    device["id"] = device_id
+    device["name"] = _first(record, _NAME_KEYS) or f"BTS Controller {device_id}"
+    ip = _first(record, _IP_KEYS)
+    if ip:
+        device["ip"] = ip
+    return device
+
+
+def _default_snapshot():
+    device = {"id": DEFAULT_DEVICE_ID, "name": f"BTS Controller {DEFAULT_DEVICE_ID}"}
+    return RegistrySnapshot([device], {DEFAULT_DEVICE_ID: device}, 0.0)
+
+
+class DeviceRegistry:
+    """
+    In-memory device list and IP lookup with TTL and background refresh.
+    """
+
+    def __init__(self, api: DeviceAPI = None, ttl: float = DEVICE_CACHE_TTL,
+                 refresh_interval: float = DEVICE_REFRESH_INTERVAL):
+        self.api = api or DeviceAPI()
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._snapshot = _default_snapshot()
+        self._ips = {}  # device_id -> (ip, fetched_at)
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_attempt = 0.0
+
+    # ------------------------------
+    # Refresh
+    # ------------------------------
+    def refresh(self):
+        """
+        Fetches the device list now; keeps the old list if the fetch fails.
+        Concurrent callers share one request.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            with self._refresh_lock:  # wait for the running refresh
+                return not self.is_stale()
+        try:
+            self._last_attempt = time.time()
+            records = self.api.get_all_devices()
+            if isinstance(records, dict):
+                records = records.get("devices") or records.get("data") or []
+            if not records:
+                return False
+            devices = [normalize_device(r) for r in records if isinstance(r, dict)]
+            now = time.time()
+            self._snapshot = RegistrySnapshot(devices, {d["id"]: d for d in devices}, now)
+            for d in devices:
+                if d.get("ip"):
+                    self._ips[d["id"]] = (d["ip"], now)
+            return True
+        except Exception as e:
+            logging.error(f"Device registry refresh error: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def is_stale(self):
+        return time.time() - self._snapshot.fetched_at > self.ttl
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="device-registry", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            self.refresh()
+            self._wakeup.wait(self.refresh_interval)
+
+    # ------------------------------
+    # Lookups
+    # ------------------------------
+    def devices(self):
+        """
+        Cached device list; never blocks on the device API.
+        """
+        # wake the refresher early, but don't hammer the API while it is down
+        if self.is_stale() and time.time() - self._last_attempt > min(self.ttl, self.refresh_interval):
+            self._wakeup.set()
+        return self._snapshot.devices
+
+    def get(self, device_id):
+        return self._snapshot.by_id.get(device_id)
+
+    def get_ip(self, device_id: int):
+        """
+        Device IP from the cache; fetched (once per TTL) on a miss.
+        """
+        cached = self._ips.get(device_id)
+        if cached and time.time() - cached[1] <= self.ttl:
+            return cached[0]
+        result = self.api.get_device_ip(device_id)
+        ip = (result.get("ipAddress") or result.get("ip")) if isinstance(result, dict) else result
+        if ip:
+            self._ips[device_id] = (ip, time.time())
+            return ip
+        return cached[0] if cached else None  # stale IP beats none
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            "count": len(snapshot.devices),
+            "updated_at": snapshot.fetched_at or None,
+            "stale": self.is_stale(),
+        }
+
+
+device_registry = DeviceRegistry()
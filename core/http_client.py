@@ -0,0 +1,147 @@
+import time
+import logging
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_TIMEOUTS,
+)
+
+# ===================================================
+# Shared HTTP Session for the Device API
+# ===================================================
+# One keep-alive session (connection pool per host) is shared by DeviceAPI,
+# core.auth and the command helpers, so a burst of pause/stop/continue calls
+# reuses open TCP connections instead of opening one per request.
+# Retries:
+#   - connection errors are retried for every method (nothing was sent yet)
+#   - 502/503/504 and read errors are retried only for idempotent methods
+# Timeouts are (connect, read) tuples picked per endpoint group.
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+LATENCY_WINDOW = 512  # recent samples kept per endpoint for percentiles
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def timeout_for(group: str):
+    return HTTP_TIMEOUTS.get(group, HTTP_TIMEOUTS["default"])
+
+
+# ===================================================
+# Latency Statistics
+# ===================================================
+class LatencyStats:
+    """
+    Per-endpoint request count, errors and latency (mean / p50 / p95 / max).
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            entry = self._stats.get(endpoint)
+            if entry is None:
+                entry = self._stats[endpoint] = {
+                    "count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                    "recent": deque(maxlen=self.window),
+                }
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["recent"].append(seconds)
+            if seconds > entry["max"]:
+                entry["max"] = seconds
+            if not ok:
+                entry["errors"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, entry in self._stats.items():
+                recent = sorted(entry["recent"])
+                n = len(recent)
+                result[endpoint] = {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "mean_ms": round(entry["total"] / entry["count"] * 1000, 2),
+                    "p50_ms": round(recent[n // 2] * 1000, 2) if n else None,
+                    "p95_ms": round(recent[min(n - 1, int(n * 0.95))] * 1000, 2) if n else None,
+                    "max_ms": round(entry["max"] * 1000, 2),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+latency_stats = LatencyStats()
+
+
+def request(method: str, url: str, endpoint: str = None, group: str = "default", **kwargs):
+    """
+    Sends a request on the shared session and records its latency under
+    `endpoint` (defaults to the URL path). Raises like requests does.
+    """
+    endpoint = "/" + (endpoint or url.split("?", 1)[0].split("://", 1)[-1].partition("/")[2]).lstrip("/")
+    kwargs.setdefault("timeout", timeout_for(group))
+    start = time.perf_counter()
+    ok = False
+    try:
+        res = get_session().request(method, url, **kwargs)
+        ok = res.status_code < 500
+        return res
+    except requests.RequestException as e:
+        logging.debug(f"HTTP {method} {endpoint} failed: {e}")
+        raise
+    finally:
+        latency_stats.record(f"{method} {endpoint}", time.perf_counter() - start, ok)
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import atexit
+import signal
+import logging
+import threading
+from datetime import datetime
+from core import metrics
+from core.ipc import EventPublisher
+from core.plc import send_result_to_plc
+from core.results_db import load_thresholds, send_result_to_database
+from core.analytics_store import analytics_store
+from core.ingestion import IngestionPipeline
+from core.ingest_scheduler import IngestionScheduler
+from config import LOG_DIR, DATA_READ_INTERVAL, INGEST_FILE_PATH, INGEST_STATUS_INTERVAL
+
+# ===================================================
+# Ingestion Daemon
+# ===================================================
+# Watches the tester export folder and runs every new workbook through the
+# ingestion pipeline (PLC verdict, SQL Server, analytics). Runs either as
+# its own process, publishing dashboard events to the web process over
+# core.ipc, or as threads inside app.py (INGEST_MODE = "thread").
+#
+# Usage (from the project root; app.py starts it with a random
+# BTS_INGEST_AUTHKEY, set the same key in both processes when started by hand):
+#     python -m core.ingest_daemon
+
+PROCESSED_FILES = []
+
+PRVEIOS_BATTERY_END_TIME = {
+    "6":{
+        "1":0,
+        "2":0,
+    },
+    "5":{
+        "1":0,
+        "2":0,
+        "3":0,
+        "4":0,
+        "5":0,
+        "6":0,
+        "7":0,
+        "8":0,
+        "9" :0,
+        "10":0,
+        "11":0,
+        "12":0,
+        "13":0,
+        "14":0,
+        "15":0,
+        "16":0,
+    },
+    "1":{
+        "1":0,
+        "2":0,
+        "3":0,
+        "4":0,
+        "5":0,
+        "6":0,
+        "7":0,
+        "8":0,
+        "9" :0,
+        "10":0,
+        "11":0,
+        "12":0,
+        "13":0,
+        "14":0,
+        "15":0,
+        "16":0,
+
+    }
+}
+
+
+def build_pipeline(emit):
+    """
+    Pipeline with the production sinks; emit(payload) delivers dashboard updates.
+    Returns (pipeline, scheduler); the scheduler is not started.
+    """
+    pipeline = IngestionPipeline(
+        load_config=load_thresholds,
+        emit=emit,
+        send_to_plc=send_result_to_plc,
+        send_to_database=send_result_to_database,
+        record_result=analytics_store.record_result,
+        previous_end_times=PRVEIOS_BATTERY_END_TIME,
+    )
+    # New files are queued by estimated cost instead of processed in listdir order
+    return pipeline, IngestionScheduler(pipeline.process_file)
+
+
+def background_reader_thread(scheduler):
+    while True:
+        try:
+            # check if new file is available in base path
+            time.sleep(DATA_READ_INTERVAL)
+            # base_path = os.path.join(BASE_DIR, "data_files")
+            # date in yyyy-mm-dd 
+            today_str = datetime.now().strftime("%Y-%m-%d")
+            base_path = os.path.join(INGEST_FILE_PATH, today_str)
+            detect_start = time.perf_counter()
+            # check if path exist or not
+            if not os.path.exists(base_path):
+                continue
+            files = [f for f in os.listdir(base_path) if f.endswith(".xlsx") and not f.startswith("~$")]
+            metrics.ingest_stage_seconds.observe(time.perf_counter() - detect_start, stage="file_detection", test_type="all")
+            # print("Files found:", files)
+            for file in files:
+                if file not in PROCESSED_FILES:
+                    PROCESSED_FILES.append(file)
+
+                    scheduler.submit(base_path, file)
+                else:
+                    logging.debug("No new files to process.")
+                    continue
+        except Exception as e:
+            print(f"Error in background_reader_thread: {e}")
+            logging.error(f"Error in background_reader_thread: {e}")
+
+
+def start_in_thread(emit):
+    """
+    In-process mode: scheduler workers plus the folder watcher as daemon threads.
+    """
+    pipeline, scheduler = build_pipeline(emit)
+    scheduler.start()
+    reader_thread = threading.Thread(target=background_reader_thread, args=(scheduler,))
+    reader_thread.daemon = True
+    reader_thread.start()
+    return scheduler
+
+
+def _publish_status(publisher, scheduler):
+    while True:
+        time.sleep(INGEST_STATUS_INTERVAL)
+        try:
+            publisher.publish("ingest_status", {
+                "queue": scheduler.status(),
+                "metrics": metrics.render(),
+                "pid": os.getpid(),
+                "at": time.time(),
+            }, buffer=False)
+        except Exception as e:
+            logging.error(f"Error publishing ingestion status: {e}")
+
+
+def _shutdown(signum, frame):
+    # atexit does not run when the process is killed by a signal
+    logging.info(f"Ingestion daemon stopping (signal {signum}), flushing analytics rows")
+    analytics_store.flush()
+    sys.exit(0)
+
+
+def main():
+    logging.basicConfig(filename=os.path.join(LOG_DIR, "ingest.log"), level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.info("===== BTS Ingestion Daemon Started =====")
+    atexit.register(analytics_store.flush)
+    signal.signal(signal.SIGTERM, _shutdown)
+    if hasattr(signal, "SIGBREAK"):  # Windows: CTRL_BREAK_EVENT from app.py
+        signal.signal(signal.SIGBREAK, _shutdown)
+
+    publisher = EventPublisher()
+    try:
+        publisher.start()
+    except (OSError, RuntimeError) as e:
+        # another daemon already owns the channel (e.g. started by hand), or no authkey
+        logging.error(f"Ingestion daemon not started, cannot open the IPC channel: {e}")
+        print(f"Ingestion daemon not started: {e}")
+        sys.exit(1)
+
+    pipeline, scheduler = build_pipeline(lambda payload: publisher.publish("live_data", payload))
+    scheduler.start()
+    analytics_store.start()
+    threading.Thread(target=_publish_status, args=(publisher, scheduler), name="ingest-status", daemon=True).start()
+    print(f"Ingestion daemon watching {INGEST_FILE_PATH}")
+    background_reader_thread(scheduler)
+
+
+if __name__ == "__main__":
+    main()
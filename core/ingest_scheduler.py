@@ -0,0 +1,221 @@
+import os
+import time
+import logging
+import threading
+from core import metrics
+from core.ingestion import parse_file_name, classify_test_type
+from config import (INGEST_FAST_WORKERS, INGEST_BULK_WORKERS, INGEST_FAST_LANE_MAX_SECONDS,
+                    INGEST_SECONDS_PER_MB, INGEST_COST_SMOOTHING, INGEST_MAX_WAIT_SECONDS)
+
+# ===================================================
+# Size-Aware Ingestion Scheduler
+# ===================================================
+# New battery files are queued instead of processed in os.listdir order.
+# Each file's cost is estimated from its size and test type (the same
+# Sanity / CDC / HRD classification the pipeline uses):
+#   - cheap files go to the fast lane, expensive ones to the bulk lane
+#   - within a lane the cheapest file goes first; a file that has waited
+#     INGEST_MAX_WAIT_SECONDS goes first regardless of cost
+#   - files of one device channel are still processed one at a time in
+#     file-name (test start) order, so cycle timing stays correct
+# Bulk workers prefer fast-lane files and only start a bulk file when no
+# fast file is ready (or the bulk file is overdue): parsing is CPU-bound, so
+# a CDC started while small files wait would slow every one of them down.
+# Fast workers never take bulk files, so a small file landing while a big
+# one is being parsed starts at once instead of waiting behind it.
+
+FAST, BULK = "fast", "bulk"
+
+
+class IngestJob:
+    __slots__ = ("base_path", "file", "test_type", "size", "cost", "lane", "channel",
+                 "started_at", "seq", "enqueued_at")
+
+    def __init__(self, base_path, file, test_type, size, cost, lane, channel, started_at, seq):
+        self.base_path = base_path
+        self.file = file
+        self.test_type = test_type
+        self.size = size
+        self.cost = cost
+        self.lane = lane
+        self.channel = channel
+        self.started_at = started_at
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+
+    def info(self):
+        return {
+            "file": self.file,
+            "test_type": self.test_type,
+            "size": self.size,
+            "estimated_seconds": round(self.cost, 2),
+            "lane": self.lane,
+            "waiting_seconds": round(time.perf_counter() - self.enqueued_at, 2),
+        }
+
+
+class IngestionScheduler:
+    """
+    Two-lane queue in front of process(base_path, file).
+    """
+
+    def __init__(self, process, fast_workers: int = INGEST_FAST_WORKERS,
+                 bulk_workers: int = INGEST_BULK_WORKERS,
+                 fast_lane_max_seconds: float = INGEST_FAST_LANE_MAX_SECONDS):
+        self.process = process
+        self.fast_workers = fast_workers
+        self.bulk_workers = bulk_workers
+        self.fast_lane_max_seconds = fast_lane_max_seconds
+        self.seconds_per_mb = dict(INGEST_SECONDS_PER_MB)
+        self._queues = {FAST: [], BULK: []}
+        self._running = {}  # channel -> job
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._threads = []
+        self.completed = 0
+        self.failed = 0
+
+    # ------------------------------
+    # Cost estimate
+    # ------------------------------
+    def estimate(self, test_type: str, size: int):
+        return size / 1e6 * self.seconds_per_mb.get(test_type, max(self.seconds_per_mb.values()))
+
+    def _learn(self, job: IngestJob, seconds: float):
+        if job.size <= 0:
+            return
+        observed = seconds / (job.size / 1e6)
+        with self._cond:
+            current = self.seconds_per_mb.get(job.test_type, observed)
+            self.seconds_per_mb[job.test_type] = (
+                (1 - INGEST_COST_SMOOTHING) * current + INGEST_COST_SMOOTHING * observed)
+
+    # ------------------------------
+    # Queue
+    # ------------------------------
+    def submit(self, base_path: str, file: str):
+        """
+        Queues one file; returns its job, or None if the name can't be parsed
+        (processed straight away so the pipeline logs it as before).
+        """
+        try:
+            started_at, device_id, device_channel, battery_id = parse_file_name(file)
+            size = os.path.getsize(os.path.join(base_path, file))
+        except Exception as e:
+            logging.error(f"Ingestion scheduler: cannot classify {file}: {e}")
+            self._run_job(IngestJob(base_path, file, "unknown", 0, 0.0, FAST, None, None, -1))
+            return None
+        test_type = classify_test_type(battery_id, size)
+        cost = self.estimate(test_type, size)
+        lane = FAST if cost <= self.fast_lane_max_seconds else BULK
+        with self._cond:
+            self._seq += 1
+            job = IngestJob(base_path, file, test_type, size, cost, lane,
+                            (device_id, device_channel), started_at, self._seq)
+            self._queues[lane].append(job)
+            self._cond.notify_all()
+        logging.info(f"Queued {file} ({test_type}, {size} bytes, ~{cost:.1f}s) on the {lane} lane")
+        return job
+
+    def _eligible(self, job: IngestJob):
+        if job.channel in self._running:
+            return False
+        # an older test of the same channel must go first
+        for lane_jobs in self._queues.values():
+            for other in lane_jobs:
+                if other.channel == job.channel and (other.started_at, other.seq) < (job.started_at, job.seq):
+                    return False
+        return True
+
+    def _pick(self, lanes):
+        """
+        Next job for a worker serving `lanes` (in preference order); caller holds _cond.
+        """
+        now = time.perf_counter()
+        ready = {lane: [j for j in self._queues[lane] if self._eligible(j)] for lane in lanes}
+        overdue = [j for lane in lanes for j in ready[lane] if now - j.enqueued_at >= INGEST_MAX_WAIT_SECONDS]
+        if overdue:
+            job = min(overdue, key=lambda j: j.seq)
+        else:
+            lane = next((lane for lane in lanes if ready[lane]), None)
+            if lane is None:
+                return None
+            job = min(ready[lane], key=lambda j: (j.cost, j.seq))
+        self._queues[job.lane].remove(job)
+        self._running[job.channel] = job
+        return job
+
+    # ------------------------------
+    # Workers
+    # ------------------------------
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.fast_workers):
+            self._threads.append(threading.Thread(
+                target=self._worker, args=((FAST,),), name=f"ingest-fast-{i}", daemon=True))
+        for i in range(self.bulk_workers):
+            self._threads.append(threading.Thread(
+                target=self._worker, args=((FAST, BULK),), name=f"ingest-bulk-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def _worker(self, lanes):
+        while True:
+            with self._cond:
+                job = self._pick(lanes)
+                while job is None:
+                    self._cond.wait()
+                    job = self._pick(lanes)
+            try:
+                self._run_job(job)
+            finally:
+                with self._cond:
+                    self._running.pop(job.channel, None)
+                    self._cond.notify_all()
+
+    def _run_job(self, job: IngestJob):
+        wait = time.perf_counter() - job.enqueued_at
+        metrics.ingest_queue_wait_seconds.observe(wait, lane=job.lane, test_type=job.test_type)
+        start = time.perf_counter()
+        try:
+            self.process(job.base_path, job.file)
+            ok = True
+        except Exception as e:
+            logging.error(f"Error processing {job.file}: {e}")
+            ok = False
+        seconds = time.perf_counter() - start
+        metrics.ingest_verdict_seconds.observe(wait + seconds, lane=job.lane, test_type=job.test_type)
+        with self._cond:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if ok:
+            self._learn(job, seconds)
+        logging.info(f"Ingested {job.file} on the {job.lane} lane: waited {wait:.2f}s, processed in {seconds:.2f}s")
+
+    def wait_idle(self, timeout: float = None):
+        """
+        Blocks until nothing is queued or running (benchmarks, shutdown).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queues[FAST] or self._queues[BULK] or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def status(self):
+        with self._cond:
+            return {
+                "queued": {lane: [j.info() for j in jobs] for lane, jobs in self._queues.items()},
+                "running": [j.info() for j in self._running.values()],
+                "completed": self.completed,
+                "failed": self.failed,
+                "seconds_per_mb": {k: round(v, 3) for k, v in self.seconds_per_mb.items()},
+                "queue_wait": {f"{lane}/{test_type}": s for (lane, test_type), s
+                               in metrics.ingest_queue_wait_seconds.summary().items()},
+            }
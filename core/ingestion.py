@@ -0,0 +1,547 @@
+import os
+import math
+import logging
+import threading
+from datetime import datetime
+import pandas as pd
+from core.metrics import StageTimer
+from core.timestamps import parse_times
+
+# ===================================================
+# Battery Result File Ingestion Pipeline
+# ===================================================
+# Per-file extraction / evaluation of the tester export workbooks
+# (Sanity, CDC, HRD). The pipeline itself has no I/O dependencies: config
+# loading, dashboard emit, PLC write, DB write and analytics are passed in
+# as callables, so the same code runs in app.py and in the benchmarks.
+
+
+# =========================================================
+#  Sheet / Metric Helpers
+# =========================================================
+def read_sheet(file_path=None, sheet_name=None):
+    try:
+        return pd.read_excel(file_path, sheet_name=sheet_name)
+    except Exception as e:
+        logging.error(f"Error reading sheet {sheet_name} from {file_path}: {e}")
+        return pd.DataFrame()
+    
+def max_temp_diff(df=None,min_col="MinTemp", max_col="MaxTemp",step_no=None):
+    try:
+        if step_no is not None:
+            step_no = str(step_no)
+            if "-" in step_no:
+                step_parts = step_no.split("-")
+                if len(step_parts) == 2:
+                    start_step = int(step_parts[0])
+                    end_step = int(step_parts[1])
+                    df = df[(df["Step Number"] >= start_step) & (df["Step Number"] <= end_step)]
+            else:
+                step_int = int(step_no)
+                df = df[df["Step Number"] == step_int]
+        else:
+            df = df
+         # Row-wise difference
+        df["temp_diff"] = df[max_col] - df[min_col]
+
+        max_diff = df["temp_diff"].max()
+        return max_diff if pd.notna(max_diff) else None
+    except Exception as e:
+        logging.error(f"Error calculating max temperature difference: {e}")
+        return None
+
+def safe_max(df=None, col=None,step_no=None):
+    try:
+        #  filter the dataframe based on the step_parts if step is come like ["1-8"] then filter all steps from 1 to 8
+        df_filtered = pd.DataFrame()
+        if step_no is not None:
+            step_no = str(step_no)
+            if "-" in step_no:
+                step_parts = step_no.split("-")
+                if len(step_parts) == 2:
+                    start_step = int(step_parts[0])
+                    end_step = int(step_parts[1])
+                    df_filtered = df[(df["Step Number"] >= start_step) & (df["Step Number"] <= end_step)]
+            else:
+                step_int = int(step_no)
+                df_filtered = df[df["Step Number"] == step_int]
+        else:
+            df_filtered = df
+        return df_filtered[col].max() if not df_filtered.empty else None
+    except Exception as e:
+        logging.error(f"Error calculating safe max: {e}")
+        return None
+
+def safe_sum(df=None, col=None, step_no=None):
+    try:
+        if step_no is not None:
+            step_no = str(step_no)
+            if "-" in step_no:
+                step_parts = step_no.split("-")
+                if len(step_parts) == 2:
+                    start_step = int(step_parts[0])
+                    end_step = int(step_parts[1])
+                    df = df[(df["Step Number"] >= start_step) & (df["Step Number"] <= end_step)]
+            else:
+                step_int = int(step_no)
+                df = df[df["Step Number"] == step_int]
+        else:
+            df = df
+
+        return df[col].sum() if not df.empty else None
+    except Exception as e:
+        logging.error(f"Error calculating safe sum: {e}")
+        return None
+
+def safe_last(df=None, col=None):
+    try:
+        return df[col].iloc[-1] if not df.empty else None
+    except Exception as e:
+        logging.error(f"Error getting safe last value: {e}")
+        return None
+def safe_last_step(df=None, col=None, step_no=None):
+    try:
+        if step_no is not None:
+            step_no = str(step_no)
+            if "-" in step_no:
+                step_parts = step_no.split("-")
+                if len(step_parts) == 2:
+                    start_step = int(step_parts[0])
+                    end_step = int(step_parts[1])
+                    df = df[(df["Step Number"] >= start_step) & (df["Step Number"] <= end_step)]
+            else:
+                step_int = int(step_no)
+                df = df[df["Step Number"] == step_int]
+        else:
+            df = df
+        return df[col].iloc[-1] if not df.empty else None
+    except Exception as e:
+        logging.error(f"Error getting safe last step value: {e}")
+        return None
+
+def safe_step_time(test_type,df,device_id=None):
+    try:
+        if (test_type == "Sanity" or test_type == "CDC"):
+            if not {"Step Number", "Start Absolute Time", "End Absolute Time"}.issubset(df.columns):
+                return None
+
+            start_step = df["Step Number"].min()
+            end_step = df["Step Number"].max()
+
+            start_time = df.loc[df["Step Number"] == start_step, "Start Absolute Time"].iloc[0]
+            end_time = df.loc[df["Step Number"] == end_step, "End Absolute Time"].iloc[0]
+
+            # explicit format, detected once per device (core.timestamps)
+            start_time, end_time = parse_times([start_time, end_time], key=(device_id, "Absolute Time"))
+            if pd.isna(start_time) or pd.isna(end_time):
+                return None
+            return start_time, end_time, (end_time - start_time)
+        else:
+            if not {"Step Number", "Absolute time"}.issubset(df.columns):
+                return None
+            start_step = df["Step Number"].min()
+            end_step = df["Step Number"].max()
+
+            # "2026-01-03 00:21:25:363800" is parsed with an explicit format
+            # (core.timestamps) instead of per-value inference
+            start_time, end_time = parse_times(
+                [df["Absolute time"].iloc[0], df["Absolute time"].iloc[-1]], key=(device_id, "Absolute time"))
+
+
+            if pd.isna(start_time) or pd.isna(end_time):
+                return None, None, None
+
+            return start_time, end_time, (end_time - start_time)
+    except Exception as e:
+        logging.error(f"Error calculating step time: {e}")
+        return None, None, None
+        
+
+def check_range(value, min_val=None, max_val=None):
+    try:
+        if value is None:
+            return False, "Value missing"
+
+        if min_val is not None and value < min_val:
+            return False, f"{value} < min {min_val}"
+
+        if max_val is not None and value > max_val:
+            return False, f"{value} > max {max_val}"
+
+        return True, "OK"
+    except Exception as e:
+        logging.error(f"Error checking range: {e}")
+        return False, "Error in range check"
+    
+def to_native(val):
+    if hasattr(val, "item"):
+        return val.item()
+    return val
+
+def evaluate_thresholds(data, thresholds):
+    try:
+        """
+        data: extracted test values
+        thresholds: config["Thresholds"]["charge"] or ["discharge"]
+        """
+        results = {}
+        overall_pass = True
+        failed_parameters = []  # List to store failed parameter names
+        
+        for mode in ["charge", "discharge"]:
+            for key, value in data[mode].items():
+                min_key = f"{key}_min"
+                max_key = f"{key}_max"
+                min_val = float(thresholds[mode][min_key])
+                max_val = float(thresholds[mode][max_key])
+                is_ok, reason = check_range(value, min_val, max_val)
+
+                results[key] = {
+                    "value": to_native(value),
+                    "min": min_val,
+                    "max": max_val,
+                    "status": "PASS" if is_ok else "FAIL",
+                    "reason": reason
+                }
+
+                if not is_ok:
+                    overall_pass = False
+                    # Add failed parameter with mode and key
+                    failed_parameters.append(f"{mode}_{key}")
+         # Create comma-separated string of failed parameters
+        fail_reason = ", ".join(failed_parameters) if failed_parameters else None
+        
+        return overall_pass, results,fail_reason
+    except Exception as e:
+        logging.error(f"Error evaluating thresholds: {e}")
+        return False, {}
+
+
+def sanitize_json(obj):
+    try:
+        if isinstance(obj, dict):
+            return {k: sanitize_json(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [sanitize_json(v) for v in obj]
+        if isinstance(obj, float) and math.isnan(obj):
+            return None
+        return obj
+    except Exception as e:
+        logging.error(f"Error sanitizing JSON: {e}")
+        return obj
+
+
+# =========================================================
+#  File Classification
+# =========================================================
+def parse_file_name(file: str):
+    """
+    "<YYYY-MM-DD HH-MM-SS>_<device>-<channel>_<battery id>.xlsx" ->
+    (date_time, device_id, device_channel, battery_id)
+    """
+    parts = file.split("_")
+    date_str = parts[0]
+    device_id = parts[1].split("-")[0]
+    device_channel = parts[1].split("-")[1]
+    battery_id = parts[2].replace(".xlsx", "")
+    date_time = datetime.strptime(date_str, "%Y-%m-%d %H-%M-%S")
+    return date_time, device_id, device_channel, battery_id
+
+
+def classify_test_type(battery_id: str, file_size: int):
+    if battery_id.startswith("M"):
+        if file_size < 5000000:  # less than 5MB
+            return "Sanity"
+        return "CDC"
+    return "HRD"
+
+
+# =========================================================
+#  Pipeline
+# =========================================================
+def _noop(*args, **kwargs):
+    return None
+
+
+class IngestionPipeline:
+    """
+    Processes one exported battery workbook end to end:
+    metadata from the file name -> sheets -> metrics -> thresholds ->
+    emit / PLC / DB / analytics sinks.
+
+    load_config():                  {"Thresholds": ..., "Headers": ...}
+    emit(payload):                  dashboard update
+    send_to_plc(device, channel, status)
+    send_to_database(test_type, payload)
+    record_result(payload):         analytics store
+    previous_end_times:             {device: {channel: end time}} for cycle timing
+    lock:                           held for the whole file; None = one lock per
+                                    device channel, so different channels run in parallel
+    """
+
+    def __init__(self, load_config, emit=_noop, send_to_plc=_noop, send_to_database=_noop,
+                 record_result=_noop, previous_end_times=None, lock=None):
+        self.load_config = load_config
+        self.emit = emit
+        self.send_to_plc = send_to_plc
+        self.send_to_database = send_to_database
+        self.record_result = record_result
+        self.previous_end_times = previous_end_times if previous_end_times is not None else {}
+        self.lock = lock
+        self._channel_locks = {}
+        self._channel_locks_guard = threading.Lock()
+
+    def _lock_for(self, device_id, device_channel):
+        if self.lock is not None:
+            return self.lock
+        with self._channel_locks_guard:
+            return self._channel_locks.setdefault((device_id, device_channel), threading.Lock())
+
+    def process_file(self, base_path: str, file: str):
+        """
+        Runs the full pipeline for base_path/file and returns the emitted
+        payload (None when an HRD file could not be evaluated).
+        """
+        data = {}
+        logging.info(f"Processing file: {file}")
+
+        # Extract metadata from file name
+        date_time, device_id, device_channel, battery_id = parse_file_name(file)
+        file_size = os.path.getsize(os.path.join(base_path, file))
+        test_type = classify_test_type(battery_id, file_size)
+        logging.info(f"Extracted metadata from file name: DateTime: {date_time}, Device Channel: {device_channel}, Battery ID: {battery_id}, Test Type: {test_type}, File Size: {file_size} bytes")
+        timer = StageTimer(test_type)
+        if test_type == "CDC" or test_type == "Sanity":
+            battery_type = battery_id[1] + battery_id[2]  # e.g., L2
+        else:
+            battery_type = battery_id[2] + battery_id[3]  # e.g., K5
+
+        #  reading data from the file
+        safe_file = " ".join(file.split())
+        file_path = os.path.join(base_path, safe_file)
+        if test_type == "Sanity" or test_type == "CDC":
+            with self._lock_for(device_id, device_channel):
+                try:
+                    config = self.load_config()
+                    timer.lap("config_load")
+
+                    headers = config["Headers"]
+                    headers = headers[battery_type]
+                    try:
+                        is_standerd = not int(headers[test_type]["non_standard"])
+                    except Exception:
+                        is_standerd = 1
+                    headers = headers[test_type]
+
+                    # extract the unique sheetNO and read only those sheets
+                    unique_sheets = set()
+                    for key, value in headers.items():
+                        if key.startswith("Sheet_Name_"):
+                            unique_sheets.add(int(value))
+                    logging.debug(f"Unique sheets to read: {unique_sheets}")
+                    sheets_data = {}
+                    for sheet in unique_sheets:
+                        sheets_data[sheet] = read_sheet(file_path, int(sheet))
+                    timer.lap("workbook_parse")
+
+                    start_time, end_time, step_timing = safe_step_time(test_type,df=sheets_data[int(headers["Sheet_Name_Capacity"])],device_id=device_id)  
+                    previous_end_time = self.previous_end_times[str(device_id)][str(device_channel)]
+                    if previous_end_time != 0:
+                        cycle_timing = start_time - self.previous_end_times[str(device_id)][str(device_channel)]  if self.previous_end_times[str(device_id)][str(device_channel)] != 0 else None
+                    else:
+                        cycle_timing = 0
+                    self.previous_end_times[str(device_id)][str(device_channel)] = end_time
+                    logging.debug(f"Start Time: {start_time}, End Time: {end_time}, Step Timing: {step_timing}, Previous End Time: {previous_end_time}, Cycle Timing: {cycle_timing}")
+
+                    data = {
+                        "Battery Serial No": battery_id,
+                        "charge":{
+                            "Cell_Deviation": safe_max(df=sheets_data[int(headers["Sheet_Name_Cell_Deviation"])], col=headers["Cell_Deviation"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["cell_deviation_step"]) if is_standerd else max_temp_diff(df=sheets_data[int(headers["Sheet_Name_Cell_Deviation"])], min_col=headers["Min_Cell_Temperature"], max_col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["cell_deviation_step"]),
+
+                            "Capacity": safe_sum(df=sheets_data[int(headers["Sheet_Name_Capacity"])], col=headers["Capacity"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["capacity_step"]),
+
+                            "Pack_Voltage": safe_last_step(df=sheets_data[int(headers["Sheet_Name_Pack_Voltage"])], col=headers["Pack_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["pack_voltage_step"]),
+
+                            "Max_Cell_Voltage" : safe_max(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Voltage"])], col=headers["Max_Cell_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["Max_Cell_Voltage_step"]),
+
+                            "Min_Cell_Voltage": safe_max(df=sheets_data[int(headers["Sheet_Name_Min_Cell_Voltage"])], col=headers["Min_Cell_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["Min_Cell_Voltage_step"]),
+
+                            "Max_Cell_Temperature": safe_max(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Temperature"])], col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["Max_Cell_Temperature_step"]),
+
+                            "Min_Cell_Temperature": safe_max(df=sheets_data[int(headers["Sheet_Name_Min_Cell_Temperature"])], col=headers["Min_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["Min_Cell_Temperature_step"]),
+
+                            "SOC" : safe_last_step(df= sheets_data[int(headers["Sheet_Name_SOC"])], col=headers["SOC"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["SOC_step"]),
+
+                            "End_SOC": safe_last(df= sheets_data[int(headers["Sheet_Name_SOC"])], col=headers["SOC"]),
+
+                            "temperature_difference": max_temp_diff(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Temperature"])], min_col=headers["Min_Cell_Temperature"], max_col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["charge"]["temperature_difference_step"])                                
+                        },
+                        "discharge":{
+                            "Cell_Deviation": safe_max(df=sheets_data[int(headers["Sheet_Name_Cell_Deviation"])], col=headers["Cell_Deviation"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["cell_deviation_step"]) if is_standerd else max_temp_diff(df=sheets_data[int(headers["Sheet_Name_Cell_Deviation"])], min_col=headers["Min_Cell_Temperature"], max_col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["cell_deviation_step"]),
+
+                            "Capacity": safe_sum(df=sheets_data[int(headers["Sheet_Name_Capacity"])], col=headers["Capacity"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["capacity_step"]),
+
+                            "Pack_Voltage": safe_last_step(df=sheets_data[int(headers["Sheet_Name_Pack_Voltage"])], 
+                            col=headers["Pack_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["pack_voltage_step"]),
+
+                            "Max_Cell_Voltage" : safe_max(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Voltage"])], col=headers["Max_Cell_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["Max_Cell_Voltage_step"]),
+
+                            "Min_Cell_Voltage": safe_max(df=sheets_data[int(headers["Sheet_Name_Min_Cell_Voltage"])], col=headers["Min_Cell_Voltage"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["Min_Cell_Voltage_step"]),
+
+                            "Max_Cell_Temperature": safe_max(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Temperature"])], col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]
+                            ["Max_Cell_Temperature_step"]),
+
+                            "Min_Cell_Temperature": safe_max(df=sheets_data[int(headers["Sheet_Name_Min_Cell_Temperature"])], col=headers["Min_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["Min_Cell_Temperature_step"]),
+
+                            "SOC" : safe_last_step(df= sheets_data[int(headers["Sheet_Name_SOC"])], col=headers["SOC"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["SOC_step"]),
+
+                            "End_SOC": safe_last(df= sheets_data[int(headers["Sheet_Name_SOC"])], col=headers["SOC"]),
+
+                            "temperature_difference": max_temp_diff(df=sheets_data[int(headers["Sheet_Name_Max_Cell_Temperature"])], min_col=headers["Min_Cell_Temperature"], max_col=headers["Max_Cell_Temperature"], step_no= config["Thresholds"][battery_type][test_type]["discharge"]["temperature_difference_step"])
+
+                        }
+                    }
+                    timer.lap("metric_extraction")
+
+
+                except Exception as e:
+                    logging.error(f"Error reading Excel file {file}: {e}")
+                    raise
+            logging.debug(f"Extracted data: {data}")
+            thresholds_config = self.load_config()
+            threshold_block = thresholds_config["Thresholds"][battery_type][test_type]
+            overall_pass, evaluated, fail_reason  = evaluate_thresholds(data, threshold_block)
+            logging.debug(f"Evaluated Results: {evaluated}, Overall Pass: {overall_pass}, Fail Reason: {fail_reason}")
+            final_status = "PASS" if overall_pass else "FAIL"
+
+            data["charge"] = {k: to_native(v) for k, v in data["charge"].items()}
+            data["discharge"] = {k: to_native(v) for k, v in data["discharge"].items()}
+            data = sanitize_json(data)
+            evaluated = sanitize_json(evaluated)
+            timer.lap("threshold_evaluation")
+            start_time_str = start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time)
+            end_time_str = end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time)
+
+            payload = {
+                "data_update": {
+                    "meta": {
+                        "battery_id": battery_id,
+                        "battery_type": battery_type,
+                        "test_type": test_type,
+                        "device_id": device_id,
+                        "device_channel": device_channel,
+                        "timestamp": date_time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "start_time":start_time_str,
+                        "end_time":end_time_str,
+                    },
+                    "results": data,
+                    "evaluated": evaluated,
+                    "final_status": final_status,
+                     "fail_reason": fail_reason,  # Add fail_reason to payload
+                    "step_time": str(step_timing) if step_timing is not None else None,
+                    "cycle_time": str(step_timing) if step_timing is not None else None
+                }
+            }
+
+            self.emit(payload)
+            timer.lap("emit")
+            self.send_to_plc(device_id, device_channel, final_status)
+            timer.lap("plc_write")
+            self.send_to_database(test_type, payload)
+            timer.lap("db_write")
+            self.record_result(payload)
+            timer.lap("analytics")
+            timer.finish(final_status)
+            logging.info(f"Data emitted: {data}")
+            logging.info(f"Test status for file {file}: {final_status}")
+        else:
+            with self._lock_for(device_id, device_channel):
+                try:
+
+                    config = self.load_config()
+                    timer.lap("config_load")
+
+                    headers = config["Headers"]
+                    headers = headers[battery_type]
+                    headers = headers["CDC"]
+                    # extract the unique sheetNO for the HRD and HRC only and read only those sheets
+                    unique_sheets = set()
+                    unique_sheets.add(int(headers["Sheet_Name_HRD"]))
+                    unique_sheets.add(int(headers["Sheet_Name_HRC"]))
+                    sheets_data = {}
+                    for sheet in unique_sheets:
+                        sheets_data[sheet] = read_sheet(file_path, int(sheet))
+                    timer.lap("workbook_parse")
+                    start_time, end_time, step_timing = safe_step_time(test_type,df=sheets_data[int(headers["Sheet_Name_HRD"])],device_id=device_id)
+                    previous_end_time = self.previous_end_times[str(device_id)][str(device_channel)]
+                    if previous_end_time != 0:
+                        cycle_timing =  pd.to_datetime(start_time) - pd.to_datetime(self.previous_end_times[str(device_id)][str(device_channel)])  if self.previous_end_times[str(device_id)][str(device_channel)] != 0 else None
+                    else:
+                        cycle_timing = 0
+
+                    self.previous_end_times[str(device_id)][str(device_channel)] = pd.to_datetime(end_time)
+
+                    data = {
+                        "Battery Serial No": battery_id,
+                        "charge":{
+                            "hrc": safe_max(df=sheets_data[int(headers["Sheet_Name_HRC"])], col=headers["HRC"], step_no= config["Thresholds"][battery_type]["CDC"]["charge"]["hrc_step"])
+                        },
+                        "discharge":{   
+                            "hrd": safe_max(df=sheets_data[int(headers["Sheet_Name_HRD"])], col=headers["HRD"], step_no= config["Thresholds"][battery_type]["CDC"]["discharge"]["hrd_step"]
+                                            )
+                        }
+                    }
+                    timer.lap("metric_extraction")
+                    thresholds_config = self.load_config()
+                    threshold_block = thresholds_config["Thresholds"][battery_type]["CDC"]
+                    overall_pass, evaluated, fail_reason = evaluate_thresholds(data, threshold_block)
+                    logging.debug(f"Evaluated Results: {evaluated}, Overall Pass: {overall_pass}, Fail Reason: {fail_reason}")
+                    final_status = "PASS" if overall_pass else "FAIL"
+
+                    data["charge"] = {k: to_native(v) for k, v in data["charge"].items()}
+                    data["discharge"] = {k: to_native(v) for k, v in data["discharge"].items()}
+                    data = to_native(data)
+                    data = sanitize_json(data)
+                    evaluated = sanitize_json(evaluated)
+                    timer.lap("threshold_evaluation")
+                    start_time_str = start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time)
+                    end_time_str = end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time)
+
+                    payload = {
+                        "data_update": {
+                            "meta": {
+                                "battery_id": battery_id,
+                                "battery_type": battery_type,
+                                "test_type": test_type,
+                                "device_id": device_id,
+                                "device_channel": device_channel,
+                                "timestamp": date_time.strftime("%Y-%m-%d %H:%M:%S"),
+                                "start_time":start_time,
+                                "end_time":end_time,
+                            },
+                            "results": data,
+                            "evaluated": evaluated,
+                            "final_status": final_status,
+                             "fail_reason": fail_reason,  # Add fail_reason to payload
+                            "step_time": str(step_timing) if step_timing is not None else None,
+                            "cycle_time": str(cycle_timing) if cycle_timing is not None else None
+                        }
+                    }
+                    self.emit(payload)
+                    timer.lap("emit")
+
+
+                    logging.info(f"Data emitted: {data}")
+                    logging.info(f"Test status for file {file}: {final_status}")
+                    self.send_to_plc(device_id, device_channel, final_status)
+                    timer.lap("plc_write")
+                    self.send_to_database(test_type, payload)
+                    timer.lap("db_write")
+                    self.record_result(payload)
+                    timer.lap("analytics")
+                    timer.finish(final_status)
+                except Exception as e:
+                    logging.error(f"Error loading config for HRD/HRC for file {file}: {e}")
+                    return None
+
+        return payload
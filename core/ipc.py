@@ -0,0 +1,232 @@
+import os
+import time
+import json
+import queue
+import logging
+import threading
+from collections import deque
+from multiprocessing.connection import Listener, Client
+from config import INGEST_IPC_ADDRESS, INGEST_IPC_AUTHKEY_ENV, INGEST_IPC_BACKLOG
+
+# ===================================================
+# Local Event Channel (ingestion daemon -> web process)
+# ===================================================
+# The daemon publishes (event, payload) tuples; any number of web processes
+# subscribe and fan them out to their Socket.IO clients. Authenticated
+# multiprocessing connections over localhost TCP, so it runs on Windows too.
+#   - messages are JSON bytes, never pickles, so a peer cannot make the
+#     other side run code; the authkey comes from the environment
+#   - publish() never blocks the pipeline: every subscriber has its own
+#     bounded queue and sender thread, so a slow one only drops its oldest events
+#   - events published while nobody is subscribed are kept (bounded) and
+#     delivered to the next subscriber
+#   - subscribers reconnect on their own when the daemon restarts
+
+
+def ipc_authkey():
+    """
+    Shared secret of the channel, from INGEST_IPC_AUTHKEY_ENV. app.py sets a
+    random one before it spawns the daemon; set it in both processes when
+    the daemon is started by hand.
+    """
+    key = os.environ.get(INGEST_IPC_AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{INGEST_IPC_AUTHKEY_ENV} is not set")
+    return key.encode()
+
+
+def _encode(message):
+    return json.dumps(message, default=str).encode()
+
+
+class EventPublisher:
+    def __init__(self, address=INGEST_IPC_ADDRESS, authkey: bytes = None,
+                 backlog: int = INGEST_IPC_BACKLOG):
+        self.address = address
+        self.authkey = authkey
+        self._listener = None
+        self._subscribers = []
+        self._lock = threading.Lock()  # also keeps replay ahead of new events
+        self._outbox = queue.Queue()
+        self._backlog = deque(maxlen=backlog)
+        self.published = 0
+        self.dropped = 0
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey or ipc_authkey())
+        threading.Thread(target=self._accept_loop, name="ipc-accept", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="ipc-send", daemon=True).start()
+        logging.info(f"Event publisher listening on {self.address}")
+
+    def publish(self, event: str, payload, buffer: bool = True):
+        """
+        buffer=False for snapshots that are useless once stale (status).
+        """
+        self._outbox.put(((event, payload), buffer))
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                logging.error(f"Event publisher accept error: {e}")
+                time.sleep(1)
+                continue
+            with self._lock:
+                pending = [(data, True) for data in self._backlog]
+                self._backlog.clear()
+                subscriber = _Subscriber(conn, pending, self._backlog.maxlen)
+                self._subscribers.append(subscriber)
+            logging.info(f"Web process subscribed; replaying {len(pending)} buffered event(s)")
+            threading.Thread(target=self._subscriber_loop, args=(subscriber,), name="ipc-send", daemon=True).start()
+
+    def _send_loop(self):
+        while True:
+            message, buffer = self._outbox.get()
+            self.published += 1
+            try:
+                data = _encode(message)
+            except Exception as e:
+                logging.error(f"Cannot encode {message[0]} event: {e}")
+                continue
+            with self._lock:
+                if not self._subscribers:
+                    if buffer:
+                        self._buffer_locked(data)
+                    continue
+                for subscriber in self._subscribers:
+                    subscriber.offer((data, buffer))
+
+    def _buffer_locked(self, data):
+        if len(self._backlog) == self._backlog.maxlen:
+            self.dropped += 1
+        self._backlog.append(data)
+
+    def _subscriber_loop(self, subscriber):
+        while True:
+            item = subscriber.next()
+            if item is None:
+                return
+            try:
+                subscriber.conn.send_bytes(item[0])
+            except Exception as e:
+                logging.info(f"Web process disconnected: {e}")
+                self._remove(subscriber, item)
+                return
+
+    def _remove(self, subscriber, failed):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            unsent = [failed] + subscriber.close()
+            self.dropped += subscriber.dropped
+            # the last subscriber went away: keep what it missed for the next one
+            if not self._subscribers:
+                for data, buffer in unsent:
+                    if buffer:
+                        self._buffer_locked(data)
+        try:
+            subscriber.conn.close()
+        except Exception:
+            pass
+
+
+class _Subscriber:
+    """
+    One connected web process with its own bounded queue and sender thread:
+    a stuck dashboard loses its oldest events instead of stalling the other
+    subscribers or growing the daemon's memory.
+    """
+
+    def __init__(self, conn, pending, maxlen: int):
+        self.conn = conn
+        self.queue = deque(pending, maxlen=maxlen)
+        self.dropped = 0
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def offer(self, item):
+        with self._ready:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(item)
+            self._ready.notify()
+
+    def next(self):
+        """
+        Oldest queued (data, buffer) item; None once closed.
+        """
+        with self._ready:
+            while not self.queue and not self.closed:
+                self._ready.wait()
+            return None if self.closed else self.queue.popleft()
+
+    def close(self):
+        """
+        Stops the sender and returns the items it did not send.
+        """
+        with self._ready:
+            self.closed = True
+            unsent = list(self.queue)
+            self.queue.clear()
+            self._ready.notify()
+            return unsent
+
+
+class EventSubscriber:
+    """
+    Calls handler(event, payload) for everything the daemon publishes.
+    """
+
+    def __init__(self, handler, address=INGEST_IPC_ADDRESS, authkey: bytes = None,
+                 retry_seconds: float = 2.0):
+        self.handler = handler
+        self.address = address
+        self.authkey = authkey
+        self.retry_seconds = retry_seconds
+        self.connected = False
+        self.received = 0
+        self.last_event_at = None
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ipc-subscribe", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        logged_down = False
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey or ipc_authkey())
+            except Exception as e:
+                if not logged_down:
+                    logging.warning(f"Ingestion daemon not reachable at {self.address}: {e}")
+                    logged_down = True
+                time.sleep(self.retry_seconds)
+                continue
+            self.connected, logged_down = True, False
+            logging.info(f"Subscribed to ingestion daemon at {self.address}")
+            try:
+                while True:
+                    event, payload = json.loads(conn.recv_bytes())
+                    self.received += 1
+                    self.last_event_at = time.time()
+                    try:
+                        self.handler(event, payload)
+                    except Exception as e:
+                        logging.error(f"Error handling {event} event: {e}")
+            except (EOFError, OSError) as e:
+                logging.warning(f"Ingestion daemon connection lost: {e}")
+            finally:
+                self.connected = False
+                conn.close()
+            time.sleep(self.retry_seconds)
+
+    def status(self):
+        return {"connected": self.connected, "received": self.received, "last_event_at": self.last_event_at}
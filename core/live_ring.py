@@ -0,0 +1,386 @@
+import re
+import sys
+import json
+import time
+import logging
+from datetime import UTC, datetime
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from config import (LIVE_RING_NAME, LIVE_RING_SLOTS, LIVE_RING_CAPACITY, LIVE_RING_MAX_COLUMNS,
+                    LIVE_RING_DIRECTORY_BYTES)
+from core.timestamps import parse_times
+
+# ===================================================
+# Shared-Memory Ring Buffer for Live Circuit Samples
+# ===================================================
+# One process tails the circuit SQLite files and appends every new sample
+# here; any number of web processes attach by name and read the samples
+# straight out of the shared pages instead of each re-reading the databases.
+#
+# Fixed layout (all offsets 8-byte aligned):
+#   header     magic, version, slots, max columns, capacity, directory size
+#   dir_seq    uint64, odd while the writer rewrites the directory
+#   directory  JSON {"columns": [[name, kind], ...], "slots": {slot: circuit}}
+#   counts     uint64[slots]                     samples ever written per slot
+#   times      float64[slots, capacity]           epoch seconds
+#   values     float32[slots, capacity, columns]  NaN where a column is missing
+#
+# Single writer. A sample is written before its slot count is bumped, and
+# readers check the count again after copying, so a row overwritten while
+# it was being read is retried rather than returned torn.
+
+MAGIC = b"BTSL"
+VERSION = 1
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("slots", "<u4"), ("columns", "<u4"),
+                    ("capacity", "<u4"), ("directory", "<u4"), ("dir_seq", "<u8")])
+HEADER_BYTES = 64
+READ_RETRIES = 5
+
+_SIGNAL = re.compile(r"^\s*SG_\s+(\w+)")
+
+
+def _align(n: int, to: int = 8):
+    return (n + to - 1) // to * to
+
+
+def ring_size(slots: int, capacity: int, max_columns: int, directory_bytes: int):
+    return (HEADER_BYTES + _align(directory_bytes) + 8 * slots + 8 * slots * capacity
+            + _align(4 * slots * capacity * max_columns))
+
+
+def dbc_signal_names(dbc_path: str):
+    """
+    Signal names (SG_ lines) of a CAN .dbc file, lowercased like the
+    live_data keys; [] if the file cannot be read.
+    """
+    try:
+        with open(dbc_path, "r", errors="ignore") as f:
+            return [m.group(1).lower() for m in map(_SIGNAL.match, f) if m]
+    except OSError as e:
+        logging.error(f"Error reading DBC signals from {dbc_path}: {e}")
+        return []
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float, np.number)):
+        return value
+    return None
+
+
+class LiveRing:
+    """
+    Use LiveRing.create() in the tailer process and LiveRing.attach() in the
+    readers; both map the same shared memory block.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self._header = np.ndarray((1,), _HEADER, buf, 0)
+        header = self._header[0]
+        if bytes(header["magic"]) != MAGIC or int(header["version"]) != VERSION:
+            raise ValueError(f"{shm.name} is not a live ring (version {VERSION})")
+        self.slots = int(header["slots"])
+        self.max_columns = int(header["columns"])
+        self.capacity = int(header["capacity"])
+        self.directory_bytes = int(header["directory"])
+
+        offset = HEADER_BYTES
+        self._directory = buf[offset:offset + self.directory_bytes]
+        offset += _align(self.directory_bytes)
+        self.counts = np.ndarray((self.slots,), np.uint64, buf, offset)
+        offset += 8 * self.slots
+        self.times = np.ndarray((self.slots, self.capacity), np.float64, buf, offset)
+        offset += 8 * self.slots * self.capacity
+        self.values = np.ndarray((self.slots, self.capacity, self.max_columns), np.float32, buf, offset)
+
+        # writer state (the owner is the only process that changes the directory)
+        self._columns = []       # [[name, kind]], kind "int" or "float"
+        self._column_index = {}
+        self._slots = {}         # slot -> circuit dict
+        self._slot_by_key = {}   # (device_id, circuit_id) -> slot
+        self._last_time = {}     # slot -> time of the last sample appended
+        self._overflow_logged = False
+        # reader cache
+        self._dir_seq = None
+        self._dir = {"columns": [], "slots": {}}
+
+    # ---------------- lifecycle ----------------
+    @classmethod
+    def create(cls, name: str = LIVE_RING_NAME, slots: int = LIVE_RING_SLOTS,
+               capacity: int = LIVE_RING_CAPACITY, max_columns: int = LIVE_RING_MAX_COLUMNS,
+               directory_bytes: int = LIVE_RING_DIRECTORY_BYTES, columns=()):
+        size = ring_size(slots, capacity, max_columns, directory_bytes)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a tailer that did not shut down cleanly
+            logging.warning(f"Replacing stale live ring {name}")
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((1,), _HEADER, shm.buf, 0)
+        header[0] = (MAGIC, VERSION, slots, max_columns, capacity, directory_bytes, 0)
+        del header
+        ring = cls(shm, owner=True)
+        ring.times.fill(np.nan)
+        ring.add_columns(columns)
+        ring._publish_directory()
+        logging.info(f"Live ring {name} created: {slots} slots x {capacity} samples x "
+                     f"{max_columns} columns ({size / 1e6:.1f} MB)")
+        return ring
+
+    @classmethod
+    def attach(cls, name: str = LIVE_RING_NAME):
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            try:
+                # readers must not unlink the writer's block when they exit
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return cls(shm, owner=False)
+
+    def close(self):
+        # drop the numpy views first, the buffer cannot close while exported
+        self._header = self.counts = self.times = self.values = None
+        self._directory.release()
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------------- writer ----------------
+    def add_columns(self, names, kinds=None):
+        """
+        Appends unknown columns to the schema (it only ever grows while the
+        ring exists); columns past max_columns are dropped.
+        """
+        added = False
+        for name in names:
+            if name in self._column_index:
+                continue
+            if len(self._columns) >= self.max_columns:
+                if not self._overflow_logged:
+                    logging.error(f"Live ring full ({self.max_columns} columns), dropping '{name}' and later columns")
+                    self._overflow_logged = True
+                continue
+            self._column_index[name] = len(self._columns)
+            self._columns.append([name, (kinds or {}).get(name, "float")])
+            added = True
+        return added
+
+    def assign(self, device_id, circuit_id, file_name=None, table_name=None):
+        """
+        Slot for a circuit, reusing its current one. A new file on the same
+        circuit (a new test) starts the slot over.
+        """
+        key = (device_id, circuit_id)
+        slot = self._slot_by_key.get(key)
+        if slot is not None:
+            circuit = self._slots[slot]
+            if file_name and circuit.get("file_name") != file_name:
+                self._reset_slot(slot)
+                circuit.update(file_name=file_name, table_name=table_name)
+                self._publish_directory()
+            return slot
+        free = next((s for s in range(self.slots) if s not in self._slots), None)
+        if free is None:
+            logging.error(f"Live ring has no free slot for circuit {circuit_id} (device {device_id})")
+            return None
+        self._reset_slot(free)
+        self._slots[free] = {"device_id": device_id, "circuit_id": circuit_id,
+                             "file_name": file_name, "table_name": table_name}
+        self._slot_by_key[key] = free
+        self._publish_directory()
+        return free
+
+    def release(self, device_id, circuit_id):
+        slot = self._slot_by_key.pop((device_id, circuit_id), None)
+        if slot is not None:
+            self._slots.pop(slot, None)
+            self._publish_directory()
+
+    def append(self, slot: int, timestamp: float, row):
+        """
+        row: float32 array of max_columns values, in schema order.
+        """
+        index = int(self.counts[slot]) % self.capacity
+        self.times[slot, index] = timestamp
+        self.values[slot, index] = row
+        self.counts[slot] += 1
+        self._last_time[slot] = timestamp
+
+    def write_payload(self, payload: dict, device_id=None, active=None):
+        """
+        Appends each circuit of a live_data payload (as built by the SQLite
+        tailer). Samples whose timestamp has not moved since the last tick
+        are skipped. `active`: (device_id, circuit_id) keys still monitored;
+        the slots of all other circuits are freed. Returns the number of
+        samples appended.
+        """
+        circuits = payload.get("circuits", [])
+        # one vectorized parse per tick; naive tester time is stored as if
+        # UTC and turned back into the same wall time on read
+        stamps = parse_times([c.get("timestamp") for c in circuits], key=("live", "timestamp"))
+        now = pd.Timestamp.now().timestamp()
+        written = 0
+        for circuit, stamp in zip(circuits, stamps):
+            dev = circuit.get("device_id", device_id)
+            slot = self.assign(dev, circuit.get("circuit_id"), circuit.get("file_name"), circuit.get("table_name"))
+            if slot is None:
+                continue
+
+            numbers = {k: v for k, v in circuit.items()
+                       if k not in ("circuit_id", "device_id") and _number(v) is not None}
+            new = [k for k in numbers if k not in self._column_index]
+            if new and self.add_columns(new, {k: "int" if isinstance(numbers[k], (int, np.integer)) else "float"
+                                              for k in new}):
+                self._publish_directory()
+
+            timestamp = now if pd.isna(stamp) else stamp.timestamp()
+            if self._last_time.get(slot) == timestamp:
+                continue
+            row = np.full(self.max_columns, np.nan, dtype=np.float32)
+            for k, v in numbers.items():
+                i = self._column_index.get(k)
+                if i is not None:
+                    row[i] = v
+            self.append(slot, timestamp, row)
+            written += 1
+
+        if active is not None:
+            active = set(active)
+            for key in [k for k in self._slot_by_key if k not in active]:
+                self.release(*key)
+        return written
+
+    def _reset_slot(self, slot: int):
+        self.counts[slot] = 0
+        self.times[slot].fill(np.nan)
+        self._last_time.pop(slot, None)
+
+    def _publish_directory(self):
+        data = json.dumps({"columns": self._columns,
+                           "slots": {str(s): c for s, c in self._slots.items()}}).encode()
+        if len(data) + 4 > self.directory_bytes:
+            logging.error(f"Live ring directory too large ({len(data)} bytes), not updated")
+            return
+        seq = int(self._header[0]["dir_seq"])
+        self._header["dir_seq"] = seq + 1  # odd: readers wait
+        self._directory[:4] = len(data).to_bytes(4, "little")
+        self._directory[4:4 + len(data)] = data
+        self._header["dir_seq"] = seq + 2
+
+    # ---------------- readers ----------------
+    def directory(self):
+        """
+        {"columns": [[name, kind]], "slots": {slot: circuit}}, re-read only
+        when the writer changed it.
+        """
+        for _ in range(READ_RETRIES * 20):
+            seq = int(self._header[0]["dir_seq"])
+            if seq == self._dir_seq:
+                return self._dir
+            if seq % 2:
+                time.sleep(0.0005)
+                continue
+            size = int.from_bytes(self._directory[:4], "little")
+            data = bytes(self._directory[4:4 + size])
+            if int(self._header[0]["dir_seq"]) == seq:
+                self._dir = json.loads(data) if size else {"columns": [], "slots": {}}
+                self._dir["slots"] = {int(s): c for s, c in self._dir["slots"].items()}
+                self._dir_seq = seq
+                return self._dir
+        return self._dir
+
+    def slot_of(self, device_id, circuit_id):
+        for slot, circuit in self.directory()["slots"].items():
+            if circuit["device_id"] == device_id and circuit["circuit_id"] == circuit_id:
+                return slot
+        return None
+
+    def view(self, slot: int):
+        """
+        Zero-copy (times, values, count) of a slot. The arrays are the ring
+        itself: row count % capacity is the next to be overwritten, so copy
+        what you keep and check count afterwards.
+        """
+        return self.times[slot], self.values[slot], int(self.counts[slot])
+
+    def window(self, slot: int, samples: int = 1):
+        """
+        Copy of the last `samples` samples of a slot, oldest first, as
+        (times[n], values[n, columns]); empty arrays if there are none.
+        """
+        ncols = len(self.directory()["columns"])
+        for _ in range(READ_RETRIES):
+            count = int(self.counts[slot])
+            n = min(samples, count, self.capacity)
+            start = count - n
+            idx = np.arange(start, count) % self.capacity
+            times = self.times[slot, idx]
+            values = self.values[slot, idx, :ncols]
+            after = int(self.counts[slot])
+            if after >= count and after - start <= self.capacity:
+                return times, values
+        logging.warning(f"Live ring slot {slot} kept moving under the reader; returning last read")
+        return times, values
+
+    def snapshot(self):
+        """
+        Latest sample of every circuit as a live_data payload (same keys the
+        SQLite tailer emits).
+        """
+        directory = self.directory()
+        columns = directory["columns"]
+        payload = {"timestamp": datetime.now(UTC).isoformat(), "circuits": []}
+        for slot, circuit in sorted(directory["slots"].items()):
+            times, values = self.window(slot, 1)
+            if not len(times):
+                continue
+            payload["circuits"].append(self._to_record(circuit, columns, times[0], values[0]))
+        return payload
+
+    def records(self, slot: int, samples: int):
+        directory = self.directory()
+        circuit = directory["slots"].get(slot)
+        if circuit is None:
+            return []
+        times, values = self.window(slot, samples)
+        return [self._to_record(circuit, directory["columns"], t, row) for t, row in zip(times, values)]
+
+    @staticmethod
+    def _to_record(circuit, columns, timestamp, row):
+        record = dict(circuit)
+        record["timestamp"] = datetime.fromtimestamp(float(timestamp), UTC).replace(tzinfo=None).isoformat()
+        for (name, kind), value in zip(columns, row.tolist()):
+            if value != value:  # NaN: column not in this circuit's table
+                continue
+            # shortest float32 repr, so 3.7 comes back as 3.7 and not 3.700000047683716
+            record[name] = int(value) if kind == "int" else float(str(np.float32(value)))
+        return record
+
+    def status(self):
+        directory = self.directory()
+        return {
+            "name": self.shm.name,
+            "slots": self.slots,
+            "slots_used": len(directory["slots"]),
+            "capacity": self.capacity,
+            "columns": len(directory["columns"]),
+            "max_columns": self.max_columns,
+            "samples": {str(c["circuit_id"]): int(self.counts[s]) for s, c in directory["slots"].items()},
+            "size_bytes": self.shm.size,
+        }
+
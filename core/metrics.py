@@ -0,0 +1,166 @@
+import time
+import bisect
+import threading
+
+# ===================================================
+# In-Process Metrics (Prometheus text format)
+# ===================================================
+# Small dependency-free counters and histograms rendered in the Prometheus
+# exposition format by render() for a /metrics endpoint.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a fast SQL insert up to a slow 100 MB workbook parse
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_str(names, key + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_str(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, key)} {series[-1]}")
+        return lines
+
+    def summary(self):
+        """
+        {label values: {"count", "sum", "mean"}} for logs and JSON views.
+        """
+        with self._lock:
+            return {
+                key: {"count": s[-1], "sum": round(s[-2], 6), "mean": round(s[-2] / s[-1], 6) if s[-1] else None}
+                for key, s in self._series.items()
+            }
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, skip_prefix: str = None):
+        lines = []
+        for metric in self._metrics:
+            if skip_prefix and metric.name.startswith(skip_prefix):
+                continue
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def render(skip_prefix: str = None):
+    return registry.render(skip_prefix)
+
+
+# ===================================================
+# Ingestion Metrics
+# ===================================================
+ingest_stage_seconds = registry.register(Histogram(
+    "bts_ingest_stage_seconds", "Time spent per ingestion stage", labels=("stage", "test_type")))
+ingest_file_seconds = registry.register(Histogram(
+    "bts_ingest_file_seconds", "End-to-end processing time per battery file", labels=("test_type",)))
+ingest_files_total = registry.register(Counter(
+    "bts_ingest_files_total", "Battery files processed", labels=("test_type", "status")))
+ingest_queue_wait_seconds = registry.register(Histogram(
+    "bts_ingest_queue_wait_seconds", "Time a battery file waited in the ingestion queue", labels=("lane", "test_type")))
+ingest_verdict_seconds = registry.register(Histogram(
+    "bts_ingest_verdict_seconds", "Time from file detection to verdict (queue wait + processing)",
+    labels=("lane", "test_type")))
+
+live_poll_seconds = registry.register(Histogram(
+    "bts_live_poll_seconds", "Live circuit polling time per stage", labels=("stage",)))
+sqlite_read_busy_total = registry.register(Counter(
+    "bts_sqlite_read_busy_total", "Circuit DB reads that hit the device's write lock",
+    labels=("reader", "outcome")))
+sqlite_read_busy_wait_seconds = registry.register(Histogram(
+    "bts_sqlite_read_busy_wait_seconds", "Time a contended circuit DB read waited for the lock",
+    labels=("reader",)))
+live_poll_files_total = registry.register(Counter(
+    "bts_live_poll_files_total", "Circuit DBs per poll that were queried or skipped as unchanged",
+    labels=("result",)))
+
+
+class StageTimer:
+    """
+    Times consecutive stages of one battery file:
+        timer = StageTimer("CDC")
+        ...parse...;   timer.lap("workbook_parse")
+        ...extract...; timer.lap("metric_extraction")
+        timer.finish("PASS")
+    Each lap records the time since the previous lap (or creation).
+    """
+
+    def __init__(self, test_type: str):
+        self.test_type = test_type
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        ingest_stage_seconds.observe(elapsed, stage=stage, test_type=self.test_type)
+        self._last = now
+        return elapsed
+
+    def finish(self, status: str):
+        ingest_file_seconds.observe(time.perf_counter() - self.started, test_type=self.test_type)
+        ingest_files_total.inc(test_type=self.test_type, status=status)
@@ -0,0 +1,203 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.device_api import DeviceAPI
+from config import (
+    PAUSE_TRIP_SAMPLES,
+    PAUSE_CLEAR_SAMPLES,
+    PAUSE_RETRY_SECONDS,
+    PAUSE_DISPATCH_WORKERS,
+)
+
+# ===================================================
+# Debounced Auto-Pause Dispatcher
+# ===================================================
+# Per (device, circuit) state machine:
+#   armed    -> over-limit samples are counted; PAUSE_TRIP_SAMPLES in a row
+#               send one pause (in flight)
+#   inflight -> pause request running on the worker pool; repeats are dropped
+#   paused   -> excursion latched; no more pauses until the signals stay
+#               below the hysteresis band for PAUSE_CLEAR_SAMPLES samples
+# A failed pause goes back to armed and may retry after PAUSE_RETRY_SECONDS.
+
+STATE_ARMED = "armed"
+STATE_INFLIGHT = "inflight"
+STATE_PAUSED = "paused"
+
+
+def _circuit_key(device_id, circuit_id):
+    """
+    (int device, int circuit), or None for IDs that are not numeric (e.g.
+    the "unknown" circuit of a DB that matched no active circuit).
+    """
+    try:
+        return int(device_id), int(circuit_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class _CircuitState:
+    __slots__ = ("state", "over_count", "clear_count", "retry_after", "details")
+
+    def __init__(self):
+        self.state = STATE_ARMED
+        self.over_count = 0
+        self.clear_count = 0
+        self.retry_after = 0.0
+        self.details = None
+
+
+class PauseDispatcher:
+    """
+    Sends exactly one authenticated pause per threshold excursion and runs
+    the HTTP calls on a small worker pool so one slow device does not hold
+    up the monitor loop.
+    """
+
+    def __init__(self, api: DeviceAPI = None, max_workers: int = PAUSE_DISPATCH_WORKERS,
+                 trip_samples: int = PAUSE_TRIP_SAMPLES, clear_samples: int = PAUSE_CLEAR_SAMPLES):
+        self.api = api or DeviceAPI()
+        self.trip_samples = max(1, trip_samples)
+        self.clear_samples = max(1, clear_samples)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="auto-pause")
+        self._states = {}
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.suppressed = 0
+
+    def _get_state(self, key):
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _CircuitState()
+        return state
+
+    # ------------------------------
+    # Sample Feed
+    # ------------------------------
+    def observe(self, device_id, circuit_id, exceeded_metrics=None, hot: bool = None):
+        """
+        Feeds one sample of a circuit.
+        exceeded_metrics: list of (key, value, limit) over the limit (empty if none)
+        hot: still inside the hysteresis band (defaults to bool(exceeded_metrics))
+        Returns True when this sample dispatched a pause. Samples of
+        circuits without numeric IDs are ignored.
+        """
+        key = _circuit_key(device_id, circuit_id)
+        if key is None:
+            return False
+        exceeded = bool(exceeded_metrics)
+        hot = exceeded if hot is None else (hot or exceeded)
+
+        with self._lock:
+            state = self._get_state(key)
+
+            if state.state == STATE_PAUSED:
+                state.clear_count = 0 if hot else state.clear_count + 1
+                if state.clear_count >= self.clear_samples:
+                    logging.info(f"[AUTO-PAUSE] Device {key[0]} Circuit {key[1]} back within limits, re-armed")
+                    state.state = STATE_ARMED
+                    state.over_count = state.clear_count = 0
+                elif exceeded:
+                    self.suppressed += 1
+                return False
+
+            if state.state == STATE_INFLIGHT:
+                if exceeded:
+                    self.suppressed += 1
+                return False
+
+            # armed
+            if not exceeded:
+                state.over_count = 0
+                return False
+            state.over_count += 1
+            if state.over_count < self.trip_samples:
+                return False
+            if time.time() < state.retry_after:
+                self.suppressed += 1
+                return False
+            return self._dispatch_locked(key, state, exceeded_metrics)
+
+    def request_pause(self, device_id, circuit_id, details=None):
+        """
+        Pauses immediately (no debounce) unless a pause for this circuit is
+        already in flight or latched.
+        """
+        key = _circuit_key(device_id, circuit_id)
+        if key is None:
+            logging.warning(f"[AUTO-PAUSE] Cannot pause Device {device_id} Circuit {circuit_id}: not a numeric ID")
+            return False
+        with self._lock:
+            state = self._get_state(key)
+            if state.state != STATE_ARMED:
+                self.suppressed += 1
+                return False
+            return self._dispatch_locked(key, state, details)
+
+    def reset(self, device_id, circuit_id):
+        """
+        Re-arms a circuit, e.g. after the operator continued it, and drops
+        its state; call it when a circuit stops so _states does not grow.
+        """
+        key = _circuit_key(device_id, circuit_id)
+        with self._lock:
+            self._states.pop(key, None)
+
+    # ------------------------------
+    # Dispatch
+    # ------------------------------
+    def _dispatch_locked(self, key, state, details):
+        state.state = STATE_INFLIGHT
+        state.details = details
+        self.sent += 1
+        self._executor.submit(self._send, key, state, details)
+        return True
+
+    def _send(self, key, dispatched, details):
+        device_id, circuit_id = key
+        result = None
+        try:
+            result = self.api.pause_circuit(device_id, circuit_id)
+            ok = bool(result and result.get("ok"))
+        except Exception as e:
+            logging.error(f"[AUTO-PAUSE] Error calling pause API: {e}")
+            ok = False
+
+        with self._lock:
+            # reset() while the call was in flight (circuit stopped or
+            # continued): don't bring the circuit back as PAUSED / re-armed
+            state = self._states.get(key)
+            if state is not dispatched:
+                return
+            if ok:
+                state.state = STATE_PAUSED
+                state.clear_count = 0
+                state.retry_after = 0.0
+                logging.info(f"[AUTO-PAUSE] Device {device_id} Circuit {circuit_id} paused due to {details}")
+            else:
+                state.state = STATE_ARMED
+                state.over_count = 0
+                state.retry_after = time.time() + PAUSE_RETRY_SECONDS
+                logging.warning(f"[AUTO-PAUSE] Pause failed for Device {device_id} Circuit {circuit_id}: {result}")
+
+    def status(self):
+        """
+        Snapshot of all tracked circuits for diagnostics.
+        """
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "suppressed": self.suppressed,
+                "circuits": [
+                    {"device_id": d, "circuit_id": c, "state": s.state, "over_count": s.over_count,
+                     "clear_count": s.clear_count}
+                    for (d, c), s in sorted(self._states.items())
+                ],
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+pause_dispatcher = PauseDispatcher()
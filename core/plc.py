@@ -0,0 +1,49 @@
+import logging
+from pyModbusTCP.client import ModbusClient
+from config import PLC_HOST, PLC_PORT
+
+# ===================================================
+# Result PLC (Modbus TCP)
+# ===================================================
+# PASS / FAIL verdicts are written to one holding register per channel,
+# starting at PLC_REGISTERS[device]["start"] for channel 1.
+
+PLC_REGISTERS = {
+    "1": {
+        "start":60
+    },
+    "5": {
+        "start":44
+    },
+    "6": {
+        "start":42
+    }
+}
+
+
+def connect_plc():
+    plc = ModbusClient(host=PLC_HOST, port=PLC_PORT, auto_open=True)
+    return plc
+
+
+def send_result_to_plc(device, circuit, status):
+    # PASS = 1, FAIL = 0
+    # check plc is connected or not
+    try:
+        plc = connect_plc()
+
+        # if not plc.is_open:
+        #     print("PLC not connected.")
+        #     return
+        
+        value = 1 if status == "PASS" else 2
+
+        try:
+            plc.write_single_register(int(PLC_REGISTERS[device]['start'])+(int(circuit)-1), value)
+            logging.info(f"Sent result to PLC for Device {device} Circuit {circuit}: {status}")
+        except Exception as e:
+            print(f"Error sending data to PLC: {e}")
+            logging.error(f"Error sending data to PLC for Device {device} Circuit {circuit}: {e}")
+    except Exception as e:
+        print(f"Error in PLC connection: {e}")
+        logging.error(f"Error in PLC connection: {e}")
@@ -0,0 +1,443 @@
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import (
+    STORED_DBC_PATH,
+    ARCHIVE_PATH,
+    ARCHIVE_COMPRESSION,
+    RETENTION_ORIGINAL_ACTION,
+    RETENTION_MOVE_PATH,
+    RETENTION_IDLE_MINUTES,
+    RETENTION_SWEEP_INTERVAL,
+    INDEX_SIDECAR_PATH,
+)
+from core.db_index import find_readings_table, forget_db, SIDECAR_SUFFIX
+from core.db_connect import connect_ro, begin_snapshot
+from core.rollups import get_rollup, forget_rollup
+
+# ===================================================
+# Retention / Compaction of RealTimeData_*.db files
+# ===================================================
+# Finished circuit DBs are copied into compressed Parquet files partitioned
+# by device and date, verified, and then the original is deleted, moved or
+# kept according to RETENTION_ORIGINAL_ACTION. A manifest maps each original
+# DB name to its archive so the history API can keep serving it.
+
+DB_NAME_PATTERN = re.compile(r"^RealTimeData_(?P<device>\d+)_(?P<circuit>\d+)_(?P<stamp>.+)\.db$")
+MANIFEST_FILE = os.path.join(ARCHIVE_PATH, "manifest.json")
+ARCHIVE_CHUNK_ROWS = 100000
+FINISH_GRACE_SECONDS = 60  # let the device flush its last rows after a stop
+
+_manifest_lock = threading.Lock()
+
+
+# ===================================================
+# Helper Functions
+# ===================================================
+def parse_db_name(file_name: str):
+    """
+    RealTimeData_<deviceId>_<circuitId>_<timestamp>.db -> (device_id, circuit_id)
+    """
+    match = DB_NAME_PATTERN.match(file_name)
+    if not match:
+        return None, None
+    return int(match.group("device")), int(match.group("circuit"))
+
+
+def _arrow_type(declared_type: str, stored_types=None):
+    """
+    Maps a SQLite declared column type to an Arrow type. Only clearly
+    numeric (INT / REAL / FLOAT / DOUBLE) and BLOB declarations are taken
+    as-is; for anything else (NUMERIC, DATETIME, TIMESTAMP, untyped, ...)
+    `stored_types`, the typeof() values found in the column, decide, and
+    text such as ISO timestamps is kept as strings.
+    """
+    t = (declared_type or "").upper()
+    if "INT" in t:
+        return pa.int64()
+    if "REAL" in t or "FLOA" in t or "DOUB" in t:
+        return pa.float64()
+    if "BLOB" in t:
+        return pa.binary()
+    if "CHAR" in t or "CLOB" in t or "TEXT" in t:
+        return pa.string()
+    stored = set(stored_types or ()) - {"null"}
+    if stored == {"integer"}:
+        return pa.int64()
+    if stored and stored <= {"integer", "real"}:
+        return pa.float64()
+    return pa.string()
+
+
+def _to_array(values, arrow_type):
+    """
+    Builds an Arrow array; values that do not fit the declared type (SQLite is
+    dynamically typed) are coerced or nulled instead of failing the archive.
+    """
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        if pa.types.is_string(arrow_type):
+            return pa.array([None if v is None else str(v) for v in values], type=arrow_type)
+
+        def coerce(v):
+            try:
+                return None if v is None else float(v)
+            except (TypeError, ValueError):
+                return None
+        floats = pa.array([coerce(v) for v in values], type=pa.float64())
+        return floats.cast(arrow_type, safe=False) if not pa.types.is_floating(arrow_type) else floats
+
+
+def _non_null_counts(parquet_path: str, metadata):
+    """
+    Non-null values per column of a Parquet file, from the row group
+    statistics (the column is read when a row group has none).
+    """
+    counts = []
+    for i in range(metadata.num_columns):
+        nulls = 0
+        for rg in range(metadata.num_row_groups):
+            stats = metadata.row_group(rg).column(i).statistics
+            if stats is None or not stats.has_null_count:
+                nulls = pq.read_table(parquet_path, columns=[metadata.schema.column(i).name]).column(0).null_count
+                break
+            nulls += stats.null_count
+        counts.append(metadata.num_rows - nulls)
+    return counts
+
+
+def _partition_date(first_ts, db_path: str):
+    """
+    Archive date partition: date of the first reading, else the file mtime.
+    """
+    try:
+        return datetime.fromisoformat(str(first_ts).replace("Z", "+00:00")).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return datetime.fromtimestamp(os.path.getmtime(db_path)).strftime("%Y-%m-%d")
+
+
+# ===================================================
+# Manifest
+# ===================================================
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    try:
+        with open(MANIFEST_FILE, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Error reading archive manifest: {e}")
+        return {}
+
+
+def _save_manifest_entry(file_name: str, entry: dict):
+    with _manifest_lock:
+        manifest = load_manifest()
+        manifest[file_name] = entry
+        tmp_path = MANIFEST_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, MANIFEST_FILE)
+
+
+def get_archive_entry(file_name: str):
+    """
+    Returns the manifest entry of an archived DB, or None.
+    """
+    return load_manifest().get(file_name)
+
+
+# ===================================================
+# Compaction
+# ===================================================
+def compact_db(db_path: str):
+    """
+    Copies a circuit DB into a Parquet archive and verifies the row count.
+    Returns the manifest entry (the original file is not touched here).
+    """
+    file_name = os.path.basename(db_path)
+    device_id, circuit_id = parse_db_name(file_name)
+
+    conn = connect_ro(db_path)
+    try:
+        # one snapshot for the bounds, the copy and its row count; the mapped
+        # pages make the full scan cheap
+        begin_snapshot(conn, "retention")
+        cursor = conn.cursor()
+        table_name = find_readings_table(cursor)
+        if not table_name:
+            raise ValueError(f"No tables found in {file_name}")
+
+        cursor.execute(f"PRAGMA table_info({table_name});")
+        columns = []
+        for col in cursor.fetchall():
+            arrow_type = _arrow_type(col[2])
+            declared_text = any(k in (col[2] or "").upper() for k in ("CHAR", "CLOB", "TEXT"))
+            if pa.types.is_string(arrow_type) and not declared_text:
+                stored = [r[0] for r in cursor.execute(f"SELECT DISTINCT typeof({col[1]}) FROM {table_name};")]
+                arrow_type = _arrow_type(col[2], stored)
+            columns.append((col[1], arrow_type))
+        schema = pa.schema(columns)
+        col_names = [name for name, _ in columns]
+        source_counts = cursor.execute(
+            f"SELECT {', '.join(f'count({name})' for name in col_names)} FROM {table_name};").fetchone()
+        has_timestamp = "timestamp" in col_names
+
+        first_ts = last_ts = None
+        if has_timestamp:
+            row = cursor.execute(f"SELECT timestamp FROM {table_name} ORDER BY ROWID ASC LIMIT 1;").fetchone()
+            first_ts = row[0] if row else None
+            row = cursor.execute(f"SELECT timestamp FROM {table_name} ORDER BY ROWID DESC LIMIT 1;").fetchone()
+            last_ts = row[0] if row else None
+
+        date_str = _partition_date(first_ts, db_path)
+        partition = os.path.join(
+            ARCHIVE_PATH,
+            f"device={device_id if device_id is not None else 'unknown'}",
+            f"date={date_str}",
+        )
+        os.makedirs(partition, exist_ok=True)
+        archive_path = os.path.join(partition, os.path.splitext(file_name)[0] + ".parquet")
+        tmp_path = archive_path + ".tmp"
+
+        rows_written = 0
+        cursor.execute(f"SELECT {', '.join(col_names)} FROM {table_name} ORDER BY ROWID;")
+        with pq.ParquetWriter(tmp_path, schema, compression=ARCHIVE_COMPRESSION) as writer:
+            while True:
+                rows = cursor.fetchmany(ARCHIVE_CHUNK_ROWS)
+                if not rows:
+                    break
+                arrays = [_to_array([r[i] for r in rows], t) for i, (_, t) in enumerate(columns)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows_written += len(rows)
+    finally:
+        conn.close()
+
+    metadata = pq.ParquetFile(tmp_path).metadata
+    archived_counts = _non_null_counts(tmp_path, metadata)
+    if metadata.num_rows != rows_written or list(archived_counts) != list(source_counts):
+        os.remove(tmp_path)
+        lost = [name for name, a, b in zip(col_names, archived_counts, source_counts) if a != b]
+        raise IOError(f"Archive verification failed for {file_name}"
+                      + (f": values lost in {', '.join(lost)}" if lost else ""))
+    os.replace(tmp_path, archive_path)
+
+    return {
+        "archive_path": archive_path,
+        "device_id": device_id,
+        "circuit_id": circuit_id,
+        "date": date_str,
+        "table_name": table_name,
+        "rows": rows_written,
+        "time_range": {"start": first_ts, "end": last_ts},
+        "archived_at": datetime.now().isoformat(),
+        "source_size": os.path.getsize(db_path),
+        "archive_size": os.path.getsize(archive_path),
+    }
+
+
+def _dispose_original(db_path: str):
+    """
+    Applies RETENTION_ORIGINAL_ACTION to an archived DB (and its -wal/-shm files).
+    """
+    file_name = os.path.basename(db_path)
+    forget_db(db_path)
+    sidecar = os.path.join(INDEX_SIDECAR_PATH, file_name + SIDECAR_SUFFIX)
+    if os.path.exists(sidecar):
+        os.remove(sidecar)
+
+    if RETENTION_ORIGINAL_ACTION == "keep":
+        return db_path
+    for suffix in ("", "-wal", "-shm"):
+        path = db_path + suffix
+        if not os.path.exists(path):
+            continue
+        if RETENTION_ORIGINAL_ACTION == "move":
+            os.makedirs(RETENTION_MOVE_PATH, exist_ok=True)
+            shutil.move(path, os.path.join(RETENTION_MOVE_PATH, file_name + suffix))
+        else:
+            os.remove(path)
+    if RETENTION_ORIGINAL_ACTION == "move":
+        return os.path.join(RETENTION_MOVE_PATH, file_name)
+    return None
+
+
+def archive_db(db_path: str):
+    """
+    Compacts one finished DB, records it in the manifest and disposes of
+    the original. Returns the manifest entry, or None on failure.
+    """
+    file_name = os.path.basename(db_path)
+    try:
+        t0 = time.time()
+        try:
+            get_rollup(db_path).refresh()  # final rows; the .rollup sidecar outlives the original
+        except Exception as e:
+            logging.error(f"[RETENTION] Error finishing rollups of {file_name}: {e}")
+        forget_rollup(db_path)
+        entry = compact_db(db_path)
+        entry["original"] = _dispose_original(db_path)
+        _save_manifest_entry(file_name, entry)
+        logging.info(
+            f"[RETENTION] Archived {file_name}: {entry['rows']} rows, "
+            f"{entry['source_size']} -> {entry['archive_size']} bytes in {time.time() - t0:.2f}s"
+        )
+        return entry
+    except Exception as e:
+        logging.error(f"[RETENTION] Error archiving {file_name}: {e}")
+        return None
+
+
+# ===================================================
+# History Reads from Archives
+# ===================================================
+def read_archived_rows(file_name: str, limit: int = 100, start=None, end=None):
+    """
+    Reads rows of an archived DB, newest first (same shape as the SQLite rows
+    returned by the history API). Tail reads only decode the last row groups.
+    """
+    entry = get_archive_entry(file_name)
+    if not entry or not os.path.exists(entry["archive_path"]):
+        return None
+
+    if start is not None or end is not None:
+        filters = []
+        if start is not None:
+            filters.append(("timestamp", ">=", start))
+        if end is not None:
+            filters.append(("timestamp", "<=", end))
+        table = pq.read_table(entry["archive_path"], filters=filters)
+        rows = table.slice(max(0, table.num_rows - limit)).to_pylist()
+    else:
+        parquet_file = pq.ParquetFile(entry["archive_path"])
+        groups, count = [], 0
+        for i in range(parquet_file.num_row_groups - 1, -1, -1):
+            groups.insert(0, i)
+            count += parquet_file.metadata.row_group(i).num_rows
+            if count >= limit:
+                break
+        if not groups:
+            return []
+        table = parquet_file.read_row_groups(groups)
+        rows = table.slice(max(0, table.num_rows - limit)).to_pylist()
+
+    rows.reverse()
+    return rows
+
+
+def list_archives(device_id: int = None):
+    """
+    Lists archived DBs from the manifest, optionally for one device.
+    """
+    manifest = load_manifest()
+    return [
+        dict(entry, file_name=name)
+        for name, entry in sorted(manifest.items())
+        if device_id is None or entry.get("device_id") == device_id
+    ]
+
+
+def latest_circuit_db(device_id, circuit_id, folder_path: str = STORED_DBC_PATH):
+    """
+    File name of the most recent DB of a circuit, still on disk or archived
+    (RealTimeData_<device>_<circuit>_<timestamp>.db, latest timestamp), or None.
+    """
+    names = set(load_manifest())
+    if os.path.isdir(folder_path):
+        names.update(os.listdir(folder_path))
+    candidates = []
+    for name in names:
+        match = DB_NAME_PATTERN.match(name)
+        if match and int(match.group("device")) == int(device_id) and int(match.group("circuit")) == int(circuit_id):
+            candidates.append((match.group("stamp"), name))
+    return max(candidates)[1] if candidates else None
+
+
+# ===================================================
+# Background Worker
+# ===================================================
+class RetentionWorker:
+    """
+    Archives DBs whose test ended (scheduled explicitly after a stop) and
+    periodically sweeps the folder for idle, unmonitored DBs.
+    `active_files` returns the file names that must not be touched.
+    """
+
+    def __init__(self, folder_path: str = STORED_DBC_PATH, active_files=None):
+        self.folder_path = folder_path
+        self.active_files = active_files or (lambda: set())
+        self._pending = {}  # file_name -> due time
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_sweep = 0
+
+    def schedule(self, file_name: str, delay: float = FINISH_GRACE_SECONDS):
+        """
+        Marks a DB as finished; it is archived after `delay` seconds.
+        """
+        if not file_name:
+            return
+        with self._lock:
+            self._pending[os.path.basename(file_name)] = time.time() + delay
+        self._wakeup.set()
+
+    def find_idle_files(self):
+        """
+        DBs that are not monitored and have not been written for RETENTION_IDLE_MINUTES.
+        """
+        cutoff = time.time() - RETENTION_IDLE_MINUTES * 60
+        active = set(self.active_files())
+        idle = []
+        with os.scandir(self.folder_path) as it:
+            for entry in it:
+                if not entry.name.endswith(".db") or entry.name in active:
+                    continue
+                mtimes = [entry.stat().st_mtime]
+                if os.path.exists(entry.path + "-wal"):
+                    mtimes.append(os.path.getmtime(entry.path + "-wal"))
+                if max(mtimes) < cutoff:
+                    idle.append(entry.name)
+        return idle
+
+    def _due_files(self):
+        now = time.time()
+        active = set(self.active_files())
+        with self._lock:
+            due = [name for name, t in self._pending.items() if t <= now and name not in active]
+            for name in due:
+                del self._pending[name]
+        return due
+
+    def run_once(self):
+        files = self._due_files()
+        if time.time() - self._last_sweep >= RETENTION_SWEEP_INTERVAL:
+            self._last_sweep = time.time()
+            files.extend(f for f in self.find_idle_files() if f not in files)
+
+        for file_name in files:
+            db_path = os.path.join(self.folder_path, file_name)
+            if os.path.exists(db_path):
+                archive_db(db_path)
+        return files
+
+    def run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"[RETENTION] Worker error: {e}")
+            self._wakeup.wait(timeout=min(FINISH_GRACE_SECONDS, RETENTION_SWEEP_INTERVAL))
+            self._wakeup.clear()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
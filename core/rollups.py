@@ -0,0 +1,328 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import UTC, datetime
+import numpy as np
+import pandas as pd
+from config import STORED_DBC_PATH, INDEX_SIDECAR_PATH, ROLLUP_INTERVAL, ROLLUP_BATCH_ROWS, ROLLUP_STEP_COLUMNS
+from core.db_index import find_readings_table
+from core.db_connect import connect_ro, run_read, fetch_all
+from core.db_reader import NUMERIC_TYPES
+from core.timestamps import parse_times
+
+# ===================================================
+# Incremental Signal Rollups (per minute / per step)
+# ===================================================
+# Zoomed-out charts and cycle summaries used to scan every raw sample. A
+# rollup sidecar (<db name>.rollup next to the .tsidx indexes) keeps, for
+# every numeric signal of a circuit DB:
+#   minute_rollup  one row per (signal, minute): n, min, max, sum, last
+#   step_rollup    one row per (signal, step segment): the same, plus the
+#                  step number and first / last timestamp of the segment
+# A step segment is a run of consecutive rows with the same step number,
+# so a step repeated in every cycle gets one row per cycle.
+# Only rows above the last rolled-up ROWID are read (batches of
+# ROLLUP_BATCH_ROWS), and each batch is merged into the tables with upserts
+# in the same transaction as the new high-water mark.
+
+ROLLUP_SUFFIX = ".rollup"
+TIMESTAMP_COLUMN = "timestamp"
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS minute_rollup (signal TEXT, minute INTEGER, n INTEGER, min REAL, max REAL, "
+    "sum REAL, last REAL, PRIMARY KEY (signal, minute)) WITHOUT ROWID;",
+    "CREATE TABLE IF NOT EXISTS step_rollup (signal TEXT, segment INTEGER, step REAL, n INTEGER, min REAL, "
+    "max REAL, sum REAL, last REAL, start_ts TEXT, end_ts TEXT, PRIMARY KEY (signal, segment)) WITHOUT ROWID;",
+    "CREATE TABLE IF NOT EXISTS rollup_state (key TEXT PRIMARY KEY, value);",
+]
+
+_UPSERT_MINUTE = """
+INSERT INTO minute_rollup (signal, minute, n, min, max, sum, last) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (signal, minute) DO UPDATE SET
+    n = n + excluded.n,
+    min = min(minute_rollup.min, excluded.min),
+    max = max(minute_rollup.max, excluded.max),
+    sum = sum + excluded.sum,
+    last = excluded.last;
+"""
+
+_UPSERT_STEP = """
+INSERT INTO step_rollup (signal, segment, step, n, min, max, sum, last, start_ts, end_ts)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (signal, segment) DO UPDATE SET
+    n = n + excluded.n,
+    min = min(step_rollup.min, excluded.min),
+    max = max(step_rollup.max, excluded.max),
+    sum = sum + excluded.sum,
+    last = excluded.last,
+    end_ts = excluded.end_ts;
+"""
+
+_STATS = ["count", "min", "max", "sum", "last"]
+
+
+def _minute_iso(minute: int):
+    return datetime.fromtimestamp(int(minute) * 60, UTC).replace(tzinfo=None).isoformat()
+
+
+def _to_minute(value):
+    """
+    Time string / datetime -> minute number (naive time taken as-is), or None.
+    """
+    if value is None:
+        return None
+    stamp = parse_times([value]).iloc[0]
+    if pd.isna(stamp):
+        return None
+    return int(stamp.value // 60_000_000_000)
+
+
+def _aggregate(values: pd.DataFrame, keys):
+    """
+    Long-format (key, signal, n, min, max, sum, last) rows of one batch,
+    skipping signals without a value in a group.
+    """
+    stats = values.groupby(keys, sort=False).agg(_STATS)
+    long = stats.stack(level=0, future_stack=True)
+    long = long[long["count"] > 0]
+    return long
+
+
+class RollupStore:
+    """
+    Rollup sidecar of one circuit DB.
+    """
+
+    def __init__(self, db_path: str, folder: str = None):
+        self.db_path = db_path
+        self.name = os.path.basename(db_path)
+        self.path = os.path.join(folder or INDEX_SIDECAR_PATH, self.name + ROLLUP_SUFFIX)
+        self._lock = threading.Lock()
+        conn = sqlite3.connect(self.path)
+        try:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---------------- maintenance ----------------
+    def refresh(self):
+        """
+        Rolls up the rows written since the last refresh. Returns the
+        number of raw rows consumed.
+        """
+        if not os.path.exists(self.db_path):
+            return 0
+        with self._lock:
+            src = connect_ro(self.db_path)
+            side = sqlite3.connect(self.path)
+            consumed = 0
+            try:
+                table_name = run_read(lambda: find_readings_table(src.cursor()), "rollup")
+                if not table_name:
+                    return 0
+                columns_info = fetch_all(src, f"PRAGMA table_info({table_name});", reader="rollup")
+                names = [col[1] for col in columns_info]
+                signals = [col[1] for col in columns_info if col[1] != TIMESTAMP_COLUMN
+                           and any(t in (col[2] or "").upper() for t in NUMERIC_TYPES)]
+                step_col = next((n for n in names if n.lower() in ROLLUP_STEP_COLUMNS), None)
+                has_ts = TIMESTAMP_COLUMN in names
+                select = ", ".join(["ROWID"] + ([TIMESTAMP_COLUMN] if has_ts else []) + signals)
+
+                state = dict(side.execute("SELECT key, value FROM rollup_state;").fetchall())
+                while True:
+                    rows = fetch_all(src, f"SELECT {select} FROM {table_name} WHERE ROWID > ? ORDER BY ROWID LIMIT ?;",
+                                     (state.get("last_rowid", 0), ROLLUP_BATCH_ROWS), reader="rollup")
+                    if not rows:
+                        break
+                    self._merge(side, rows, has_ts, signals, step_col, state)
+                    consumed += len(rows)
+                    if len(rows) < ROLLUP_BATCH_ROWS:
+                        break
+            finally:
+                src.close()
+                side.close()
+            return consumed
+
+    def _merge(self, side, rows, has_ts, signals, step_col, state):
+        frame = pd.DataFrame.from_records(rows, columns=["_rowid"] + ([TIMESTAMP_COLUMN] if has_ts else []) + signals)
+        values = frame[signals].apply(pd.to_numeric, errors="coerce")
+
+        minute_rows = []
+        if has_ts:
+            times = parse_times(frame[TIMESTAMP_COLUMN], key=(self.name, TIMESTAMP_COLUMN))
+            valid = times.notna().to_numpy()
+            if valid.any():
+                minutes = times[valid].to_numpy().astype("datetime64[m]").astype(np.int64)
+                long = _aggregate(values[valid], minutes)
+                minute_rows = [(signal, int(minute), int(r[0]), r[1], r[2], r[3], r[4])
+                               for (minute, signal), r in zip(long.index, long.to_numpy().tolist())]
+
+        step_rows = []
+        if step_col:
+            steps = values[step_col].to_numpy()
+            previous = state.get("step")
+            prev = np.concatenate(([np.nan if previous is None else previous], steps[:-1]))
+            changed = ~((steps == prev) | (np.isnan(steps) & np.isnan(prev)))
+            segment = int(state.get("segment", 0)) - (1 if previous is None else 0)
+            segments = segment + np.cumsum(changed)
+            long = _aggregate(values, segments)
+            bounds = frame.groupby(segments, sort=False)[TIMESTAMP_COLUMN].agg(["first", "last"]) if has_ts else None
+            first_step = values.groupby(segments, sort=False)[step_col].first().astype(float)
+            for (seg, signal), r in zip(long.index, long.to_numpy().tolist()):
+                start_ts, end_ts = (bounds.at[seg, "first"], bounds.at[seg, "last"]) if has_ts else (None, None)
+                step = first_step.at[seg]
+                step_rows.append((signal, int(seg), None if np.isnan(step) else float(step), int(r[0]), r[1], r[2], r[3], r[4],
+                                  start_ts, end_ts))
+            state["segment"] = int(segments[-1])
+            state["step"] = None if np.isnan(steps[-1]) else float(steps[-1])
+
+        state["last_rowid"] = int(frame["_rowid"].iloc[-1])
+        with side:  # one transaction: aggregates and high-water mark together
+            side.executemany(_UPSERT_MINUTE, minute_rows)
+            side.executemany(_UPSERT_STEP, step_rows)
+            side.executemany("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?);", state.items())
+
+    # ---------------- queries ----------------
+    def signals(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return [r[0] for r in conn.execute("SELECT DISTINCT signal FROM minute_rollup UNION "
+                                               "SELECT DISTINCT signal FROM step_rollup;").fetchall()]
+        finally:
+            conn.close()
+
+    def minutes(self, signal: str = None, start=None, end=None, resolution: int = 1):
+        """
+        Per-signal buckets of `resolution` minutes within [start, end]:
+        {signal: [{"time", "n", "min", "max", "mean", "last"}]}, oldest first.
+        """
+        clauses, params = [], []
+        if signal:
+            clauses.append("signal = ?")
+            params.append(signal)
+        for op, bound in ((">=", _to_minute(start)), ("<=", _to_minute(end))):
+            if bound is not None:
+                clauses.append(f"minute {op} ?")
+                params.append(bound)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(f"SELECT signal, minute, n, min, max, sum, last FROM minute_rollup {where} "
+                                f"ORDER BY signal, minute;", params).fetchall()
+        finally:
+            conn.close()
+
+        resolution = max(1, int(resolution))
+        result = {}
+        for sig, minute, n, lo, hi, total, last in rows:
+            buckets = result.setdefault(sig, [])
+            bucket = minute - minute % resolution
+            if buckets and buckets[-1]["_bucket"] == bucket:
+                b = buckets[-1]
+                b["n"] += n
+                b["min"] = min(b["min"], lo)
+                b["max"] = max(b["max"], hi)
+                b["_sum"] += total
+                b["last"] = last
+            else:
+                buckets.append({"_bucket": bucket, "time": _minute_iso(bucket), "n": n, "min": lo, "max": hi,
+                                "_sum": total, "last": last})
+        for buckets in result.values():
+            for b in buckets:
+                del b["_bucket"]
+                b["mean"] = b.pop("_sum") / b["n"]
+        return result
+
+    def steps(self, signal: str = None):
+        """
+        One entry per step segment (cycle order): step number, time span
+        and {signal: {"n", "min", "max", "mean", "last"}}.
+        """
+        sql = "SELECT segment, step, start_ts, end_ts, signal, n, min, max, sum, last FROM step_rollup"
+        params = ()
+        if signal:
+            sql += " WHERE signal = ?"
+            params = (signal,)
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(sql + " ORDER BY segment, signal;", params).fetchall()
+        finally:
+            conn.close()
+
+        segments = {}
+        for segment, step, start_ts, end_ts, sig, n, lo, hi, total, last in rows:
+            entry = segments.setdefault(segment, {"segment": segment, "step": step, "start": start_ts,
+                                                  "end": end_ts, "signals": {}})
+            entry["signals"][sig] = {"n": n, "min": lo, "max": hi, "mean": total / n, "last": last}
+        return list(segments.values())
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_rollup(db_path: str):
+    """
+    Returns the (cached) rollup store of a circuit DB.
+    """
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = RollupStore(db_path)
+            _stores[db_path] = store
+        return store
+
+
+def forget_rollup(db_path: str):
+    with _stores_lock:
+        _stores.pop(db_path, None)
+
+
+def rollup_exists(file_name: str):
+    return os.path.exists(os.path.join(INDEX_SIDECAR_PATH, os.path.basename(file_name) + ROLLUP_SUFFIX))
+
+
+# ===================================================
+# Background Worker
+# ===================================================
+class RollupWorker:
+    """
+    Keeps the rollups of the monitored DBs current (every ROLLUP_INTERVAL).
+    `active_files` returns the file names being monitored.
+    """
+
+    def __init__(self, folder_path: str = STORED_DBC_PATH, active_files=None, interval: float = ROLLUP_INTERVAL):
+        self.folder_path = folder_path
+        self.active_files = active_files or (lambda: set())
+        self.interval = interval
+        self.rows_rolled_up = 0
+        self.last_run = None
+
+    def run_once(self):
+        consumed = 0
+        for file_name in set(self.active_files()):
+            db_path = os.path.join(self.folder_path, file_name)
+            try:
+                consumed += get_rollup(db_path).refresh()
+            except Exception as e:
+                logging.error(f"[ROLLUP] Error rolling up {file_name}: {e}")
+        self.rows_rolled_up += consumed
+        self.last_run = time.time()
+        return consumed
+
+    def run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"[ROLLUP] Worker error: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,364 @@
+import os
+import json
+import math
+import time
+import logging
+import operator
+import threading
+from datetime import datetime
+from config import RULES_FILE
+
+# ===================================================
+# Streaming Rule Engine for Live-Signal Alarms
+# ===================================================
+# Rules are evaluated sample by sample for every circuit. Each rule keeps a
+# fixed-size state per circuit (windows are split into WINDOW_BUCKETS time
+# buckets holding sum/count/max), so the cost per sample is O(1) no matter
+# how fast the device writes. Alarms are edge triggered: one "raised" event
+# when a rule becomes true and one "cleared" event when it stops.
+#
+# rules.json example:
+# [
+#   {"id": "temp_high",  "type": "threshold",      "signal": "maxtemp", "op": ">", "limit": 55},
+#   {"id": "temp_rise",  "type": "rate_of_change", "signal": "maxtemp", "limit": 2, "per_seconds": 60},
+#   {"id": "curr_avg",   "type": "rolling_mean",   "signal": "packcurr", "window_seconds": 30, "op": ">", "limit": 20},
+#   {"id": "dev_peak",   "type": "rolling_max",    "signal": "cellvolminmaxdev", "window_seconds": 60, "limit": 50},
+#   {"id": "temp_soak",  "type": "duration_above", "signal": "maxtemp", "limit": 50, "seconds": 120},
+#   {"id": "dev_vs_pack","type": "cross_signal",   "signals": ["cellvolminmaxdev", "packvol"],
+#                        "combine": "ratio", "op": ">", "limit": 0.02}
+# ]
+
+WINDOW_BUCKETS = 10
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def _value(sample, signal):
+    try:
+        value = float(sample.get(signal))
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _sample_time(sample):
+    """
+    Sample time in epoch seconds: numeric/ISO "timestamp" field, else now.
+    """
+    ts = sample.get("timestamp")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+# ===================================================
+# Rule Types
+# ===================================================
+class Rule:
+    """
+    Base rule: subclasses implement new_state() and update(state, sample, ts)
+    returning (active, value) or None when the sample has no usable value.
+    """
+
+    def __init__(self, spec: dict):
+        self.id = spec.get("id") or f"{spec['type']}_{spec.get('signal', '')}"
+        self.spec = spec
+        self.signal = spec.get("signal")
+        self.limit = float(spec.get("limit", 0))
+        self.compare = OPERATORS[spec.get("op", ">")]
+        self.severity = spec.get("severity", "warning")
+
+    def new_state(self):
+        return None
+
+    def update(self, state, sample, ts):
+        raise NotImplementedError
+
+
+class ThresholdRule(Rule):
+    def update(self, state, sample, ts):
+        value = _value(sample, self.signal)
+        if value is None:
+            return None
+        return self.compare(value, self.limit), value
+
+
+class RateOfChangeRule(Rule):
+    """
+    |Δvalue| per `per_seconds` between consecutive samples.
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.per_seconds = float(spec.get("per_seconds", 1))
+        self.absolute = spec.get("absolute", True)
+
+    def new_state(self):
+        return [None, None]  # last value, last time
+
+    def update(self, state, sample, ts):
+        value = _value(sample, self.signal)
+        if value is None:
+            return None
+        last_value, last_ts = state
+        state[0], state[1] = value, ts
+        if last_value is None or ts <= last_ts:
+            return None
+        rate = (value - last_value) / (ts - last_ts) * self.per_seconds
+        if self.absolute:
+            rate = abs(rate)
+        return self.compare(rate, self.limit), rate
+
+
+class _BucketWindowRule(Rule):
+    """
+    Time window of `window_seconds` kept as WINDOW_BUCKETS buckets of
+    [bucket id, sum, count, max]; old buckets are overwritten in place.
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.window = float(spec.get("window_seconds", 60))
+        self.bucket_width = self.window / WINDOW_BUCKETS
+
+    def new_state(self):
+        return [[-1, 0.0, 0, -math.inf] for _ in range(WINDOW_BUCKETS)]
+
+    def _add(self, state, value, ts):
+        bucket_id = int(ts // self.bucket_width)
+        bucket = state[bucket_id % WINDOW_BUCKETS]
+        if bucket[0] != bucket_id:
+            bucket[0], bucket[1], bucket[2], bucket[3] = bucket_id, 0.0, 0, -math.inf
+        bucket[1] += value
+        bucket[2] += 1
+        if value > bucket[3]:
+            bucket[3] = value
+        return bucket_id - WINDOW_BUCKETS + 1  # oldest bucket still in the window
+
+    def update(self, state, sample, ts):
+        value = _value(sample, self.signal)
+        if value is None:
+            return None
+        oldest = self._add(state, value, ts)
+        live = [b for b in state if b[0] >= oldest]
+        result = self.aggregate(live)
+        return self.compare(result, self.limit), result
+
+    def aggregate(self, buckets):
+        raise NotImplementedError
+
+
+class RollingMeanRule(_BucketWindowRule):
+    def aggregate(self, buckets):
+        total = sum(b[1] for b in buckets)
+        count = sum(b[2] for b in buckets)
+        return total / count if count else 0.0
+
+
+class RollingMaxRule(_BucketWindowRule):
+    def aggregate(self, buckets):
+        return max(b[3] for b in buckets)
+
+
+class DurationAboveRule(Rule):
+    """
+    Active once the signal has been over the limit continuously for `seconds`.
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.seconds = float(spec.get("seconds", 60))
+
+    def new_state(self):
+        return [None]  # time the excursion started
+
+    def update(self, state, sample, ts):
+        value = _value(sample, self.signal)
+        if value is None:
+            return None
+        if not self.compare(value, self.limit):
+            state[0] = None
+            return False, 0.0
+        if state[0] is None:
+            state[0] = ts
+        duration = ts - state[0]
+        return duration >= self.seconds, duration
+
+
+class CrossSignalRule(Rule):
+    """
+    Compares a combination of two signals, e.g. cell deviation relative to
+    pack voltage: combine = "ratio" (a / b) or "diff" (a - b).
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.signal_a, self.signal_b = spec["signals"]
+        self.signal = f"{self.signal_a}/{self.signal_b}"
+        self.combine = spec.get("combine", "ratio")
+
+    def update(self, state, sample, ts):
+        a = _value(sample, self.signal_a)
+        b = _value(sample, self.signal_b)
+        if a is None or b is None:
+            return None
+        if self.combine == "ratio":
+            if b == 0:
+                return None
+            result = a / b
+        else:
+            result = a - b
+        return self.compare(result, self.limit), result
+
+
+RULE_TYPES = {
+    "threshold": ThresholdRule,
+    "rate_of_change": RateOfChangeRule,
+    "rolling_mean": RollingMeanRule,
+    "rolling_max": RollingMaxRule,
+    "duration_above": DurationAboveRule,
+    "cross_signal": CrossSignalRule,
+}
+
+
+def compile_rules(specs):
+    """
+    Builds rule objects from their JSON specs, skipping invalid ones.
+    """
+    rules = []
+    for spec in specs or []:
+        try:
+            rules.append(RULE_TYPES[spec["type"]](spec))
+        except Exception as e:
+            logging.error(f"Invalid alarm rule {spec}: {e}")
+    return rules
+
+
+def load_rules(path: str = RULES_FILE):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r") as f:
+            return compile_rules(json.load(f))
+    except Exception as e:
+        logging.error(f"Error loading rules file: {e}")
+        return []
+
+
+def save_rules(specs, path: str = RULES_FILE):
+    with open(path, "w") as f:
+        json.dump(specs, f, indent=4)
+
+
+# ===================================================
+# Engine
+# ===================================================
+def normalize_circuit_key(circuit_key):
+    """
+    (device_id, circuit_id) with numeric IDs as ints, so "2" (request
+    JSON) and 2 (live payload) address the same circuit state.
+    """
+    def norm(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    return tuple(norm(v) for v in circuit_key)
+
+
+class RuleEngine:
+    """
+    Keeps per-circuit rule state and turns samples into alarm events.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else load_rules()
+        self._states = {}  # circuit key -> [state per rule]
+        self._active = {}  # circuit key -> [active flag per rule]
+        self._last_ts = {}  # circuit key -> time of the last processed sample
+        self._lock = threading.Lock()
+
+    def set_rules(self, rules):
+        with self._lock:
+            self.rules = rules
+            self._states.clear()
+            self._active.clear()
+            self._last_ts.clear()
+
+    def process(self, circuit_key, sample: dict, ts: float = None):
+        """
+        Feeds one sample of one circuit (key = (device_id, circuit_id));
+        returns the raised/cleared events. A sample not newer than the last
+        one of the circuit (the tail reader repeats the cached record of an
+        unchanged DB every tick) is skipped, so windows count it once.
+        """
+        circuit_key = normalize_circuit_key(circuit_key)
+        ts = _sample_time(sample) if ts is None else ts
+        events = []
+        with self._lock:
+            last = self._last_ts.get(circuit_key)
+            if last is not None and ts <= last:
+                return events
+            self._last_ts[circuit_key] = ts
+            states = self._states.get(circuit_key)
+            if states is None:
+                states = self._states[circuit_key] = [rule.new_state() for rule in self.rules]
+                self._active[circuit_key] = [False] * len(self.rules)
+            active = self._active[circuit_key]
+
+            for i, rule in enumerate(self.rules):
+                result = rule.update(states[i], sample, ts)
+                if result is None:
+                    continue
+                is_active, value = result
+                if is_active != active[i]:
+                    active[i] = is_active
+                    events.append({
+                        "rule_id": rule.id,
+                        "type": rule.spec["type"],
+                        "signal": rule.signal,
+                        "device_id": circuit_key[0],
+                        "circuit_id": circuit_key[1],
+                        "state": "raised" if is_active else "cleared",
+                        "severity": rule.severity,
+                        "value": value,
+                        "limit": rule.limit,
+                        "timestamp": ts,
+                    })
+        return events
+
+    def process_payload(self, payload: dict, device_id=None):
+        """
+        Feeds every circuit of a live_data payload; circuits are keyed by
+        (device_id, circuit_id).
+        """
+        events = []
+        for circuit in payload.get("circuits", []):
+            key = (circuit.get("device_id", device_id), circuit.get("circuit_id"))
+            events.extend(self.process(key, circuit))
+        return events
+
+    def forget(self, circuit_key):
+        circuit_key = normalize_circuit_key(circuit_key)
+        with self._lock:
+            self._states.pop(circuit_key, None)
+            self._active.pop(circuit_key, None)
+            self._last_ts.pop(circuit_key, None)
+
+    def active_alarms(self):
+        with self._lock:
+            return [
+                {"device_id": key[0], "circuit_id": key[1], "rule_id": self.rules[i].id}
+                for key, flags in self._active.items()
+                for i, flag in enumerate(flags) if flag
+            ]
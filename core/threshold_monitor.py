@@ -1,8 +1,11 @@
 import json
 import os
 import logging
-import requests
-from config import API_BASE_URL
+import threading
+from operator import itemgetter
+import numpy as np
+from config import DEFAULT_DEVICE_ID, PAUSE_HYSTERESIS
+from core.pause_dispatcher import pause_dispatcher
 
 # Path to local thresholds JSON file
 THRESHOLD_FILE = os.path.join(os.getcwd(), "thresholds.json")
@@ -50,6 +53,105 @@ def save_thresholds(thresholds: dict):
         logging.error(f"Error saving threshold file: {e}")
 
 
+# =====================================================
+# Compiled Thresholds (vectorized evaluation)
+# =====================================================
+class CompiledThresholds:
+    """
+    Threshold file compiled into a key tuple and a float64 limit array,
+    so one tick of all circuits is checked with a single comparison.
+    """
+
+    __slots__ = ("keys", "limits", "mtime", "getter")
+
+    def __init__(self, thresholds: dict, mtime=None):
+        keys, limits = [], []
+        for key, limit in thresholds.items():
+            try:
+                limits.append(float(limit))
+                keys.append(key)
+            except (TypeError, ValueError):
+                logging.warning(f"Ignoring non-numeric threshold {key}={limit!r}")
+        self.keys = tuple(keys)
+        self.limits = np.array(limits, dtype=np.float64)
+        self.mtime = mtime
+        # one C-level lookup of all keys per circuit
+        self.getter = itemgetter(*keys) if keys else None
+
+
+_compiled = None
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_thresholds():
+    """
+    Returns the compiled thresholds, recompiling only when the file changed
+    (one os.stat per call instead of a JSON parse).
+    """
+    global _compiled
+    try:
+        mtime = os.stat(THRESHOLD_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    compiled = _compiled
+    if compiled is not None and compiled.mtime == mtime:
+        return compiled
+
+    with _compiled_lock:
+        if _compiled is None or _compiled.mtime != mtime:
+            _compiled = CompiledThresholds(load_thresholds(), mtime)
+        return _compiled
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def stack_signals(circuits, keys, getter=None):
+    """
+    Builds the (circuits x keys) float64 matrix of one tick.
+    Missing or non-numeric values become NaN, which never exceeds a limit.
+    """
+    getter = getter or itemgetter(*keys)
+    nan = np.nan
+    rows = []
+    for circuit in circuits:
+        try:
+            rows.append(getter(circuit))
+        except KeyError:
+            rows.append(tuple(circuit.get(k, nan) for k in keys))
+
+    shape = (len(circuits), len(keys))
+    try:
+        # fast path: numbers and None only
+        return np.array(rows, dtype=np.float64).reshape(shape)
+    except (TypeError, ValueError):
+        matrix = np.empty(shape, dtype=np.float64)
+        for i, row in enumerate(rows):
+            try:
+                matrix[i] = np.array(row, dtype=np.float64)
+            except (TypeError, ValueError):
+                matrix[i] = [_to_float(v) for v in (row if len(keys) > 1 else (row,))]
+        return matrix
+
+
+def find_violations(circuits, compiled: CompiledThresholds = None):
+    """
+    Evaluates all circuits at once.
+    Returns the violating (circuit index, key index) pairs plus the matrix,
+    as numpy arrays.
+    """
+    compiled = compiled or get_compiled_thresholds()
+    if not circuits or not compiled.keys:
+        return np.empty((0, 2), dtype=np.intp), np.empty((len(circuits), 0))
+    matrix = stack_signals(circuits, compiled.keys, compiled.getter)
+    return np.argwhere(matrix > compiled.limits), matrix
+
+
 # =====================================================
 # Threshold Checking and Auto-Pause Logic
 # =====================================================
@@ -64,41 +166,44 @@ def check_thresholds_and_pause(data_payload):
       ]
     }
 
-    Checks each value against thresholds.
-    If exceeded → triggers Pause API for that circuit.
+    Checks each value against thresholds (all circuits in one vectorized pass).
+    Every circuit's result is fed to the pause dispatcher, which debounces,
+    applies hysteresis and sends one pause per excursion.
     """
-    thresholds = load_thresholds()
+    compiled = get_compiled_thresholds()
     circuits = data_payload.get("circuits", [])
+    violations, matrix = find_violations(circuits, compiled)
+    if not circuits:
+        return
 
-    for circuit in circuits:
-        circuit_id = circuit.get("circuit_id")
-        exceeded_metrics = []
+    exceeded = {}
+    for row, col in violations:
+        exceeded.setdefault(row, []).append(
+            (compiled.keys[col], float(matrix[row, col]), float(compiled.limits[col]))
+        )
 
-        for key, limit in thresholds.items():
-            value = circuit.get(key)
-            if value is None:
-                continue
-            try:
-                if float(value) > float(limit):
-                    exceeded_metrics.append((key, value, limit))
-            except Exception:
-                pass
+    # "hot" = still above limit - hysteresis band; needed to re-arm after a pause
+    if compiled.keys:
+        band = compiled.limits - np.abs(compiled.limits) * PAUSE_HYSTERESIS
+        hot_rows = (matrix > band).any(axis=1)
+    else:
+        hot_rows = np.zeros(len(circuits), dtype=bool)
 
+    for row, circuit in enumerate(circuits):
+        circuit_id = circuit.get("circuit_id")
+        if circuit_id is None:
+            continue
+        exceeded_metrics = exceeded.get(row)
         if exceeded_metrics:
             logging.warning(f"Circuit {circuit_id}: Threshold exceeded {exceeded_metrics}")
-            trigger_pause(circuit_id, exceeded_metrics)
+        pause_dispatcher.observe(
+            circuit.get("device_id", DEFAULT_DEVICE_ID), circuit_id, exceeded_metrics, bool(hot_rows[row])
+        )
 
 
-def trigger_pause(circuit_id, details):
+def trigger_pause(circuit_id, details, device_id=DEFAULT_DEVICE_ID):
     """
-    Calls the /api/command/pause endpoint for the circuit that exceeded threshold.
+    Pauses the circuit that exceeded a threshold through the dispatcher
+    (authenticated, deduplicated while a pause is in flight or latched).
     """
-    try:
-        url = f"{API_BASE_URL}/api/command/pause?circuitNo={circuit_id}&DeviceId=2"
-        res = requests.post(url, timeout=5)
-        if res.status_code == 200:
-            logging.info(f"[AUTO-PAUSE] Circuit {circuit_id} paused successfully due to {details}")
-        else:
-            logging.warning(f"[AUTO-PAUSE] Pause failed ({res.status_code}): {res.text}")
-    except Exception as e:
-        logging.error(f"[AUTO-PAUSE] Error calling pause API: {e}")
+    return pause_dispatcher.request_pause(device_id, circuit_id, details)
@@ -0,0 +1,115 @@
+import logging
+import threading
+from datetime import datetime
+import pandas as pd
+
+# ===================================================
+# Tester Timestamp Normalization
+# ===================================================
+# The testers write times in a few string formats, e.g. the Record layer
+# "Absolute time" as "2026-01-03 00:21:25:363800" (":" before the
+# fraction). Instead of inferring the format for every value, the format is
+# detected once from a small sample, cached per (device, column), and whole
+# columns are parsed with that explicit format in one vectorized call.
+# A cached format that stops matching (tester firmware change) is detected
+# again on the spot.
+
+TIME_FORMATS = [
+    "%Y-%m-%d %H:%M:%S:%f",  # tester "Absolute time"
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S:%f",
+    "%Y/%m/%d %H:%M:%S",
+    "%d-%m-%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+]
+NATIVE = "native"  # cells openpyxl already returned as datetimes
+DETECT_SAMPLE = 20
+
+
+def _sample(values, size: int = DETECT_SAMPLE):
+    values = [v for v in values if v is not None and not (isinstance(v, float) and pd.isna(v))]
+    if len(values) <= size:
+        return values
+    step = len(values) / size  # spread over the column, not just its head
+    return [values[int(i * step)] for i in range(size)]
+
+
+def detect_format(values):
+    """
+    First format in TIME_FORMATS that parses every sampled value, NATIVE if
+    they already are datetimes, or None.
+    """
+    sample = _sample(list(values))
+    if not sample:
+        return None
+    if all(isinstance(v, (datetime, pd.Timestamp)) for v in sample):
+        return NATIVE
+    sample = pd.Series([str(v).strip() for v in sample])
+    for fmt in TIME_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors="coerce").notna().all():
+            return fmt
+    return None
+
+
+def _parse(values: pd.Series, fmt):
+    if fmt == NATIVE:
+        return pd.to_datetime(values, errors="coerce")
+    if fmt is None:  # unknown format: per-value inference, as before
+        return pd.Series([pd.to_datetime(v, errors="coerce") for v in values], index=values.index)
+    return pd.to_datetime(values.astype(str).str.strip(), format=fmt, errors="coerce")
+
+
+class FormatCache:
+    """
+    Detected time format per key (usually (device_id, column)).
+    """
+
+    def __init__(self):
+        self._formats = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._formats.get(key)
+
+    def formats(self):
+        with self._lock:
+            return {str(k): v for k, v in self._formats.items()}
+
+    def parse(self, values, key=None):
+        """
+        Vectorized parse of a column (Series / list) to datetime64; values
+        that do not match come back as NaT.
+        """
+        values = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+        fmt = self._formats.get(key) if key is not None else None
+        if fmt is None:
+            fmt = detect_format(values)
+        parsed = _parse(values, fmt)
+        if parsed.isna().any() and values.notna().any():
+            # cached format no longer fits (or the sample missed a variant)
+            redetected = detect_format(values[parsed.isna() & values.notna()])
+            if redetected is not None and redetected != fmt:
+                logging.info(f"Time format for {key} changed: {fmt} -> {redetected}")
+                fmt = redetected
+                parsed = parsed.fillna(_parse(values, fmt))
+        if key is not None and fmt is not None:
+            with self._lock:
+                self._formats[key] = fmt
+        return parsed
+
+    def parse_value(self, value, key=None):
+        return self.parse([value], key=key).iloc[0]
+
+
+format_cache = FormatCache()
+
+
+def parse_times(values, key=None):
+    return format_cache.parse(values, key=key)
+
+
+def parse_time(value, key=None):
+    return format_cache.parse_value(value, key=key)
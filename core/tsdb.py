@@ -0,0 +1,413 @@
+import sys
+import time
+import logging
+import threading
+from array import array
+import numpy as np
+import pandas as pd
+from config import TSDB_RETENTION_HOURS, TSDB_MEMORY_CAP_MB, TSDB_CHUNK_SAMPLES, TSDB_COMPACT_INTERVAL
+from core.timestamps import parse_times
+
+# ===================================================
+# Compressed In-Memory History of Live Circuit Samples
+# ===================================================
+# Recent samples of every monitored circuit are kept in memory so chart
+# loads do not go back to SQLite. Samples are grouped per circuit into
+# chunks of TSDB_CHUNK_SAMPLES rows, compressed Gorilla-style:
+#   timestamps  (ms) delta-of-delta, one stream per chunk shared by all signals:
+#               '0' same interval | '10'+7 | '110'+9 | '1110'+12 bits | '1111'+64
+#   values      float64 XOR with the previous value, one stream per signal:
+#               '0' same value | '10' + meaningful bits in the previous window
+#               | '11' + 5 bits leading zeros + 6 bits length + meaningful bits
+# New samples go to a raw (array) buffer; full buffers are compressed by
+# compact(), off the live thread. Chunks older than TSDB_RETENTION_HOURS
+# are dropped, and above TSDB_MEMORY_CAP_MB the oldest chunks of any
+# circuit go first.
+
+MASK64 = (1 << 64) - 1
+
+
+class _BitWriter:
+    __slots__ = ("buf", "acc", "n")
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.acc = 0
+        self.n = 0
+
+    def write(self, value: int, bits: int):
+        self.acc = (self.acc << bits) | value
+        self.n += bits
+        if self.n >= 64:
+            keep = self.n & 7
+            self.buf += (self.acc >> keep).to_bytes((self.n - keep) // 8, "big")
+            self.acc &= (1 << keep) - 1
+            self.n = keep
+
+    def getvalue(self):
+        pad = -self.n % 8
+        return bytes(self.buf) + (self.acc << pad).to_bytes((self.n + pad) // 8, "big")
+
+
+class _BitReader:
+    __slots__ = ("data", "pos", "acc", "n")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.acc = 0
+        self.n = 0
+
+    def read(self, bits: int):
+        while self.n < bits:
+            self.acc = (self.acc << 8) | self.data[self.pos]
+            self.pos += 1
+            self.n += 8
+        self.n -= bits
+        value = self.acc >> self.n
+        self.acc &= (1 << self.n) - 1
+        return value
+
+
+def encode_times(times):
+    """
+    Delta-of-delta encoding of int64 millisecond timestamps.
+    """
+    times = np.asarray(times, dtype=np.int64).tolist()
+    w = _BitWriter()
+    prev, delta = times[0], 0
+    w.write(prev & MASK64, 64)
+    for t in times[1:]:
+        d = t - prev
+        dod = d - delta
+        prev, delta = t, d
+        if dod == 0:
+            w.write(0, 1)
+        elif -63 <= dod <= 64:
+            w.write((0b10 << 7) | (dod + 63), 9)
+        elif -255 <= dod <= 256:
+            w.write((0b110 << 9) | (dod + 255), 12)
+        elif -2047 <= dod <= 2048:
+            w.write((0b1110 << 12) | (dod + 2047), 16)
+        else:
+            w.write(0b1111, 4)
+            w.write(dod & MASK64, 64)
+    return w.getvalue()
+
+
+def decode_times(data: bytes, count: int):
+    r = _BitReader(data)
+    t = r.read(64)
+    t -= (1 << 64) if t >> 63 else 0
+    out = [t]
+    delta = 0
+    for _ in range(count - 1):
+        if not r.read(1):
+            dod = 0
+        elif not r.read(1):
+            dod = r.read(7) - 63
+        elif not r.read(1):
+            dod = r.read(9) - 255
+        elif not r.read(1):
+            dod = r.read(12) - 2047
+        else:
+            dod = r.read(64)
+            dod -= (1 << 64) if dod >> 63 else 0
+        delta += dod
+        t += delta
+        out.append(t)
+    return np.array(out, dtype=np.int64)
+
+
+def encode_values(values):
+    """
+    XOR encoding of float64 values (NaN included, bit for bit).
+    """
+    bits = np.asarray(values, dtype=np.float64).view(np.uint64).tolist()
+    w = _BitWriter()
+    prev = bits[0]
+    w.write(prev, 64)
+    lead, trail = 65, 0  # no window yet
+    for v in bits[1:]:
+        x = v ^ prev
+        prev = v
+        if x == 0:
+            w.write(0, 1)
+            continue
+        l = min(64 - x.bit_length(), 31)
+        t = (x & -x).bit_length() - 1
+        if l >= lead and t >= trail:
+            w.write(0b10, 2)
+            w.write(x >> trail, 64 - lead - trail)
+        else:
+            lead, trail = l, t
+            size = 64 - l - t
+            w.write((0b11 << 11) | (l << 6) | (size & 63), 13)
+            w.write(x >> t, size)
+    return w.getvalue()
+
+
+def decode_values(data: bytes, count: int):
+    r = _BitReader(data)
+    prev = r.read(64)
+    out = [prev]
+    lead = trail = 0
+    for _ in range(count - 1):
+        if r.read(1):
+            if r.read(1):
+                header = r.read(11)
+                lead = header >> 6
+                trail = 64 - lead - ((header & 63) or 64)
+            prev ^= r.read(64 - lead - trail) << trail
+        out.append(prev)
+    return np.array(out, dtype=np.uint64).view(np.float64)
+
+
+# ===================================================
+# Chunks and Per-Circuit Series
+# ===================================================
+class Chunk:
+    """
+    Compressed block of samples of one circuit; immutable once built.
+    """
+    __slots__ = ("start", "end", "count", "times", "values", "nbytes")
+
+    def __init__(self, times: array, values: dict):
+        self.start, self.end, self.count = times[0], times[-1], len(times)
+        self.times = encode_times(times)
+        # all-NaN signals are not stored; reads fill them in
+        self.values = {name: encode_values(col) for name, col in values.items()
+                       if not np.isnan(np.frombuffer(col, dtype=np.float64)).all()}
+        self.nbytes = (sys.getsizeof(self.times) + sys.getsizeof(self.values)
+                       + sum(sys.getsizeof(v) for v in self.values.values()))
+
+    def decode(self, signals):
+        values = {}
+        for name in signals:
+            data = self.values.get(name)
+            values[name] = decode_values(data, self.count) if data is not None else np.full(self.count, np.nan)
+        return decode_times(self.times, self.count), values
+
+
+class _Buffer:
+    """
+    Raw samples not compressed yet.
+    """
+    __slots__ = ("times", "values")
+
+    def __init__(self):
+        self.times = array("q")
+        self.values = {}
+
+    def append(self, t: int, sample: dict):
+        n = len(self.times)
+        self.times.append(t)
+        for name, col in self.values.items():
+            col.append(sample.get(name, np.nan))
+        for name in sample.keys() - self.values.keys():
+            col = array("d", [np.nan]) * n
+            col.append(sample[name])
+            self.values[name] = col
+
+    @property
+    def nbytes(self):
+        return 8 * len(self.times) * (len(self.values) + 1)
+
+    def decode(self, signals):
+        n = len(self.times)
+        return (np.frombuffer(self.times, dtype=np.int64).copy(),
+                {name: np.frombuffer(self.values[name], dtype=np.float64).copy() if name in self.values
+                 else np.full(n, np.nan) for name in signals})
+
+
+class CircuitSeries:
+    __slots__ = ("chunks", "pending", "open", "signals", "last_time", "updated")
+
+    def __init__(self):
+        self.chunks = []  # compressed, oldest first
+        self.pending = []  # full raw buffers waiting for compact()
+        self.open = _Buffer()
+        self.signals = {}  # name -> None, in first-seen order
+        self.last_time = None  # ms, sample clock
+        self.updated = time.monotonic()
+
+    def blocks(self):
+        return [*self.chunks, *self.pending, self.open]
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.chunks) + sum(b.nbytes for b in self.pending) + self.open.nbytes
+
+
+# ===================================================
+# Store
+# ===================================================
+class RecentHistory:
+    """
+    Filled from the live_data payloads of the tailer thread
+    (append_payload); queried per circuit with query().
+    """
+
+    def __init__(self, retention_hours: float = TSDB_RETENTION_HOURS, memory_cap_mb: float = TSDB_MEMORY_CAP_MB,
+                 chunk_samples: int = TSDB_CHUNK_SAMPLES):
+        self.retention_ms = int(retention_hours * 3600 * 1000)
+        self.memory_cap = int(memory_cap_mb * 1024 * 1024)
+        self.chunk_samples = chunk_samples
+        self._series = {}  # (device_id, circuit_id) -> CircuitSeries
+        self._lock = threading.Lock()
+        self.samples_appended = 0
+        self.chunks_evicted = 0
+
+    # ---------------- writer ----------------
+    def append_payload(self, payload: dict, device_id=None):
+        """
+        Appends each circuit of a live_data payload; samples whose timestamp
+        did not move forward are skipped. Returns the number appended.
+        """
+        circuits = payload.get("circuits", [])
+        # naive tester time is stored as if UTC, like the live ring
+        stamps = parse_times([c.get("timestamp") for c in circuits], key=("live", "timestamp"))
+        now = int(pd.Timestamp.now().timestamp() * 1000)
+        appended = 0
+        with self._lock:
+            for circuit, stamp in zip(circuits, stamps):
+                key = (circuit.get("device_id", device_id), circuit.get("circuit_id"))
+                t = now if pd.isna(stamp) else int(stamp.timestamp() * 1000)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = CircuitSeries()
+                elif series.last_time is not None and t <= series.last_time:
+                    continue
+                sample = {k: float(v) for k, v in circuit.items() if k not in ("circuit_id", "device_id")
+                          and not isinstance(v, bool) and isinstance(v, (int, float, np.number))}
+                series.open.append(t, sample)
+                series.signals.update(dict.fromkeys(sample))
+                series.last_time = t
+                series.updated = time.monotonic()
+                if len(series.open.times) >= self.chunk_samples:
+                    series.pending.append(series.open)
+                    series.open = _Buffer()
+                appended += 1
+        self.samples_appended += appended
+        return appended
+
+    def compact(self):
+        """
+        Compresses the full raw buffers, then evicts. Returns chunks built.
+        """
+        with self._lock:
+            work = [(series, list(series.pending)) for series in self._series.values() if series.pending]
+        built = 0
+        for series, buffers in work:
+            chunks = [Chunk(b.times, b.values) for b in buffers]
+            with self._lock:
+                series.chunks.extend(chunks)
+                del series.pending[:len(buffers)]
+            built += len(chunks)
+        self.evict()
+        return built
+
+    def evict(self, now: float = None):
+        """
+        Drops chunks older than the retention window (measured from each
+        circuit's latest sample, so tester clock skew does not matter),
+        circuits not updated for that long, and then the oldest chunks
+        until the store is under the memory cap.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for key, series in list(self._series.items()):
+                if now - series.updated > self.retention_ms / 1000:
+                    self.chunks_evicted += len(series.chunks)
+                    del self._series[key]
+                    continue
+                cutoff = series.last_time - self.retention_ms
+                old = 0
+                while old < len(series.chunks) and series.chunks[old].end < cutoff:
+                    old += 1
+                if old:
+                    del series.chunks[:old]
+                    self.chunks_evicted += old
+
+            total = sum(s.nbytes for s in self._series.values())
+            while total > self.memory_cap:
+                candidates = [s for s in self._series.values() if s.chunks]
+                if not candidates:
+                    break
+                oldest = min(candidates, key=lambda s: s.chunks[0].end)
+                total -= oldest.chunks.pop(0).nbytes
+                self.chunks_evicted += 1
+
+    # ---------------- reader ----------------
+    def circuits(self):
+        with self._lock:
+            return list(self._series)
+
+    def query(self, device_id, circuit_id, signals=None, start=None, end=None):
+        """
+        Samples of one circuit in [start, end] (anything parse_times takes;
+        None = open). Returns (timestamps in ms as int64, {signal: float64}),
+        or None for an unknown circuit.
+        """
+        with self._lock:
+            series = self._series.get((device_id, circuit_id))
+            if series is None:
+                return None
+            signals = list(series.signals) if signals is None else list(signals)
+            blocks = series.blocks()
+            # raw buffers are still being appended to: decode a copy now
+            blocks = blocks[:len(series.chunks)] + [b.decode(signals) for b in blocks[len(series.chunks):]]
+
+        bounds = parse_times([start, end], key=("tsdb", "query"))
+        lo = None if pd.isna(bounds[0]) else int(bounds[0].timestamp() * 1000)
+        hi = None if pd.isna(bounds[1]) else int(bounds[1].timestamp() * 1000)
+        times, columns = [], {name: [] for name in signals}
+        for block in blocks:
+            if isinstance(block, Chunk):
+                if (lo is not None and block.end < lo) or (hi is not None and block.start > hi):
+                    continue
+                block = block.decode(signals)
+            t, values = block
+            mask = np.ones(len(t), dtype=bool)
+            if lo is not None:
+                mask &= t >= lo
+            if hi is not None:
+                mask &= t <= hi
+            times.append(t[mask])
+            for name in signals:
+                columns[name].append(values[name][mask])
+        if not times:
+            return np.empty(0, dtype=np.int64), {name: np.empty(0) for name in signals}
+        return np.concatenate(times), {name: np.concatenate(parts) for name, parts in columns.items()}
+
+    def status(self):
+        with self._lock:
+            series = list(self._series.values())
+            chunks = sum(len(s.chunks) for s in series)
+            compressed = sum(c.nbytes for s in series for c in s.chunks)
+            chunk_samples = sum(c.count * (len(s.signals) + 1) for s in series for c in s.chunks)
+            raw = sum(b.nbytes for s in series for b in (*s.pending, s.open))
+        return {
+            "circuits": len(series),
+            "chunks": chunks,
+            "compressed_bytes": compressed,
+            "raw_buffer_bytes": raw,
+            "memory_cap_bytes": self.memory_cap,
+            "bytes_per_value": round(compressed / chunk_samples, 3) if chunk_samples else None,
+            "samples_appended": self.samples_appended,
+            "chunks_evicted": self.chunks_evicted,
+        }
+
+    # ---------------- background ----------------
+    def run(self, interval: float = TSDB_COMPACT_INTERVAL):
+        while True:
+            try:
+                self.compact()
+            except Exception as e:
+                logging.error(f"[TSDB] Compaction error: {e}")
+            time.sleep(interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
@@ -3,7 +3,7 @@ import json
 import logging
 from flask import Blueprint, request
 from flask_sock import Sock
-from core.db_reader import read_active_circuit_data
+from core.db_reader import read_active_circuit_data, encode_record
 from config import STORED_DBC_PATH
 
 monitor_bp = Blueprint("monitor_bp", __name__)
@@ -53,7 +53,7 @@ def live_monitor(ws):
                 continue
 
             data = read_active_circuit_data(STORED_DBC_PATH, ACTIVE_CIRCUITS)
-            ws.send(json.dumps(data, default=str))
+            ws.send(json.dumps(data, default=encode_record))
 
             # send every 1 second
             asyncio.sleep(1)
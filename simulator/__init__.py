@@ -0,0 +1,12 @@
+"""
+Local stand-in for the BTS device API and the result PLC, for offline and
+load testing of the live monitoring path.
+
+Usage (from the project root):
+    python -m simulator                                  # 1 device x 16 circuits at 1 Hz
+    python -m simulator --devices 10 --autostart         # 10x circuit count, all writing
+    python -m simulator --rate 5 --latency 0.05 --jitter 0.05
+
+Point API_BASE_URL at http://localhost:<port> (default 5000) and PLC_HOST /
+PLC_PORT (config.py) at 127.0.0.1 / SIMULATOR_MODBUS_PORT.
+"""
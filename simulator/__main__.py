@@ -0,0 +1,63 @@
+import time
+import logging
+import argparse
+from urllib.parse import urlparse
+from config import (API_BASE_URL, DEFAULT_DEVICE_ID, STORED_DBC_PATH, SIMULATOR_DEVICES,
+                    SIMULATOR_CIRCUITS, SIMULATOR_RATE_HZ, SIMULATOR_MODBUS_PORT)
+from simulator.circuits import CircuitFarm
+from simulator.device_api import create_app
+from simulator.plc import PLCSimulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated BTS device API and PLC")
+    parser.add_argument("--devices", type=int, default=SIMULATOR_DEVICES)
+    parser.add_argument("--circuits", type=int, default=SIMULATOR_CIRCUITS, help="circuits per device")
+    parser.add_argument("--rate", type=float,
+                        help=f"rows per second per circuit (default: the TimeDelay of create-db-files, "
+                             f"{SIMULATOR_RATE_HZ} for --autostart)")
+    parser.add_argument("--folder", default=STORED_DBC_PATH, help="where RealTimeData_*.db files are written")
+    parser.add_argument("--port", type=int, default=urlparse(API_BASE_URL).port or 5000)
+    parser.add_argument("--modbus-port", type=int, default=SIMULATOR_MODBUS_PORT, help="0 disables the PLC")
+    parser.add_argument("--autostart", action="store_true",
+                        help="start every circuit now instead of waiting for create-db-files")
+    parser.add_argument("--hot", type=float, default=0.0, help="fraction of circuits that overheat")
+    parser.add_argument("--latency", type=float, default=0.0, help="added API latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random API latency up to (s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    devices = {DEFAULT_DEVICE_ID + i: f"127.0.0.{DEFAULT_DEVICE_ID + i}" for i in range(args.devices)}
+    rate = args.rate or SIMULATOR_RATE_HZ
+    farm = CircuitFarm(args.folder, rate=rate, hot_fraction=args.hot)
+    if args.autostart:
+        for did in devices:
+            for cid in range(1, args.circuits + 1):
+                farm.start_circuit(did, cid)
+    farm.start()
+
+    plc = None
+    if args.modbus_port:
+        plc = PLCSimulator(port=args.modbus_port)
+        plc.start()
+
+    app = create_app(farm, devices, plc=plc, latency=args.latency, jitter=args.jitter,
+                     honor_time_delay=args.rate is None)
+    print(f"Simulator: {args.devices} device(s) x {args.circuits} circuit(s) at {rate} Hz -> {args.folder}")
+    print(f"Device API on :{args.port}, Modbus on :{args.modbus_port or 'off'}, status at /sim/status")
+    started = time.time()
+    try:
+        app.run(host="0.0.0.0", port=args.port, threaded=True)
+    finally:
+        farm.stop()
+        if plc:
+            plc.stop()
+        status = farm.status()
+        print(f"Wrote {status['rows']} rows in {time.time() - started:.0f}s "
+              f"({status['ticks_late']} late writer ticks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import os
+import time
+import random
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+# ===================================================
+# Simulated Circuit Databases
+# ===================================================
+# Each running circuit appends rows to its own
+#   RealTimeData_<device>_<circuit>_<timestamp>.db
+# in the same layout the live monitor reads (a "readings" table, one row per
+# sample). A single writer thread serves every circuit, so hundreds of
+# circuits cost one thread and one open connection per file.
+
+TABLE_NAME = "readings"
+CELL_COUNT = 16
+
+COLUMNS = [
+    ("timestamp", "TEXT"),
+    ("PackVol", "REAL"),
+    ("PackCurr", "REAL"),
+    ("SOC", "REAL"),
+    ("MaxCellVol", "REAL"),
+    ("MinCellVol", "REAL"),
+    ("CellVolMinMaxDev", "REAL"),
+    ("MaxTemp", "REAL"),
+    ("MinTemp", "REAL"),
+    ("StepNo", "INTEGER"),
+] + [(f"CellVol{i:02d}", "REAL") for i in range(1, CELL_COUNT + 1)]
+
+_INSERT = (f"INSERT INTO {TABLE_NAME} ({', '.join(c for c, _ in COLUMNS)}) "
+           f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+
+RUNNING, PAUSED, STOPPED = "running", "paused", "stopped"
+
+
+class CircuitSignal:
+    """
+    Charge / rest / discharge cycle with noise, so values move the way a
+    real pack does (and occasionally trip the alarm rules when `hot`).
+    """
+
+    def __init__(self, seed=None, cycle_seconds: float = 600, hot: bool = False):
+        self.rng = random.Random(seed)
+        self.cycle = cycle_seconds
+        self.hot = hot
+        self.soc = self.rng.uniform(20, 80)
+        self.temp = self.rng.uniform(25, 30)
+        self.t = self.rng.uniform(0, cycle_seconds)
+
+    def sample(self, dt: float):
+        self.t += dt
+        phase = (self.t % self.cycle) / self.cycle
+        if phase < 0.45:
+            step, current = 1, 20.0
+        elif phase < 0.5:
+            step, current = 2, 0.0
+        elif phase < 0.95:
+            step, current = 3, -20.0
+        else:
+            step, current = 4, 0.0
+        current += self.rng.gauss(0, 0.2) if current else 0.0
+
+        self.soc = min(100.0, max(0.0, self.soc + current * dt / 36))
+        heat = abs(current) * (0.004 if not self.hot else 0.03)
+        self.temp += (heat - (self.temp - 25) * 0.002) * dt + self.rng.gauss(0, 0.02)
+
+        base = 3.0 + 1.2 * self.soc / 100 + current * 0.002
+        cells = [round(base + self.rng.gauss(0, 0.004), 4) for _ in range(CELL_COUNT)]
+        max_cell, min_cell = max(cells), min(cells)
+        return (
+            datetime.now().isoformat(timespec="milliseconds"),
+            round(sum(cells), 3),
+            round(current, 3),
+            round(self.soc, 2),
+            max_cell,
+            min_cell,
+            round((max_cell - min_cell) * 1000, 2),  # mV
+            round(self.temp + 1.5, 2),
+            round(self.temp - 1.0, 2),
+            step,
+            *cells,
+        )
+
+
+class SimCircuit:
+    def __init__(self, folder: str, device_id: int, circuit_id: int, rate: float, hot: bool = False):
+        self.device_id = int(device_id)
+        self.circuit_id = int(circuit_id)
+        self.rate = rate
+        self.created_at = datetime.now()
+        self.file_name = (f"RealTimeData_{self.device_id}_{self.circuit_id}_"
+                          f"{self.created_at.strftime('%Y%m%d%H%M%S')}.db")
+        self.file_path = os.path.join(folder, self.file_name)
+        self.signal = CircuitSignal(seed=hash((self.device_id, self.circuit_id)), hot=hot)
+        self.state = RUNNING
+        self.rows = 0
+        self._due = 0.0  # fractional rows carried between ticks
+        self.conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        cols = ", ".join(f"{name} {kind}" for name, kind in COLUMNS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} (id INTEGER PRIMARY KEY, {cols})")
+        self.conn.commit()
+
+    def write(self, dt: float):
+        """
+        Appends the rows due for the last `dt` seconds in one transaction.
+        """
+        self._due += self.rate * dt
+        count = int(self._due)
+        if count <= 0:
+            return 0
+        self._due -= count
+        step = 1.0 / self.rate
+        rows = [self.signal.sample(step) for _ in range(count)]
+        self.conn.executemany(_INSERT, rows)
+        self.conn.commit()
+        self.rows += count
+        return count
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def info(self):
+        return {
+            "deviceId": self.device_id,
+            "circuitId": self.circuit_id,
+            "fileName": self.file_name,
+            "filePath": self.file_path,
+            "createdAt": self.created_at.isoformat(),
+            "state": self.state,
+            "rows": self.rows,
+        }
+
+
+class CircuitFarm:
+    """
+    All simulated circuits plus the writer thread that grows their DBs.
+    Keyed by (device_id, circuit_id); starting a circuit again begins a new file.
+    """
+
+    def __init__(self, folder: str, rate: float = 1.0, tick: float = None, hot_fraction: float = 0.0):
+        self.folder = folder
+        self.rate = rate
+        # at most ~10 commits per second per circuit, batching rows above that
+        self.tick = tick or max(0.1, min(1.0, 1.0 / rate))
+        self.hot_fraction = hot_fraction
+        self._circuits = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.tick_seconds = 0.0  # duration of the last write pass
+        self.ticks_late = 0
+        os.makedirs(folder, exist_ok=True)
+
+    # ------------------------------
+    # Commands
+    # ------------------------------
+    def start_circuit(self, device_id, circuit_id, rate: float = None):
+        key = (int(device_id), int(circuit_id))
+        with self._lock:
+            old = self._circuits.pop(key, None)
+            hot = random.random() < self.hot_fraction
+            circuit = SimCircuit(self.folder, key[0], key[1], rate or self.rate, hot=hot)
+            self._circuits[key] = circuit
+        if old:
+            with self._write_lock:  # not while the writer is mid-insert
+                old.close()
+        logging.info(f"Simulator: started {circuit.file_name}")
+        return circuit
+
+    def set_state(self, device_id, circuit_id, state: str):
+        with self._lock:
+            circuit = self._circuits.get((int(device_id), int(circuit_id)))
+            if circuit is None:
+                return None
+            circuit.state = state  # the writer closes stopped files
+            return circuit
+
+    def circuits(self):
+        with self._lock:
+            return list(self._circuits.values())
+
+    # ------------------------------
+    # Writer thread
+    # ------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sim-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for circuit in self.circuits():
+            circuit.close()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            dt, last = now - last, now
+            with self._write_lock:
+                for circuit in self.circuits():
+                    if circuit.state == STOPPED:
+                        circuit.close()
+                    if circuit.state != RUNNING:
+                        continue
+                    try:
+                        circuit.write(dt)
+                    except Exception as e:
+                        logging.error(f"Simulator write error for {circuit.file_name}: {e}")
+            self.tick_seconds = time.perf_counter() - now
+            if self.tick_seconds > self.tick:
+                self.ticks_late += 1
+            self._stop.wait(max(0.0, self.tick - self.tick_seconds))
+
+    def status(self):
+        circuits = self.circuits()
+        return {
+            "circuits": len(circuits),
+            "running": sum(1 for c in circuits if c.state == RUNNING),
+            "rows": sum(c.rows for c in circuits),
+            "rate_hz": self.rate,
+            "tick_seconds": round(self.tick_seconds, 4),
+            "ticks_late": self.ticks_late,
+            "target_rows_per_s": round(self.rate * sum(1 for c in circuits if c.state == RUNNING), 1),
+        }
+
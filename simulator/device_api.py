@@ -0,0 +1,165 @@
+import time
+import json
+import base64
+import random
+import logging
+from flask import Flask, request, jsonify
+from simulator.circuits import CircuitFarm, RUNNING, PAUSED, STOPPED
+
+# ===================================================
+# Simulated Device API
+# ===================================================
+# The endpoints the backend calls on the real device API (API_BASE_URL):
+#   POST /login, /RefreshToken
+#   GET  /api/Device/GetAllDevice, /api/Device/ip/<id>
+#   POST /api/Device/register?ipAddress=
+#   POST /api/command/{pause,stop,Continue}?circuitNo=&DeviceId=
+#   POST /api/DBCUpload/create-db-files   (multipart: DeviceIDs, CircuitIds, TimeDelay, DBCFiles)
+# create-db-files starts the circuits in the CircuitFarm; commands change
+# their state. `latency` (seconds, optional jitter) is added to every call.
+
+TOKEN_LIFETIME = 3600
+
+_COMMAND_STATES = {"pause": PAUSED, "stop": STOPPED, "continue": RUNNING}
+
+
+def make_token(lifetime: int = TOKEN_LIFETIME):
+    """
+    Unsigned JWT-shaped token; the backend only reads its "exp" claim.
+    """
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+    payload = {"sub": "simulator", "exp": int(time.time()) + lifetime}
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part(payload)}."
+
+
+def create_app(farm: CircuitFarm, devices, plc=None, latency: float = 0.0, jitter: float = 0.0,
+               honor_time_delay: bool = True):
+    """
+    devices: {device_id: ip address}; plc: optional PLCSimulator for /sim/plc.
+    honor_time_delay=False keeps the farm's rate regardless of TimeDelay.
+    """
+    app = Flask(__name__)
+    stats = {"requests": 0, "commands": 0, "uploads": 0, "upload_bytes": 0}
+
+    @app.before_request
+    def _delay():
+        stats["requests"] += 1
+        if latency or jitter:
+            time.sleep(latency + random.uniform(0, jitter))
+
+    # ------------------------------
+    # Auth
+    # ------------------------------
+    @app.route("/login", methods=["POST"])
+    @app.route("/RefreshToken", methods=["POST"])
+    def login():
+        return jsonify({"token": make_token()})
+
+    # ------------------------------
+    # Devices
+    # ------------------------------
+    @app.route("/api/Device/GetAllDevice", methods=["GET"])
+    def get_all_devices():
+        return jsonify([
+            {"id": did, "deviceName": f"Simulated BTS {did}", "ipAddress": ip}
+            for did, ip in sorted(devices.items())
+        ])
+
+    @app.route("/api/Device/ip/<int:device_id>", methods=["GET"])
+    def get_device_ip(device_id):
+        if device_id not in devices:
+            return jsonify({"error": "Device not found"}), 404
+        return jsonify({"id": device_id, "ipAddress": devices[device_id]})
+
+    @app.route("/api/Device/register", methods=["POST"])
+    def register_device():
+        ip = request.args.get("ipAddress")
+        if not ip:
+            return jsonify({"error": "ipAddress is required"}), 400
+        for did, known in devices.items():
+            if known == ip:
+                return jsonify({"id": did, "ipAddress": ip})
+        did = max(devices, default=0) + 1
+        devices[did] = ip
+        return jsonify({"id": did, "ipAddress": ip})
+
+    # ------------------------------
+    # Circuit commands
+    # ------------------------------
+    @app.route("/api/command/<action>", methods=["POST"])
+    def command(action):
+        state = _COMMAND_STATES.get(action.lower())
+        if state is None:
+            return jsonify({"error": f"Unknown command {action}"}), 404
+        try:
+            circuit_id = int(request.args.get("circuitNo"))
+            device_id = int(request.args.get("DeviceId"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "circuitNo and DeviceId are required"}), 400
+        stats["commands"] += 1
+
+        current = {c.circuit_id: c for c in farm.circuits() if c.device_id == device_id}.get(circuit_id)
+        if current is None:
+            return jsonify({"error": "Circuit not started"}), 404
+        if current.state == STOPPED:
+            return jsonify({"error": "Circuit already stopped"}), 409
+        farm.set_state(device_id, circuit_id, state)
+        return jsonify({"message": f"{action} sent", "circuitNo": circuit_id, "DeviceId": device_id})
+
+    # ------------------------------
+    # DBC upload / start
+    # ------------------------------
+    @app.route("/api/DBCUpload/create-db-files", methods=["POST"])
+    def create_db_files():
+        try:
+            device_ids = [int(v) for v in request.form.getlist("DeviceIDs")]
+            circuit_ids = [int(v) for v in request.form.getlist("CircuitIds")]
+        except ValueError:
+            return jsonify({"error": "DeviceIDs and CircuitIds must be integers"}), 400
+        if not device_ids or not circuit_ids:
+            return jsonify({"error": "DeviceIDs and CircuitIds are required"}), 400
+        unknown = [did for did in device_ids if did not in devices]
+        if unknown:
+            return jsonify({"error": f"Unknown device(s) {unknown}"}), 404
+
+        # DBCs are only counted; the simulated schema is fixed
+        for f in request.files.getlist("DBCFiles"):
+            stats["upload_bytes"] += len(f.read())
+        stats["uploads"] += 1
+
+        # TimeDelay is the device's sample period in ms
+        rate = None
+        if honor_time_delay:
+            try:
+                delay_ms = float(request.form.get("TimeDelay") or 0)
+            except ValueError:
+                delay_ms = 0
+            rate = 1000.0 / delay_ms if delay_ms > 0 else None
+
+        files = []
+        for did in device_ids:
+            for cid in circuit_ids:
+                info = farm.start_circuit(did, cid, rate=rate).info()
+                files.append({k: info[k] for k in ("deviceId", "circuitId", "fileName", "filePath", "createdAt")})
+        return jsonify({"files": files})
+
+    # ------------------------------
+    # Simulator status
+    # ------------------------------
+    @app.route("/sim/status", methods=["GET"])
+    def sim_status():
+        return jsonify({"farm": farm.status(), "api": dict(stats), "devices": len(devices)})
+
+    @app.route("/sim/circuits", methods=["GET"])
+    def sim_circuits():
+        return jsonify([c.info() for c in farm.circuits()])
+
+    @app.route("/sim/plc", methods=["GET"])
+    def sim_plc():
+        if plc is None:
+            return jsonify({"error": "PLC simulator not running"}), 404
+        return jsonify(plc.bank.status(last=int(request.args.get("last", 20))))
+
+    logging.info(f"Simulated device API ready for {len(devices)} device(s)")
+    return app
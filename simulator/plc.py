@@ -0,0 +1,127 @@
+import struct
+import logging
+import threading
+import socketserver
+from collections import deque
+from datetime import datetime
+
+# ===================================================
+# Simulated PLC (Modbus TCP)
+# ===================================================
+# Enough of a Modbus TCP slave for send_result_to_plc(): holding registers
+# that can be read (0x03) and written (0x06 single, 0x10 multiple). Other
+# function codes get an "illegal function" exception. Every write is kept
+# in a short history so load tests can check what the backend reported.
+
+REGISTER_COUNT = 65536
+HISTORY_SIZE = 10000
+
+_ILLEGAL_FUNCTION = 0x01
+_ILLEGAL_ADDRESS = 0x02
+
+
+class RegisterBank:
+    def __init__(self):
+        self.registers = [0] * REGISTER_COUNT
+        self.writes = 0
+        self.history = deque(maxlen=HISTORY_SIZE)  # (time, address, value)
+        self._lock = threading.Lock()
+
+    def read(self, address: int, count: int):
+        with self._lock:
+            return self.registers[address:address + count]
+
+    def write(self, address: int, values):
+        now = datetime.now().isoformat(timespec="milliseconds")
+        with self._lock:
+            for offset, value in enumerate(values):
+                self.registers[address + offset] = value
+                self.history.append((now, address + offset, value))
+            self.writes += len(values)
+
+    def status(self, last: int = 20):
+        with self._lock:
+            recent = list(self.history)[-last:]
+            return {
+                "writes": self.writes,
+                "recent": [{"time": t, "address": a, "value": v} for t, a, v in recent],
+            }
+
+
+def _handle_pdu(bank: RegisterBank, function: int, data: bytes):
+    """
+    Returns the response PDU (function code + data) for one request PDU.
+    """
+    try:
+        if function == 0x03:
+            address, count = struct.unpack(">HH", data[:4])
+            if not 1 <= count <= 125 or address + count > REGISTER_COUNT:
+                return bytes([function | 0x80, _ILLEGAL_ADDRESS])
+            values = bank.read(address, count)
+            return struct.pack(f">BB{count}H", function, count * 2, *values)
+        if function == 0x06:
+            address, value = struct.unpack(">HH", data[:4])
+            bank.write(address, [value])
+            return struct.pack(">BHH", function, address, value)
+        if function == 0x10:
+            address, count, _ = struct.unpack(">HHB", data[:5])
+            if not 1 <= count <= 123 or address + count > REGISTER_COUNT:
+                return bytes([function | 0x80, _ILLEGAL_ADDRESS])
+            values = struct.unpack(f">{count}H", data[5:5 + count * 2])
+            bank.write(address, values)
+            return struct.pack(">BHH", function, address, count)
+    except struct.error:
+        return bytes([function | 0x80, _ILLEGAL_ADDRESS])
+    return bytes([function | 0x80, _ILLEGAL_FUNCTION])
+
+
+class _ModbusHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        bank = self.server.bank
+        sock = self.request
+        while True:
+            header = self._recv(sock, 7)  # MBAP: transaction, protocol, length, unit
+            if not header:
+                return
+            transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+            pdu = self._recv(sock, length - 1)
+            if not pdu:
+                return
+            response = _handle_pdu(bank, pdu[0], pdu[1:])
+            sock.sendall(struct.pack(">HHHB", transaction, protocol, len(response) + 1, unit) + response)
+
+    @staticmethod
+    def _recv(sock, size):
+        buf = b""
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class PLCSimulator:
+    def __init__(self, host: str = "0.0.0.0", port: int = 5020):
+        self.bank = RegisterBank()
+        self.server = _ThreadingServer((host, port), _ModbusHandler)
+        self.server.bank = self.bank
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="sim-plc", daemon=True)
+        self._thread.start()
+        logging.info(f"Simulated PLC listening on Modbus TCP port {self.port}")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,54 @@
+import pytest
+
+from core.analytics_store import AnalyticsStore
+
+
+def result(status, device=1, channel=1, reason=None, capacity=100.0):
+    return {"data_update": {
+        "meta": {"battery_id": "B1", "battery_type": "LFP", "test_type": "CDC",
+                 "device_id": device, "device_channel": channel},
+        "final_status": status,
+        "fail_reason": reason,
+        "results": {"discharge": {"Capacity": capacity}},
+    }}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalyticsStore(str(tmp_path))
+
+
+def test_channel_fail_rates_before_first_flush(store):
+    store.record_result(result("PASS"))
+    store.record_result(result("FAIL", reason="Capacity"))
+    assert store.frame()["passed"].dtype == bool
+
+    rates = store.channel_fail_rates()
+    assert rates == [{"device_id": "1", "channel": "1", "total": 2, "failed": 1,
+                      "fail_rate": 50.0, "top_fail_reason": "Capacity"}]
+
+    store.flush()
+    assert store.channel_fail_rates() == rates
+
+
+def test_yield_summary_rejects_unknown_group_by(store):
+    store.record_result(result("PASS"))
+    with pytest.raises(ValueError):
+        store.yield_summary(group_by="nope")
+    with pytest.raises(ValueError):
+        store.yield_summary(group_by="")
+
+
+@pytest.mark.parametrize("bins", [0, -1, 10_000])
+def test_metric_distribution_rejects_bad_bins(store, bins):
+    store.record_result(result("PASS"))
+    with pytest.raises(ValueError):
+        store.metric_distribution("discharge_Capacity", bins=bins)
+
+
+def test_metric_distribution(store):
+    for capacity in (90.0, 100.0, 110.0):
+        store.record_result(result("PASS", capacity=capacity))
+    dist = store.metric_distribution("discharge_Capacity", bins=2)
+    assert dist["count"] == 3
+    assert dist["histogram"]["counts"] == [1, 2]
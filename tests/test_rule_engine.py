@@ -0,0 +1,25 @@
+from core.rule_engine import RuleEngine, compile_rules
+
+
+def engine():
+    return RuleEngine(compile_rules([
+        {"id": "curr_avg", "type": "rolling_mean", "signal": "packcurr", "window_seconds": 30, "op": ">", "limit": 20},
+    ]))
+
+
+def test_repeated_sample_is_counted_once():
+    rules = engine()
+    assert rules.process((2, 1), {"packcurr": 30.0}, ts=100.0)[0]["state"] == "raised"
+    # the tail reader hands the cached record of an unchanged DB back every tick
+    for _ in range(5):
+        assert rules.process((2, 1), {"packcurr": 30.0}, ts=100.0) == []
+    # one new low sample pulls the mean of two samples below the limit
+    events = rules.process((2, 1), {"packcurr": 0.0}, ts=101.0)
+    assert [e["state"] for e in events] == ["cleared"]
+
+
+def test_forget_clears_last_timestamp():
+    rules = engine()
+    rules.process(("2", "1"), {"packcurr": 30.0}, ts=100.0)
+    rules.forget((2, 1))
+    assert rules.process((2, 1), {"packcurr": 30.0}, ts=100.0)[0]["state"] == "raised"